@@ -0,0 +1,247 @@
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import and_, or_, insert, update, event, inspect
+from database import db
+from models import Inventory, Product, Alert
+
+# Items expiring within this many days raise a NEAR_EXPIRY alert
+NEAR_EXPIRY_DAYS = 7
+
+
+# =====================
+# ALERT RULES
+# =====================
+def _alert_rows(rows, today):
+    """Turn candidate inventory rows into the alerts they should currently carry."""
+    near_cutoff = today + timedelta(days=NEAR_EXPIRY_DAYS)
+    wanted = {}
+    for row in rows:
+        name = row.product_name
+        qty = row.quantity_on_hand
+        base = {
+            'product_id': row.product_id,
+            'branch_id': row.branch_id,
+            'inventory_id': row.id,
+            'quantity': int(qty) if qty is not None else None,
+        }
+
+        if row.is_low_stock:
+            wanted[('LOW_STOCK', row.id)] = dict(
+                base,
+                type='LOW_STOCK',
+                message=f'Low stock: {name}. Only {qty} left.',
+                days_until_expiry=None
+            )
+
+        if row.expiry_date:
+            if today < row.expiry_date <= near_cutoff:
+                days_left = (row.expiry_date - today).days
+                wanted[('NEAR_EXPIRY', row.id)] = dict(
+                    base,
+                    type='NEAR_EXPIRY',
+                    message=f'{name} expires in {days_left} days ({qty} units)',
+                    days_until_expiry=days_left
+                )
+            elif row.expiry_date <= today:
+                wanted[('EXPIRED', row.id)] = dict(
+                    base,
+                    type='EXPIRED',
+                    message=f'{name} has EXPIRED! {qty} units need removal.',
+                    days_until_expiry=0
+                )
+    return wanted
+
+
+def _id_bounds(column, id_range, include_null=False):
+    """SQL criteria restricting column to an inclusive (lo, hi) range; None is unbounded."""
+    if not id_range:
+        return []
+    lo, hi = id_range
+    criteria = []
+    if lo is not None:
+        criteria.append(column >= lo)
+    if hi is not None:
+        criteria.append(column <= hi)
+    if include_null and lo is None:
+        return [or_(column.is_(None), and_(*criteria))] if criteria else []
+    return criteria
+
+
+def _scope(column, id_range=None, inventory_ids=None, include_null=False):
+    """Combine an id range and/or an explicit id list into SQL criteria."""
+    criteria = _id_bounds(column, id_range, include_null=include_null)
+    if inventory_ids is not None:
+        criteria.append(column.in_(inventory_ids))
+    return criteria
+
+
+def expire_inventory(today=None, id_range=None, inventory_ids=None):
+    """Flip every past-expiry inventory row to EXPIRED in a single UPDATE."""
+    today = today or datetime.utcnow()
+    result = db.session.execute(
+        update(Inventory)
+        .where(
+            Inventory.expiry_date <= today,
+            or_(Inventory.status.is_(None), Inventory.status != 'EXPIRED'),
+            *_scope(Inventory.id, id_range, inventory_ids)
+        )
+        .values(status='EXPIRED')
+    )
+    return result.rowcount or 0
+
+
+def evaluate_alerts(today=None, id_range=None, inventory_ids=None):
+    """
+    Reconcile the Alert table with the current state of inventory.
+
+    Candidates are selected with one set-based query and diffed against the
+    open alerts: new conditions are inserted, still-active alerts keep their
+    row (and is_read flag) with refreshed figures, and alerts whose condition
+    cleared are marked resolved. The caller owns the commit.
+
+    id_range limits the pass to an inclusive (lo, hi) slice of inventory ids so
+    large tables can be processed in chunks; open alerts without a source row
+    are swept by the chunk whose lower bound is None. inventory_ids restricts
+    it to specific rows instead (used by the commit hook below).
+    """
+    today = today or datetime.utcnow()
+    near_cutoff = today + timedelta(days=NEAR_EXPIRY_DAYS)
+
+    stats = {'expired': expire_inventory(today, id_range, inventory_ids), 'created': 0, 'updated': 0, 'resolved': 0}
+
+    low_stock = and_(
+        Inventory.quantity_on_hand <= Inventory.threshold_min,
+        Inventory.status == 'AVAILABLE'
+    )
+    rows = db.session.query(
+        Inventory.id,
+        Inventory.product_id,
+        Inventory.branch_id,
+        Inventory.quantity_on_hand,
+        Inventory.expiry_date,
+        low_stock.label('is_low_stock'),
+        Product.name.label('product_name')
+    ).outerjoin(Product, Product.id == Inventory.product_id).filter(
+        or_(low_stock, Inventory.expiry_date <= near_cutoff),
+        *_scope(Inventory.id, id_range, inventory_ids)
+    ).all()
+    wanted = _alert_rows(rows, today)
+
+    open_alerts = db.session.query(
+        Alert.id, Alert.type, Alert.inventory_id, Alert.message, Alert.days_until_expiry
+    ).filter(
+        Alert.resolved_at.is_(None),
+        *_scope(Alert.inventory_id, id_range, inventory_ids, include_null=True)
+    ).all()
+
+    changed = []
+    resolved_ids = []
+    for alert in open_alerts:
+        key = (alert.type, alert.inventory_id)
+        target = wanted.pop(key, None)
+        if target is None:
+            # Condition cleared, legacy row without a source, or a duplicate
+            resolved_ids.append(alert.id)
+        elif (alert.message, alert.days_until_expiry) != (target['message'], target['days_until_expiry']):
+            changed.append({
+                'id': alert.id,
+                'message': target['message'],
+                'quantity': target['quantity'],
+                'days_until_expiry': target['days_until_expiry']
+            })
+
+    if wanted:
+        db.session.execute(insert(Alert), list(wanted.values()))
+    if changed:
+        db.session.execute(update(Alert), changed)
+    if resolved_ids:
+        db.session.execute(
+            update(Alert).where(Alert.id.in_(resolved_ids)).values(resolved_at=today)
+        )
+
+    stats['created'] = len(wanted)
+    stats['updated'] = len(changed)
+    stats['resolved'] = len(resolved_ids)
+    return stats
+
+
+def open_alerts_query():
+    """Base query for alerts that have not been resolved yet."""
+    return Alert.query.filter(Alert.resolved_at.is_(None))
+
+
+# =====================
+# COMMIT HOOKS
+# =====================
+# Inventory columns whose changes can raise or clear an alert
+WATCHED_COLUMNS = ('quantity_on_hand', 'threshold_min', 'expiry_date', 'status')
+TOUCHED_KEY = 'alerts_touched_inventory'
+EVALUATING_KEY = 'alerts_evaluating'
+HOOK_BATCH_SIZE = 500
+
+
+def touch_inventory(inventory_ids, session=None):
+    """
+    Queue inventory rows for alert evaluation at the next commit.
+
+    ORM changes are picked up automatically; call this after bulk UPDATE
+    statements that bypass the unit of work.
+    """
+    session = session or db.session()
+    session.info.setdefault(TOUCHED_KEY, set()).update(i for i in inventory_ids if i is not None)
+
+
+def _after_flush(session, flush_context):
+    touched = set()
+    for obj in session.new:
+        if isinstance(obj, Inventory):
+            touched.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Inventory):
+            touched.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, Inventory):
+            attrs = inspect(obj).attrs
+            if any(attrs[col].history.has_changes() for col in WATCHED_COLUMNS):
+                touched.add(obj.id)
+    if touched:
+        touch_inventory(touched, session)
+
+
+def _before_commit(session):
+    if session.info.get(EVALUATING_KEY):
+        return
+    if not has_app_context() or not current_app.config.get('ALERT_HOOKS_ENABLED', True):
+        session.info.pop(TOUCHED_KEY, None)
+        return
+
+    session.info[EVALUATING_KEY] = True
+    try:
+        # before_commit fires ahead of the final flush; flush now so pending changes are seen
+        session.flush()
+        ids = sorted(session.info.pop(TOUCHED_KEY, ()))
+        if not ids:
+            return
+        today = datetime.utcnow()
+        # Savepoint so a failing evaluation never takes the caller's commit down with it
+        with session.begin_nested():
+            for start in range(0, len(ids), HOOK_BATCH_SIZE):
+                evaluate_alerts(today, inventory_ids=ids[start:start + HOOK_BATCH_SIZE])
+    except Exception:
+        current_app.logger.exception("[Alerts] commit-time evaluation failed")
+    finally:
+        session.info.pop(EVALUATING_KEY, None)
+
+
+def _after_soft_rollback(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop(TOUCHED_KEY, None)
+
+
+def init_app(app):
+    """Evaluate alerts for touched inventory rows whenever a transaction commits."""
+    app.config.setdefault('ALERT_HOOKS_ENABLED', True)
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'after_flush', _after_flush)
+        event.listen(db.session, 'before_commit', _before_commit)
+        event.listen(db.session, 'after_soft_rollback', _after_soft_rollback)
@@ -0,0 +1,173 @@
+import threading
+from datetime import date, datetime, timedelta
+# numpy is imported by the functions that use it, so importing this module at app boot stays cheap
+from sqlalchemy import select, func, true
+from database import db
+from models import Product, Inventory, Sale, SaleItem
+
+# Upper edges (days since entry) of the stock ageing buckets; the last bucket is open
+AGEING_EDGES = (30, 90, 180, 365)
+AGEING_LABELS = ['0-30d', '31-90d', '91-180d', '181-365d', '>365d']
+# Stock expiring within this many days counts as at risk
+EXPIRY_RISK_DAYS = 30
+# Window for sell-through: units sold in the last N days vs. units still on hand
+SELL_THROUGH_DAYS = 30
+UNCATEGORIZED = 'Uncategorized'
+EPOCH = date(1970, 1, 1)
+
+_lock = threading.Lock()
+_cached = (None, None)   # (cache key, metrics)
+
+
+# =====================
+# COLUMN LOADING
+# =====================
+def _intern(values, index):
+    """Category labels -> int32 codes, growing the shared label index as new ones appear."""
+    import numpy as np
+    return np.fromiter(
+        (index.setdefault(v or UNCATEGORIZED, len(index)) for v in values),
+        dtype=np.int32, count=len(values)
+    )
+
+
+def _floats(values):
+    import numpy as np
+    return np.nan_to_num(np.array(values, dtype=float))
+
+
+def _day_number(column):
+    """
+    Whole days since 1970-01-01, computed by the database so no Python
+    datetimes are built per row. NULL stays NULL (NaN in the arrays).
+    """
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.floor(func.extract('epoch', column) / 86400)
+    return func.julianday(func.date(column)) - 2440587.5
+
+
+def load_columns(today):
+    """
+    Read inventory (with product price and category) and recent sale lines as
+    parallel arrays: one SELECT each, no ORM objects. Dates arrive as day
+    numbers (float, NaN when missing).
+    """
+    import numpy as np
+    connection = db.session.connection()
+    stock = connection.execute(select(
+        Inventory.quantity_on_hand, _day_number(Inventory.expiry_date), _day_number(Inventory.entry_date),
+        Product.unit_price, Product.category
+    ).join(Product, Product.id == Inventory.product_id)).all()
+    since = datetime.combine(today - timedelta(days=SELL_THROUGH_DAYS), datetime.min.time())
+    sold = connection.execute(select(SaleItem.quantity, Product.category).join(
+        Sale, Sale.id == SaleItem.sale_id
+    ).join(Product, Product.id == SaleItem.product_id).where(Sale.sale_date >= since)).all()
+
+    qty, expiry, entry, price, category = zip(*stock) if stock else ((),) * 5
+    sold_qty, sold_category = zip(*sold) if sold else ((),) * 2
+    index = {}
+    columns = {
+        'qty': _floats(qty),
+        'price': _floats(price),
+        'expiry': np.array(expiry, dtype=float),
+        'entry': np.array(entry, dtype=float),
+        'category': _intern(category, index),
+        'sold_qty': _floats(sold_qty),
+        'sold_category': _intern(sold_category, index),
+    }
+    return columns, list(index)
+
+
+# =====================
+# METRICS
+# =====================
+def _per_category(codes, weights, count):
+    import numpy as np
+    return np.bincount(codes, weights=weights, minlength=count) if count else np.zeros(0)
+
+
+def compute(columns, labels, today):
+    """All report series from the loaded columns, vectorised; category series sorted by label."""
+    import numpy as np
+    count = len(labels)
+    order = sorted(range(count), key=labels.__getitem__)
+    names = [labels[i] for i in order]
+    qty, codes = columns['qty'], columns['category']
+    value = qty * columns['price']
+    day = (today - EPOCH).days
+
+    def series(values, series_labels=None):
+        return {'labels': series_labels or names, 'data': [round(float(v), 2) for v in values]}
+
+    units = _per_category(codes, qty, count)[order]
+    stock_value = _per_category(codes, value, count)[order]
+
+    # Ageing: days since entry, bucketed; rows without an entry date are left out
+    dated = ~np.isnan(columns['entry'])
+    age = day - columns['entry'][dated]
+    buckets = np.searchsorted(AGEING_EDGES, age, side='left')
+    ageing = np.bincount(buckets, weights=value[dated], minlength=len(AGEING_LABELS))
+
+    # Expiry risk: value of stock on hand expiring within the window, and already expired
+    days_left = np.where(qty > 0, columns['expiry'] - day, np.nan)
+    with np.errstate(invalid='ignore'):
+        at_risk = (days_left >= 0) & (days_left <= EXPIRY_RISK_DAYS)
+        expired = days_left < 0
+    risk = _per_category(codes[at_risk], value[at_risk], count)[order]
+    lost = _per_category(codes[expired], value[expired], count)[order]
+
+    # Sell-through: sold / (sold + on hand) over the window, as a percentage
+    sold = _per_category(columns['sold_category'], columns['sold_qty'], count)[order]
+    total = sold + units
+    sell_through = np.divide(sold * 100, total, out=np.zeros_like(total), where=total > 0)
+
+    return {
+        'stock-units': series(units),
+        'stock-value': series(stock_value),
+        'ageing': series(ageing, AGEING_LABELS),
+        'expiry-risk': {**series(risk), 'expired': [round(float(v), 2) for v in lost]},
+        'sell-through': series(sell_through),
+    }
+
+
+# =====================
+# CACHE
+# =====================
+def data_version():
+    """
+    Cheap fingerprint of the tables the metrics read: row counts, max ids and
+    last-modified stamps (indexed), so any committed insert, update or delete
+    from any worker changes it.
+    """
+    inventory = select(
+        func.count(Inventory.id).label('inventory_rows'), func.max(Inventory.id).label('inventory_max_id'),
+        func.max(Inventory.last_updated).label('inventory_changed')
+    ).subquery()
+    products = select(
+        func.count(Product.id).label('product_rows'), func.max(Product.id).label('product_max_id'),
+        func.max(Product.updated_at).label('product_changed')
+    ).subquery()
+    sold = select(func.max(SaleItem.id).label('sold_max_id')).subquery()
+    # One round trip: three single-row aggregates cross-joined
+    joined = inventory.join(products, true()).join(sold, true())
+    return tuple(db.session.execute(select(inventory, products, sold).select_from(joined)).one())
+
+
+def metrics(today=None):
+    """Report series, recomputed only when the data version or the day changes."""
+    global _cached
+    today = today or datetime.utcnow().date()
+    key = (data_version(), today)
+    with _lock:
+        if _cached[0] == key:
+            return _cached[1]
+    result = compute(*load_columns(today), today)
+    with _lock:
+        _cached = (key, result)
+    return result
+
+
+def invalidate():
+    global _cached
+    with _lock:
+        _cached = (None, None)
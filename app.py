@@ -7,83 +7,210 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import csv
+import hmac
 import re
-import requests
-import xml.etree.ElementTree as ET
-import openpyxl
-import xlrd
+from contextlib import contextmanager
 from io import StringIO, BytesIO
 from datetime import datetime, timedelta
 from functools import wraps
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, send_file
+from flask import Flask, current_app, render_template, request, redirect, url_for, flash, jsonify, session, send_file, abort, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from sqlalchemy import text
+from sqlalchemy.orm import joinedload, contains_eager
 from database import db
-from models import Branch, User, Category, Product, Inventory, Sale, SaleItem, Alert, ImportLog
+from models import Branch, User, Category, Product, Inventory, Sale, Alert, ImportLog, JobRun, StockMovement, StockCheckpoint
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.routing import BuildError
 from werkzeug.middleware.proxy_fix import ProxyFix
 from auth import auth_bp, oauth
+import alerts
+import expiry_index
+from expiry_index import calendar as expiry_calendar
+from alerts import open_alerts_query
+import scheduler
+import rollups
+import valuation
+import ledger
+import profiler
+import metrics
+import slow_queries
+import cache_policy
+import assets
+import compression
+import engine_profiles
+import fragments
+import reports as report_series
+import analytics
+import exports
+from search import product_filters, inventory_filters
+from sales import record_sale, sync_sales, SYNC_MAX_BATCH, sales_history_page, decode_cursor
 import click
 # =====================
-# CREATE APP
+# ROUTE TABLE
 # =====================
-app = Flask(__name__)
-app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "fallback-secret-key")
-
-# Secure cookies for OAuth CSRF
-is_production = os.environ.get('FLASK_ENV') == 'production' or os.environ.get('RENDER') == 'true'
-if is_production:
-    # Tell Flask it is behind a proxy so url_for(_external=True) uses https
-    app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
-    
-    app.config.update(
-        SESSION_COOKIE_SECURE=True,
-        SESSION_COOKIE_SAMESITE="None",
-        SESSION_COOKIE_HTTPONLY=True
-    )
-    # Ensure Authlib doesn't allow insecure transport in production
-    os.environ['AUTHLIB_INSECURE_TRANSPORT'] = 'false'
-else:
-    # Allow insecure transport for local testing over HTTP
-    os.environ['AUTHLIB_INSECURE_TRANSPORT'] = 'true'
-
-
-# =====================
-# DATABASE CONFIG
-# =====================
-database_url = os.environ.get("DATABASE_URL")
+class RouteTable:
+    """
+    Views declared at import time, attached to every app create_app()
+    builds. Unlike a Blueprint, endpoints keep their bare names, so
+    url_for('dashboard') and the templates are unchanged.
+    """
 
-if database_url:
-    # Convert old-style postgres URI for SQLAlchemy
-    if database_url.startswith("postgres://"):
-        database_url = database_url.replace("postgres://", "postgresql://", 1)
-else:
+    def __init__(self):
+        self.rules = []
+        self.error_handlers = []
+
+    def route(self, rule, **options):
+        def decorator(view):
+            self.rules.append((rule, options.pop('endpoint', None), view, options))
+            return view
+        return decorator
+
+    def errorhandler(self, code):
+        def decorator(handler):
+            self.error_handlers.append((code, handler))
+            return handler
+        return decorator
+
+    def init_app(self, app):
+        for rule, endpoint, view, options in self.rules:
+            app.add_url_rule(rule, endpoint, view, **options)
+        for code, handler in self.error_handlers:
+            app.register_error_handler(code, handler)
+
+
+routes = RouteTable()
+migrate = Migrate()
+
+
+def database_uri():
+    """DATABASE_URL with the old postgres:// scheme fixed, or the local SQLite file."""
+    database_url = os.environ.get("DATABASE_URL")
+    if database_url:
+        # Convert old-style postgres URI for SQLAlchemy
+        if database_url.startswith("postgres://"):
+            database_url = database_url.replace("postgres://", "postgresql://", 1)
+        return database_url
     # Local fallback (SQLite)
     basedir = os.path.abspath(os.path.dirname(__file__))
-    database_url = "sqlite:///" + os.path.join(basedir, 'instance', 'local.db')
+    return "sqlite:///" + os.path.join(basedir, 'instance', 'local.db')
 
-app.config["SQLALCHEMY_DATABASE_URI"] = database_url
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
 # =====================
-# INITIALIZE DB
-# =====================
-db.init_app(app)
-migrate = Migrate(app, db)
-# =====================
-# INITIALIZE OAUTH
+# CREATE APP
 # =====================
-oauth.init_app(app)
-app.register_blueprint(auth_bp)
+def create_app(config=None):
+    """Build a configured app with every extension and route attached; `config` overrides the defaults."""
+    app = Flask(__name__)
+    app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "fallback-secret-key")
+
+    # Secure cookies for OAuth CSRF
+    is_production = os.environ.get('FLASK_ENV') == 'production' or os.environ.get('RENDER') == 'true'
+    if is_production:
+        # Tell Flask it is behind a proxy so url_for(_external=True) uses https
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+
+        app.config.update(
+            SESSION_COOKIE_SECURE=True,
+            SESSION_COOKIE_SAMESITE="None",
+            SESSION_COOKIE_HTTPONLY=True
+        )
+        # Ensure Authlib doesn't allow insecure transport in production
+        os.environ['AUTHLIB_INSECURE_TRANSPORT'] = 'false'
+    else:
+        # Allow insecure transport for local testing over HTTP
+        os.environ['AUTHLIB_INSECURE_TRANSPORT'] = 'true'
+
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_uri()
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    if config:
+        app.config.update(config)
+
+    # Database and OAuth; the engine profile must be in place before db.init_app creates the engine
+    engine_profiles.init_app(app)
+    db.init_app(app)
+    engine_profiles.init_engine(app)
+    migrate.init_app(app, db)
+    oauth.init_app(app)
+    app.register_blueprint(auth_bp)
+
+    # Background jobs & alert hooks
+    alerts.init_app(app)
+    expiry_index.init_app(app)
+    scheduler.init_app(app)
+    rollups.init_app(app)
+    valuation.init_app(app)
+    ledger.init_app(app)
+
+    # Request profiling & metrics
+    profiler.init_app(app)
+    metrics.init_app(app)
+    slow_queries.init_app(app)
+
+    # Caching & static assets
+    cache_policy.init_app(app)
+    fragments.init_app(app)
+    assets.init_app(app)
+
+    routes.init_app(app)
+    app.cli.add_command(seed)
+
+    # Compression wraps everything above, so it goes last
+    compression.init_app(app)
+    return app
+
+
+_app = None
+
+
+def __getattr__(name):
+    """`from app import app` / `gunicorn app:app` / `flask --app app`: one app, built on first use."""
+    global _app
+    if name != 'app':
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if _app is None:
+        _app = create_app()
+    return _app
 
 
 # =====================
 # DATABASE INITIALIZATION
 # =====================
+# pg_advisory_lock key held while initialize_database runs
+INIT_LOCK_KEY = 0x6265736867   # "beshg"
+
+
+@contextmanager
+def initialization_lock(app: Flask):
+    """
+    Only one process initializes at a time: a PostgreSQL advisory lock, or a
+    lock file in the instance folder for SQLite (none where fcntl is missing).
+    """
+    if db.engine.dialect.name == 'postgresql':
+        with db.engine.connect() as conn:
+            conn.execute(text('SELECT pg_advisory_lock(:key)'), {'key': INIT_LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': INIT_LOCK_KEY})
+        return
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    os.makedirs(app.instance_path, exist_ok=True)
+    with open(os.path.join(app.instance_path, 'initialize.lock'), 'w') as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
 def initialize_database(app: Flask):
-    """Insert default branch and admin user safely."""
-    with app.app_context():
+    """Create tables and insert the default branches, admin user and categories; safe to re-run."""
+    with app.app_context(), initialization_lock(app):
         db.create_all()
         # Ensure at least one branch exists
         if Branch.query.count() == 0:
@@ -136,10 +263,11 @@ def initialize_database(app: Flask):
 # =====================
 # CALL DATABASE INITIALIZATION
 # =====================
-@app.cli.command("seed")
+# Runs once per deploy (Procfile release step), not on every worker boot
+@click.command("seed")
 def seed():
-    """Seed default branch and admin user."""
-   # initialize_database(app)
+    """Create tables and seed default branches, admin user and categories."""
+    initialize_database(current_app._get_current_object())
     click.echo("Seed complete.")
 # =====================
 # AUTH DECORATORS
@@ -167,15 +295,6 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-@app.after_request
-def add_header(response):
-    """Add headers to prevent caching of sensitive pages"""
-    if 'user_id' in session:
-        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, post-check=0, pre-check=0, max-age=0'
-        response.headers['Pragma'] = 'no-cache'
-        response.headers['Expires'] = '-1'
-    return response
-
 # =====================
 
 # =====================
@@ -183,7 +302,7 @@ def add_header(response):
 # =====================
 
 # ROUTES
-@app.route('/signup', methods=['GET', 'POST'])
+@routes.route('/signup', methods=['GET', 'POST'])
 def signup():
     if request.method == 'POST':
         username = request.form['username']
@@ -267,7 +386,7 @@ def signup():
 
 
 
-@app.route('/login', methods=['GET', 'POST'])
+@routes.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         username_field = request.form['username'] # Can be username, email, or phone
@@ -305,7 +424,7 @@ def login():
     
     return render_template('login.html')
 
-@app.route('/logout')
+@routes.route('/logout')
 def logout():
     session.clear()
     flash('Logged out', 'success')
@@ -313,7 +432,7 @@ def logout():
     response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
     return response
 
-@app.route('/forgot-password', methods=['GET', 'POST'])
+@routes.route('/forgot-password', methods=['GET', 'POST'])
 def forgot_password():
     if request.method == 'POST':
         email = request.form.get('email')
@@ -333,7 +452,7 @@ def forgot_password():
         return redirect(url_for('login'))
     return render_template('forgot_password.html')
 
-@app.route('/reset-password/<token>', methods=['GET', 'POST'])
+@routes.route('/reset-password/<token>', methods=['GET', 'POST'])
 def reset_password(token):
     user = User.query.filter_by(reset_token=token).first()
     if not user or user.reset_token_expiry < datetime.utcnow():
@@ -351,7 +470,7 @@ def reset_password(token):
         
     return render_template('reset_password.html', token=token)
 
-@app.route('/admin/approve-user/<int:user_id>', methods=['POST'])
+@routes.route('/admin/approve-user/<int:user_id>', methods=['POST'])
 @admin_required
 def approve_user(user_id):
     user = User.query.get_or_404(user_id)
@@ -366,7 +485,7 @@ def approve_user(user_id):
     flash(f'User {user.username} approved!', 'success')
     return redirect(url_for('admin_panel'))
 
-@app.route('/admin/deny-user/<int:user_id>', methods=['POST'])
+@routes.route('/admin/deny-user/<int:user_id>', methods=['POST'])
 @admin_required
 def deny_user(user_id):
     user = User.query.get_or_404(user_id)
@@ -384,7 +503,7 @@ def deny_user(user_id):
         
     return redirect(url_for('admin_panel'))
 
-@app.route('/admin/update-role/<int:user_id>', methods=['POST'])
+@routes.route('/admin/update-role/<int:user_id>', methods=['POST'])
 @admin_required
 def update_role(user_id):
     user = User.query.get_or_404(user_id)
@@ -401,13 +520,13 @@ def update_role(user_id):
 
 # Google OAuth handled in auth.py
 
-@app.route('/settings')
+@routes.route('/settings')
 @login_required
 def settings():
     user = User.query.get(session['user_id'])
     return render_template('settings.html', user=user)
 
-@app.route('/api/settings/preferences', methods=['POST'])
+@routes.route('/api/settings/preferences', methods=['POST'])
 @login_required
 def update_preferences():
     """Update user display preferences"""
@@ -426,7 +545,7 @@ def update_preferences():
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 400
 
-@app.route('/api/settings/profile', methods=['POST'])
+@routes.route('/api/settings/profile', methods=['POST'])
 @login_required
 def update_profile():
     """Update user profile information"""
@@ -453,68 +572,40 @@ def update_profile():
 # =====================
 # HTMX SEARCH ROUTES
 # =====================
-@app.route('/api/search/products')
+@routes.route('/api/search/products')
 @login_required
 def search_products_htmx():
     query = request.args.get('q', '').strip()
     category_id = request.args.get('category_id', type=int)
     branch_id = request.args.get('branch_id', type=int)
     
-    products_query = Product.query
-    
-    if query:
-        search_filter = db.or_(
-            Product.name.ilike(f'%{query}%'),
-            Product.local_name.ilike(f'%{query}%'),
-            Product.sku.ilike(f'%{query}%'),
-            Product.barcode.ilike(f'%{query}%'),
-            Product.category.ilike(f'%{query}%'),
-            Product.brand.ilike(f'%{query}%')
-        )
-        products_query = products_query.filter(search_filter)
-    
-    if category_id:
-        products_query = products_query.filter(Product.category_id == category_id)
-    if branch_id:
-        products_query = products_query.filter(Product.branch_id == branch_id)
-        
+    metrics.SEARCHES.inc(kind='products')
+    # category_rel is shown in each row and is part of the cached row's version
+    products_query = Product.query.options(joinedload(Product.category_rel)).filter(
+        *product_filters(query, category_id, branch_id))
     products = products_query.order_by(Product.id.desc()).all()
     return render_template('partials/product_table_rows.html', products=products)
 
-@app.route('/api/search/inventory')
+@routes.route('/api/search/inventory')
 @login_required
 def search_inventory_htmx():
     query = request.args.get('q', '').strip()
     category_id = request.args.get('category_id', type=int)
     branch_id = request.args.get('branch_id', type=int)
     today = datetime.utcnow()
+    metrics.SEARCHES.inc(kind='inventory')
     
-    inventory_query = Inventory.query.join(Product)
-    
-    if query:
-        search_filter = db.or_(
-            Product.name.ilike(f'%{query}%'),
-            Product.local_name.ilike(f'%{query}%'),
-            Product.sku.ilike(f'%{query}%'),
-            Product.barcode.ilike(f'%{query}%'),
-            Inventory.batch_number.ilike(f'%{query}%'),
-            Inventory.extra_info.ilike(f'%{query}%')
-        )
-        inventory_query = inventory_query.filter(search_filter)
-    
-    if category_id:
-        inventory_query = inventory_query.filter(Product.category_id == category_id)
-    if branch_id:
-        inventory_query = inventory_query.filter(Inventory.branch_id == branch_id)
-        
+    inventory_query = Inventory.query.join(Product).options(contains_eager(Inventory.product)).filter(
+        *inventory_filters(query, category_id, branch_id)
+    )
     inventory = inventory_query.order_by(Inventory.id.desc()).all()
     return render_template('partials/inventory_table_rows.html', inventory=inventory, now=today)
 
-@app.route('/help')
+@routes.route('/help')
 def help_page():
     return render_template('help.html')
 
-@app.route('/delete_inventory/<int:id>', methods=['POST'])
+@routes.route('/delete_inventory/<int:id>', methods=['POST'])
 @login_required
 def delete_inventory_form(id):
     item = Inventory.query.get_or_404(id)
@@ -523,77 +614,74 @@ def delete_inventory_form(id):
     flash("Item deleted successfully", "success")
     return redirect(url_for('dashboard'))
 
-@app.route('/')
+@routes.route('/')
 @login_required
 def dashboard():
     today = datetime.utcnow()
 
-    # Expiry ranges (Core Data)
-    expiring_0_90 = Inventory.query.filter(
-        Inventory.expiry_date.between(today, today + timedelta(days=90)),
-        Inventory.quantity_on_hand > 0
-    ).order_by(Inventory.expiry_date).all()
-
-    expiring_180 = Inventory.query.filter(
-        Inventory.expiry_date.between(today + timedelta(days=90), today + timedelta(days=180)),
-        Inventory.quantity_on_hand > 0
-    ).order_by(Inventory.expiry_date).all()
+    # Expiry ranges (Core Data), answered from the in-memory FEFO calendar
+    expiry_calendar.ensure_fresh()
+    expiring_0_90_count, soon_ids = expiry_calendar.window(today, today + timedelta(days=90), limit=10)
+    expiring_180_count, later_ids = expiry_calendar.window(
+        today + timedelta(days=90), today + timedelta(days=180), limit=10
+    )
 
     # Alerts
-    alerts = Alert.query.filter_by(is_read=False).order_by(Alert.created_at.desc()).limit(10).all()
+    alerts = open_alerts_query().filter_by(is_read=False).order_by(Alert.created_at.desc()).limit(10).all()
 
     # FEFO Chart Data 1: Expiry Status Distribution (Pie)
     # Critical (<30d), Warning (30-90d), Safe (90+)
-    critical_count = Inventory.query.filter(
-        Inventory.expiry_date < today + timedelta(days=30),
-        Inventory.quantity_on_hand > 0
-    ).count()
-    
-    warning_count = len(expiring_0_90) - critical_count
-    
-    safe_count = Inventory.query.filter(
-        Inventory.expiry_date > today + timedelta(days=90),
-        Inventory.quantity_on_hand > 0
-    ).count()
+    critical_count = expiry_calendar.window(None, today + timedelta(days=30, microseconds=-1))[0]
+    warning_count = expiring_0_90_count - critical_count
+    safe_count = expiry_calendar.window(today + timedelta(days=90, microseconds=1), None)[0]
 
     expiry_labels = ["Immediate (<30d)", "Soon (30-90d)", "Safe (>90d)"]
     expiry_values = [critical_count, warning_count, safe_count]
 
     # FEFO Chart Data 2: Nearest Expiry Histogram (Bar)
     # Showing days remaining for top 10 items to move first
-    fefo_priority = Inventory.query.filter(
-        Inventory.expiry_date >= today,
-        Inventory.quantity_on_hand > 0
-    ).order_by(Inventory.expiry_date).limit(10).all()
+    fefo_ids = expiry_calendar.next_to_move(10, today)
+
+    # Load only the rows the page actually shows, with their products, in one query
+    shown_ids = set(soon_ids) | set(later_ids) | set(fefo_ids)
+    shown = {}
+    if shown_ids:
+        shown = {inv.id: inv for inv in Inventory.query.options(joinedload(Inventory.product)).filter(
+            Inventory.id.in_(shown_ids)
+        )}
+    expiring_0_90 = [shown[i] for i in soon_ids if i in shown]
+    expiring_180 = [shown[i] for i in later_ids if i in shown]
+    fefo_priority = [shown[i] for i in fefo_ids if i in shown]
 
     fefo_labels = [item.product.name[:12] + '..' if len(item.product.name) > 12 else item.product.name for item in fefo_priority]
     fefo_days = [(item.expiry_date - today).days for item in fefo_priority]
 
-    # Categorical Stock Distribution
-    category_data = db.session.query(
-        Product.category, 
-        db.func.sum(Inventory.quantity_on_hand)
-    ).join(Inventory).group_by(Product.category).all()
-    
-    cat_labels = [c[0] if c[0] else "Uncategorized" for c in category_data]
-    cat_values = [float(c[1]) if c[1] else 0 for c in category_data]
+    # Categorical Stock Distribution (columnar analytics, cached per data version)
+    stock_units = analytics.metrics()['stock-units']
+    cat_labels = stock_units['labels']
+    cat_values = stock_units['data']
 
     user = User.query.get(session['user_id'])
 
-    # Slow Moving Products (6+ Months)
+    # Slow Moving Products (6+ Months): the count, and the oldest few the card lists
     six_months_ago = today - timedelta(days=180)
-    slow_moving = Inventory.query.filter(
+    slow_query = Inventory.query.filter(
         Inventory.entry_date <= six_months_ago,
         Inventory.quantity_on_hand > 0
-    ).order_by(Inventory.entry_date).all()
+    )
+    slow_moving_count = slow_query.count()
+    slow_moving = slow_query.options(joinedload(Inventory.product)).order_by(Inventory.entry_date).limit(8).all()
 
     return render_template(
         'dashboard.html',
         user=user,
         alerts=alerts,
         expiring_0_90=expiring_0_90,
+        expiring_0_90_count=expiring_0_90_count,
         expiring_180=expiring_180,
+        expiring_180_count=expiring_180_count,
         slow_moving=slow_moving,
+        slow_moving_count=slow_moving_count,
         now=today,
         # FEFO Metrics
         expiry_labels=expiry_labels,
@@ -604,7 +692,7 @@ def dashboard():
         cat_values=cat_values
     )
 
-@app.route('/products', methods=['GET', 'POST'])
+@routes.route('/products', methods=['GET', 'POST'])
 @login_required
 def products():
     if request.method == 'POST':
@@ -683,12 +771,12 @@ def products():
         db.session.commit()
         return redirect(url_for('products'))
     
-    products_list = Product.query.order_by(Product.id.desc()).limit(100).all()
+    products_list = Product.query.options(joinedload(Product.category_rel)).order_by(Product.id.desc()).limit(100).all()
     categories = Category.query.all()
     branches = Branch.query.all()
     return render_template('products.html', products=products_list, categories=categories, branches=branches)
 
-@app.route('/inventory', methods=['GET', 'POST'])
+@routes.route('/inventory', methods=['GET', 'POST'])
 @login_required
 def inventory():
     if request.method == 'POST':
@@ -721,7 +809,8 @@ def inventory():
             inv = Inventory.query.filter_by(product_id=product_id, branch_id=branch_id).first()
             
             if inv:
-                inv.quantity_on_hand = quantity
+                # Stock count: recorded in the ledger as the difference it makes
+                ledger.set_quantity(inv, quantity, 'COUNT', user_id=session.get('user_id'))
                 inv.unit_of_measure = request.form.get('unit_of_measure')
                 inv.threshold_min = int(request.form.get('threshold_min', 10))
                 if request.form.get('expiry_date'):
@@ -742,6 +831,8 @@ def inventory():
                     status=request.form.get('status', 'AVAILABLE')
                 )
                 db.session.add(inv)
+                db.session.flush()
+                ledger.opened(inv, 'RECEIPT', user_id=session.get('user_id'))
             
             db.session.commit()
             flash('Inventory updated!', 'success')
@@ -765,14 +856,41 @@ def inventory():
                          selected_product_id=selected_product_id,
                          now=datetime.utcnow())
 
-@app.route('/sales', methods=['GET'])
+@routes.route('/sales', methods=['GET'])
 @login_required
 def sales():
-    sales_list = Sale.query.order_by(Sale.sale_date.desc()).all()
+    sales_list, next_url = _sales_history_page()
     products_list = Product.query.all()
-    return render_template('sales.html', sales=sales_list, products=products_list)
+    branches = Branch.query.all()
+    return render_template('sales.html', sales=sales_list, next_url=next_url,
+                           products=products_list, branches=branches)
+
+def _sales_history_page():
+    """One keyset page of sales for the current ?start=&end=&branch_id=&payment_type=&before= filters"""
+    filters = {k: request.args.get(k) for k in ('start', 'end', 'branch_id', 'payment_type') if request.args.get(k)}
+    try:
+        start = datetime.strptime(filters['start'], '%Y-%m-%d').date() if 'start' in filters else None
+        end = datetime.strptime(filters['end'], '%Y-%m-%d').date() if 'end' in filters else None
+        before = decode_cursor(request.args['before']) if request.args.get('before') else None
+    except ValueError:
+        abort(400)
+    sales_list, next_cursor = sales_history_page(
+        before=before, start=start, end=end,
+        branch_id=request.args.get('branch_id', type=int),
+        payment_type=filters.get('payment_type')
+    )
+    next_url = url_for('sales_history', before=next_cursor, **filters) if next_cursor else None
+    return sales_list, next_url
+
+@routes.route('/api/sales/history')
+@login_required
+def sales_history():
+    """HTMX fragment: the next page of sales history (infinite scroll / filter changes)"""
+    sales_list, next_url = _sales_history_page()
+    return render_template('partials/sales_history.html', sales=sales_list, next_url=next_url,
+                           is_next_page=bool(request.args.get('before')))
 
-@app.route('/sales', methods=['POST'])
+@routes.route('/sales', methods=['POST'])
 @login_required
 def create_sale():
     data = request.get_json()
@@ -783,54 +901,109 @@ def create_sale():
         return jsonify({'success': False, 'error': 'No items in sale'}), 400
         
     try:
-        total_amount = 0
-        sale_items = []
-        
-        for item in items_data:
-            product = Product.query.get(item['product_id'])
-            if not product:
-                continue
-                
-            quantity = int(item['quantity'])
-            # Use unit_price from product as default if not provided
-            price = float(item.get('price', product.unit_price or 0))
-            
-            # Check inventory (branch 1 for now)
-            inv = Inventory.query.filter_by(product_id=product.id, branch_id=1).first()
-            if inv and inv.quantity_on_hand >= quantity:
-                inv.quantity_on_hand -= quantity
-            else:
-                db.session.rollback()
-                return jsonify({'success': False, 'error': f'Insufficient stock for {product.name}'}), 400
-                
-            sale_item = SaleItem(product_id=product.id, quantity=quantity, price=price * quantity)
-            sale_items.append(sale_item)
-            total_amount += price * quantity
-            
-        new_sale = Sale(
+        # Batched lookups + conditional decrements; safe across concurrent workers
+        sale = record_sale(
+            items_data,
             user_id=session.get('user_id'),
             branch_id=1,
-            total_amount=total_amount,
-            payment_type=payment_type,
-            items=sale_items
+            payment_type=payment_type
         )
-        
-        db.session.add(new_sale)
         db.session.commit()
+        metrics.SALES.inc(channel='till')
         
-        return jsonify({'success': True, 'total': total_amount})
+        return jsonify({'success': True, 'total': sale.total_amount})
     except Exception as e:
+        # SaleError (short stock) lands here too; nothing has been committed
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 400
 
 
-@app.route('/search-product', methods=['POST'])
+@routes.route('/api/sales/sync', methods=['POST'])
+@login_required
+def sync_sales_api():
+    """Upload a batch of sales queued by a till while it was offline"""
+    data = request.get_json(silent=True) or {}
+    entries = data.get('sales')
+    
+    if not isinstance(entries, list) or not entries:
+        return jsonify({'success': False, 'error': 'No sales in batch'}), 400
+    if len(entries) > SYNC_MAX_BATCH:
+        return jsonify({'success': False, 'error': f'Batch too large (max {SYNC_MAX_BATCH} sales)'}), 413
+        
+    try:
+        branch_id = int(data.get('branch_id') or 1)
+        results = sync_sales(entries, user_id=session.get('user_id'), branch_id=branch_id)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+        
+    counts = {status: sum(1 for r in results if r['status'] == status)
+              for status in ('created', 'duplicate', 'rejected')}
+    metrics.SALES.inc(counts['created'], channel='sync')
+    return jsonify({'success': True, **counts, 'results': results})
+
+
+# =====================
+# SALES ANALYTICS (rollup-backed)
+# =====================
+def _analytics_range():
+    """Parse ?start=&end= (YYYY-MM-DD); defaults to the last 30 days."""
+    end = request.args.get('end')
+    start = request.args.get('start')
+    end = datetime.strptime(end, '%Y-%m-%d').date() if end else datetime.utcnow().date()
+    start = datetime.strptime(start, '%Y-%m-%d').date() if start else end - timedelta(days=29)
+    return start, end
+
+@routes.route('/api/analytics/revenue')
+@login_required
+def analytics_revenue():
+    """Revenue and sale counts per day and per payment type"""
+    try:
+        start, end = _analytics_range()
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Dates must be YYYY-MM-DD'}), 400
+    branch_id = request.args.get('branch_id', type=int)
+    summary = rollups.revenue_summary(start, end, branch_id)
+    return jsonify({'success': True, 'start': start.isoformat(), 'end': end.isoformat(), **summary})
+
+@routes.route('/api/analytics/valuation')
+@login_required
+def analytics_valuation():
+    """Stock value per snapshot day; ?group_by=category|branch adds a breakdown"""
+    try:
+        start, end = _analytics_range()
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Dates must be YYYY-MM-DD'}), 400
+    days = valuation.history(
+        start, end,
+        branch_id=request.args.get('branch_id', type=int),
+        category=request.args.get('category'),
+        group_by=request.args.get('group_by')
+    )
+    return jsonify({'success': True, 'start': start.isoformat(), 'end': end.isoformat(), 'days': days})
+
+@routes.route('/api/analytics/products')
+@login_required
+def analytics_products():
+    """Top products by revenue (or ?sort=quantity) over a date range"""
+    try:
+        start, end = _analytics_range()
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Dates must be YYYY-MM-DD'}), 400
+    branch_id = request.args.get('branch_id', type=int)
+    limit = min(request.args.get('limit', 20, type=int), 200)
+    products = rollups.product_volume(start, end, branch_id, order_by=request.args.get('sort', 'revenue'), limit=limit)
+    return jsonify({'success': True, 'start': start.isoformat(), 'end': end.isoformat(), 'products': products})
+
+
+@routes.route('/search-product', methods=['POST'])
 @login_required
 def search_product():
     code = request.json.get('code')
     product = Product.query.filter(
         (Product.barcode == code) | (Product.local_code == code)
     ).first()
+    metrics.SCANNER_LOOKUPS.inc(result='found' if product else 'missing')
     
     if product:
         inv = Inventory.query.filter_by(product_id=product.id, branch_id=1).first()
@@ -846,66 +1019,31 @@ def search_product():
     else:
         return jsonify({'success': False, 'error': 'Product not found'}), 404
 
-@app.route('/generate-alerts')
+@routes.route('/generate-alerts')
 @login_required
 def generate_alerts():
-    today = datetime.utcnow()
-    seven_days = today + timedelta(days=7)
-    
-    # Clear old alerts
-    Alert.query.delete()
-    
-    for item in Inventory.query.all():
-        # Low stock alert
-        if item.quantity_on_hand <= item.threshold_min and item.status == 'AVAILABLE':
-            alert = Alert(
-                type='LOW_STOCK',
-                message=f'Low stock: {item.product.name}. Only {item.quantity_on_hand} left.',
-                product_id=item.product_id,
-                branch_id=item.branch_id,
-                quantity=item.quantity_on_hand
-            )
-            db.session.add(alert)
-        
-        # Expiry alerts
-        if item.expiry_date:
-            if item.expiry_date <= seven_days and item.expiry_date > today:
-                days_left = (item.expiry_date - today).days
-                alert = Alert(
-                    type='NEAR_EXPIRY',
-                    message=f'{item.product.name} expires in {days_left} days ({item.quantity_on_hand} units)',
-                    product_id=item.product_id,
-                    branch_id=item.branch_id,
-                    quantity=item.quantity_on_hand,
-                    days_until_expiry=days_left
-                )
-                db.session.add(alert)
-            elif item.expiry_date <= today:
-                item.status = 'EXPIRED'
-                alert = Alert(
-                    type='EXPIRED',
-                    message=f'{item.product.name} has EXPIRED! {item.quantity_on_hand} units need removal.',
-                    product_id=item.product_id,
-                    branch_id=item.branch_id,
-                    quantity=item.quantity_on_hand,
-                    days_until_expiry=0
-                )
-                db.session.add(alert)
-    
-    db.session.commit()
-    flash('Alerts generated!', 'success')
+    # Same bounded, chunked job the background worker runs
+    run = scheduler.run_job('alerts')
+    if run is None:
+        flash('Alerts are already being refreshed by another worker.', 'info')
+    elif run.error:
+        flash(f'Error generating alerts: {run.error}', 'error')
+    elif not run.completed:
+        flash(f'Alerts partially refreshed ({run.rows_scanned} items checked); run again to continue.', 'info')
+    else:
+        flash(f'Alerts refreshed: {run.created_count} new, {run.resolved_count} resolved.', 'success')
     return redirect(url_for('dashboard'))
 
-@app.route('/admin')
+@routes.route('/admin')
 @login_required
 def admin_panel():
     users = User.query.all()
     total_products = Product.query.count()
     total_inventory = db.session.query(db.func.sum(Inventory.quantity_on_hand)).scalar() or 0
-    # We use SaleItem and the 'price' column since that's what you defined
-    total_sales = db.session.query(db.func.sum(SaleItem.price)).scalar() or 0
+    # Read from the daily rollups so this stays cheap as sales history grows
+    total_sales = rollups.total_revenue()
     # Critical alerts for admin
-    critical_alerts = Alert.query.filter_by(is_read=False).order_by(Alert.created_at.desc()).all()
+    critical_alerts = open_alerts_query().filter_by(is_read=False).order_by(Alert.created_at.desc()).all()
     
     return render_template('admin.html',
                          users=users,
@@ -914,10 +1052,59 @@ def admin_panel():
                          total_sales=total_sales,
                          critical_alerts=critical_alerts)
 
-@app.errorhandler(500)
+@routes.route('/api/admin/job-runs')
+@admin_required
+def job_runs_api():
+    """Recent background job runs, for monitoring"""
+    runs = JobRun.query.order_by(JobRun.started_at.desc()).limit(50).all()
+    return jsonify({
+        'success': True,
+        'runs': [{
+            'job': r.job,
+            'owner': r.owner,
+            'started_at': r.started_at.isoformat() if r.started_at else None,
+            'duration_ms': r.duration_ms,
+            'chunks': r.chunks,
+            'rows_scanned': r.rows_scanned,
+            'expired': r.expired_count,
+            'created': r.created_count,
+            'updated': r.updated_count,
+            'resolved': r.resolved_count,
+            'completed': r.completed,
+            'error': r.error
+        } for r in runs]
+    })
+
+@routes.route('/admin/profiler')
+@admin_required
+def profiler_page():
+    """Slowest recent requests with their SQL and template time (this worker only)"""
+    return render_template('admin_profiler.html',
+                         enabled=profiler.is_enabled(),
+                         requests=profiler.slowest())
+
+@routes.route('/admin/slow-queries')
+@admin_required
+def slow_queries_page():
+    """Queries over SLOW_QUERY_MS with their plans, grouped by statement (this worker only)"""
+    return render_template('admin_slow_queries.html',
+                         threshold_ms=current_app.config['SLOW_QUERY_MS'],
+                         statements=slow_queries.by_statement(),
+                         queries=slow_queries.recent(50))
+
+@routes.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape target: bearer METRICS_TOKEN, or an admin session"""
+    token = current_app.config.get('METRICS_TOKEN')
+    authorized = bool(token) and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not authorized and not session.get('is_admin'):
+        abort(403)
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@routes.errorhandler(500)
 def internal_error(error):
     import traceback
-    app.logger.error("Internal Server Error: %s", traceback.format_exc())
+    current_app.logger.error("Internal Server Error: %s", traceback.format_exc())
     return "Internal Server Error: check logs!", 500
 
 
@@ -1028,7 +1215,7 @@ def parse_product_details(text):
 # =====================
 # RUN APP
 # =====================
-@app.route('/import-products', methods=['GET', 'POST'])
+@routes.route('/import-products', methods=['GET', 'POST'])
 @login_required
 def import_products():
     if request.method == 'POST':
@@ -1052,6 +1239,7 @@ def import_products():
                     flash(f"Error reading CSV: {str(e)}", "error")
             elif filename.endswith('.xlsx'):
                 try:
+                    import openpyxl
                     wb = openpyxl.load_workbook(file)
                     sheet = wb.active
                     headers = [str(cell.value).strip() if cell.value is not None else "" for cell in sheet[1]]
@@ -1062,6 +1250,7 @@ def import_products():
                     flash(f"Error parsing XLSX: {str(e)}", "error")
             elif filename.endswith('.xls'):
                 try:
+                    import xlrd
                     wb = xlrd.open_workbook(file_contents=file.read())
                     sheet = wb.sheet_by_index(0)
                     headers = [str(sheet.cell_value(0, col)).strip() for col in range(sheet.ncols)]
@@ -1078,6 +1267,7 @@ def import_products():
                 elif "/export" not in sheet_url:
                     sheet_url = sheet_url.rstrip("/") + "/export?format=csv"
                 try:
+                    import requests
                     response = requests.get(sheet_url)
                     response.raise_for_status()
                     stream = StringIO(response.text)
@@ -1107,6 +1297,7 @@ def import_products():
         added_count = 0
         merged_count = 0
         failed_rows = []
+        import_ref = f"import:{file.filename if file else sheet_url}"[:64]
         
         for i, row in enumerate(imported_data, 1):
             try:
@@ -1173,7 +1364,7 @@ def import_products():
                 # Inventory Handling
                 inv = Inventory.query.filter_by(product_id=product.id, branch_id=1).first()
                 if inv:
-                    inv.quantity_on_hand += stock_qty
+                    ledger.adjust(inv, stock_qty, 'IMPORT', reference=import_ref, user_id=session.get('user_id'))
                     inv.unit_size = parsed["unit_size"] or inv.unit_size
                     inv.unit_measure = parsed["unit_measure"] or inv.unit_measure
                     inv.pack_qty = parsed["pack_qty"] or inv.pack_qty
@@ -1192,6 +1383,8 @@ def import_products():
                         status='AVAILABLE'
                     )
                     db.session.add(inv)
+                    db.session.flush()
+                    ledger.opened(inv, 'IMPORT', reference=import_ref, user_id=session.get('user_id'))
                 
             except Exception as e:
                 db.session.rollback()
@@ -1204,7 +1397,7 @@ def import_products():
         log_filename = None
         if failed_rows:
             log_filename = f"failed_import_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-            log_path = os.path.join(app.root_path, 'temp', log_filename)
+            log_path = os.path.join(current_app.root_path, 'temp', log_filename)
             os.makedirs(os.path.dirname(log_path), exist_ok=True)
             with open(log_path, "w") as f:
                 for failure in failed_rows:
@@ -1223,6 +1416,10 @@ def import_products():
         )
         db.session.add(new_log)
         db.session.commit()
+        metrics.IMPORTS.inc(source='file' if file else 'google_sheet')
+        metrics.IMPORT_ROWS.inc(added_count, result='added')
+        metrics.IMPORT_ROWS.inc(merged_count, result='merged')
+        metrics.IMPORT_ROWS.inc(len(failed_rows), result='failed')
 
         history = ImportLog.query.order_by(ImportLog.created_at.desc()).all()
         return render_template('import_products.html', 
@@ -1235,22 +1432,25 @@ def import_products():
     history = ImportLog.query.order_by(ImportLog.created_at.desc()).all()
     return render_template('import_products.html', history=history)
 
-@app.route('/download-import-log/<filename>')
+@routes.route('/download-import-log/<filename>')
 @login_required
 def download_import_log(filename):
-    log_path = os.path.join(app.root_path, 'temp', filename)
+    log_path = os.path.join(current_app.root_path, 'temp', filename)
     if os.path.exists(log_path):
         return send_file(log_path, as_attachment=True)
     flash("Log file not found", "error")
     return redirect(url_for('import_products'))
 
 
-@app.route('/api/inventory/<int:inventory_id>', methods=['GET'])
+@routes.route('/api/inventory/<int:inventory_id>', methods=['GET'])
 @login_required
 def get_inventory(inventory_id):
-    """Get a single inventory record details"""
+    """Get a single inventory record details (conditional on last_updated)"""
     inv = Inventory.query.get_or_404(inventory_id)
-    return jsonify({
+    unchanged = cache_policy.not_modified('inventory', inv.id, inv.last_updated)
+    if unchanged:
+        return unchanged
+    return cache_policy.with_validators(jsonify({
         'success': True,
         'inventory': {
             'id': inv.id,
@@ -1266,9 +1466,34 @@ def get_inventory(inventory_id):
             'status': inv.status,
             'threshold_min': inv.threshold_min
         }
+    }), 'inventory', inv.id, inv.last_updated)
+
+@routes.route('/api/inventory/<int:inventory_id>/movements')
+@login_required
+def inventory_movements(inventory_id):
+    """Stock ledger for one inventory row, newest first (?before=<movement id> pages back)"""
+    inv = Inventory.query.get_or_404(inventory_id)
+    movements, checkpoint = ledger.history(inventory_id, before_id=request.args.get('before', type=int))
+    return jsonify({
+        'success': True,
+        'quantity_on_hand': inv.quantity_on_hand,
+        'checkpoint': {
+            'quantity': checkpoint.quantity,
+            'folded_count': checkpoint.folded_count,
+            'compacted_through': checkpoint.compacted_through.isoformat() if checkpoint.compacted_through else None
+        } if checkpoint else None,
+        'movements': [{
+            'id': m.id,
+            'delta': m.delta,
+            'reason': m.reason,
+            'reference': m.reference,
+            'user_id': m.user_id,
+            'created_at': m.created_at.isoformat()
+        } for m in movements],
+        'next_before': movements[-1].id if movements else None
     })
 
-@app.route('/api/inventory/<int:inventory_id>', methods=['PUT'])
+@routes.route('/api/inventory/<int:inventory_id>', methods=['PUT'])
 @login_required
 def update_inventory(inventory_id):
     """Update an inventory record via API"""
@@ -1276,7 +1501,8 @@ def update_inventory(inventory_id):
         inv = Inventory.query.get_or_404(inventory_id)
         data = request.get_json()
         
-        inv.quantity_on_hand = data.get('quantity_on_hand', inv.quantity_on_hand)
+        if data.get('quantity_on_hand') is not None:
+            ledger.set_quantity(inv, float(data['quantity_on_hand']), 'ADJUSTMENT', user_id=session.get('user_id'))
         inv.unit_size = data.get('unit_size', inv.unit_size)
         inv.unit_measure = data.get('unit_measure', inv.unit_measure)
         inv.pack_qty = data.get('pack_qty', inv.pack_qty)
@@ -1295,7 +1521,7 @@ def update_inventory(inventory_id):
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 400
 
-@app.route('/api/inventory/<int:inventory_id>', methods=['DELETE'])
+@routes.route('/api/inventory/<int:inventory_id>', methods=['DELETE'])
 @login_required
 def delete_inventory_api(inventory_id):
     """Delete an inventory record via API"""
@@ -1311,7 +1537,7 @@ def delete_inventory_api(inventory_id):
 # =====================
 # PRODUCT API ENDPOINTS
 # =====================
-@app.route('/api/products/<int:product_id>', methods=['PUT'])
+@routes.route('/api/products/<int:product_id>', methods=['PUT'])
 @login_required
 def update_product(product_id):
     """Update a product via API"""
@@ -1396,7 +1622,7 @@ def update_product(product_id):
         return jsonify({'success': False, 'error': str(e)}), 400
 
 
-@app.route('/api/products/<int:product_id>', methods=['DELETE'])
+@routes.route('/api/products/<int:product_id>', methods=['DELETE'])
 @login_required
 def delete_product(product_id):
     """Delete a product via API"""
@@ -1426,12 +1652,15 @@ def delete_product(product_id):
         return jsonify({'success': False, 'error': str(e)}), 400
 
 
-@app.route('/api/products/<int:product_id>', methods=['GET'])
+@routes.route('/api/products/<int:product_id>', methods=['GET'])
 @login_required
 def get_product(product_id):
-    """Get a single product details"""
+    """Get a single product details (conditional on updated_at)"""
     product = Product.query.get_or_404(product_id)
-    return jsonify({
+    unchanged = cache_policy.not_modified('product', product.id, product.updated_at)
+    if unchanged:
+        return unchanged
+    return cache_policy.with_validators(jsonify({
         'success': True,
         'product': {
             'id': product.id,
@@ -1453,43 +1682,46 @@ def get_product(product_id):
             'brand': product.brand,
             'supplier': product.supplier
         }
-    })
+    }), 'product', product.id, product.updated_at)
 
-@app.route('/reports')
+@routes.route('/reports')
 @login_required
 def reports():
-    """Render the advanced reports page."""
-    products = Product.query.all()
-    inventory = Inventory.query.all()
-    
-    # Serialize for frontend Chart.js use
-    import json
-    p_data = [{
-        'id': p.id,
-        'name': p.name,
-        'category': p.category,
-        'brand': p.brand,
-        'supplier': p.supplier,
-        'created_at': p.created_at.isoformat() if p.created_at else None
-    } for p in products]
+    """Render the advanced reports page; charts fetch their series from /api/reports/<name>."""
+    return render_template('reports.html', now=datetime.utcnow())
+
+@routes.route('/api/reports/<name>')
+@login_required
+def report_series_api(name):
+    """One chart series ({labels, data}), aggregated in SQL"""
+    build = report_series.REPORTS.get(name)
+    if build is None:
+        return jsonify({'success': False, 'error': f'Unknown report: {name}'}), 404
+    return jsonify({'success': True, **build()})
+
+@routes.route('/api/export/<dataset>.<fmt>')
+@login_required
+def export_data(dataset, fmt):
+    """Stream products, inventory or sales as CSV/XLSX, filtered like the search endpoints"""
+    build = exports.DATASETS.get(dataset)
+    if build is None or fmt not in ('csv', 'xlsx'):
+        return jsonify({'success': False, 'error': f'Unknown export: {dataset}.{fmt}'}), 404
+    try:
+        headers, stmt = build(request.args)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Dates must be YYYY-MM-DD'}), 400
     
-    i_data = [{
-        'id': i.id,
-        'product_id': i.product_id,
-        'quantity_on_hand': i.quantity_on_hand,
-        'expiry_date': i.expiry_date.isoformat() if i.expiry_date else None,
-        'status': i.status,
-        'batch_number': i.batch_number
-    } for i in inventory]
-
-    return render_template('reports.html', 
-                           products=products, 
-                           inventory=inventory,
-                           products_json=json.dumps(p_data),
-                           inventory_json=json.dumps(i_data),
-                           now=datetime.utcnow())
-
-@app.route('/api/admin/reset-database', methods=['POST'])
+    if fmt == 'csv':
+        body = exports.iter_csv(headers, stmt)
+        mimetype = 'text/csv'
+    else:
+        body = exports.iter_xlsx(headers, stmt, title=dataset.title())
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    filename = f"BeshGebeya_{dataset}_{datetime.utcnow().strftime('%Y%m%d')}.{fmt}"
+    return Response(stream_with_context(body), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@routes.route('/api/admin/reset-database', methods=['POST'])
 @login_required
 def reset_database_api():
     """Destructive action: reset all products and inventory"""
@@ -1500,7 +1732,10 @@ def reset_database_api():
         db.session.query(Inventory).delete()
         db.session.query(Product).delete()
         db.session.query(Alert).delete()
+        db.session.query(StockMovement).delete()
+        db.session.query(StockCheckpoint).delete()
         db.session.commit()
+        expiry_calendar.invalidate()
         return jsonify({'success': True, 'message': 'All product and inventory data has been reset.'})
     except Exception as e:
         db.session.rollback()
@@ -1511,8 +1746,7 @@ def reset_database_api():
 # =====================
 # STARTUP
 # =====================
-with app.app_context():
-    initialize_database(app)
-
 if __name__ == "__main__":
+    app = create_app()
+    initialize_database(app)
     app.run(debug=True)
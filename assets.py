@@ -0,0 +1,246 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import click
+from flask import current_app, url_for
+import cache_policy
+
+# Our own stylesheets and scripts, minified into static/dist under content-hashed names.
+# Third-party libraries under static/vendor are already minified and served as they are.
+BUNDLE = ('css/style.css', 'css/help.css', 'css/settings.css', 'js/main.js')
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+
+_manifests = {}   # manifest path -> (mtime, entries)
+
+
+# =====================
+# MINIFIERS
+# =====================
+# Comments and quoted strings in one alternation, so each is recognised in source
+# order: a quote inside a comment, or `/*` inside a string, is just text
+_CSS_TOKEN = re.compile(r'/\*.*?\*/|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'', re.S)
+
+
+def minify_css(source):
+    """
+    Drop comments and collapse whitespace. Spaces around `{ } ; , >` and after
+    `:` go; spaces before `:` stay (`a :hover` is a descendant selector) and so
+    do the ones inside calc(). Quoted strings are left untouched.
+    """
+    out, code, pos = [], [], 0
+    for match in _CSS_TOKEN.finditer(source):
+        code.append(source[pos:match.start()])
+        pos = match.end()
+        if match.group().startswith('/*'):
+            continue
+        out.append(_minify_css_code(''.join(code)))
+        out.append(match.group())
+        code = []
+    code.append(source[pos:])
+    out.append(_minify_css_code(''.join(code)))
+    return ''.join(out).strip()
+
+
+def _minify_css_code(code):
+    code = re.sub(r'\s+', ' ', code)
+    code = re.sub(r'\s*([{};,>])\s*', r'\1', code)
+    code = re.sub(r':\s+', ':', code)
+    return code.replace(';}', '}')
+
+
+def minify_js(source):
+    """
+    Drop comments, indentation and blank lines. Line breaks are kept so
+    automatic semicolon insertion reads the script exactly as before; string,
+    template and regex literals are copied verbatim.
+    """
+    out, i, n = [], 0, len(source)
+    last = ''   # last significant character written, to tell a regex from a division
+    while i < n:
+        c = source[i]
+        if c in '\'"':
+            end = _skip_string(source, i)
+        elif c == '`':
+            end = _skip_template(source, i)
+        elif source.startswith('//', i):
+            i = source.find('\n', i)
+            i = n if i < 0 else i
+            continue
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            end = n if end < 0 else end + 2
+            out.append('\n' if '\n' in source[i:end] else ' ')
+            i = end
+            continue
+        elif c == '/' and (not last or last in '(,=:[!&|?{};+-*%<>~^\n' or _ends_with_keyword(out)):
+            end = _skip_regex(source, i)
+        else:
+            out.append(c)
+            if not c.isspace():
+                last = c
+            i += 1
+            continue
+        out.append(source[i:end])
+        last = source[end - 1]
+        i = end
+    lines = (line.strip() for line in ''.join(out).split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def _ends_with_keyword(out):
+    tail = ''.join(out[-12:]).rstrip()
+    return re.search(r'(?:^|[^\w$])(?:return|typeof|case|do|else|in|of|void|yield|await)$', tail) is not None
+
+
+def _skip_string(source, i):
+    quote, i = source[i], i + 1
+    while i < len(source) and source[i] != quote:
+        i += 2 if source[i] == '\\' else 1
+    return i + 1
+
+
+def _skip_regex(source, i):
+    i, in_class = i + 1, False
+    while i < len(source):
+        c = source[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == '[':
+            in_class = True
+        elif c == ']':
+            in_class = False
+        elif c == '/' and not in_class:
+            break
+        i += 1
+    i += 1
+    while i < len(source) and source[i].isalpha():   # flags
+        i += 1
+    return i
+
+
+def _skip_template(source, i):
+    i += 1
+    while i < len(source):
+        c = source[i]
+        if c == '\\':
+            i += 2
+        elif c == '`':
+            return i + 1
+        elif source.startswith('${', i):
+            i = _skip_expression(source, i + 2)
+        else:
+            i += 1
+    return i
+
+
+def _skip_expression(source, i):
+    """End of a template's ${...}, which may hold strings, braces and nested templates."""
+    depth = 1
+    while i < len(source):
+        c = source[i]
+        if c in '\'"':
+            i = _skip_string(source, i)
+        elif c == '`':
+            i = _skip_template(source, i)
+        else:
+            depth += {'{': 1, '}': -1}.get(c, 0)
+            i += 1
+            if depth == 0:
+                return i
+    return i
+
+
+# =====================
+# BUILD
+# =====================
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def build(app):
+    """
+    Minify every BUNDLE file into static/dist/<path>/<name>.<hash>.<ext> and
+    write the manifest mapping source names to built ones. Previous builds are
+    removed. Returns the manifest.
+    """
+    dist = os.path.join(app.static_folder, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+    manifest = {}
+    for filename in BUNDLE:
+        with open(os.path.join(app.static_folder, filename), 'rb') as fh:
+            source = fh.read()
+        minify = minify_css if filename.endswith('.css') else minify_js
+        built = minify(source.decode('utf-8')).encode('utf-8')
+        stem, ext = os.path.splitext(filename)
+        target = f'{DIST_DIR}/{stem}.{_digest(built)}{ext}'
+        os.makedirs(os.path.dirname(os.path.join(app.static_folder, target)), exist_ok=True)
+        with open(os.path.join(app.static_folder, target), 'wb') as fh:
+            fh.write(built)
+        manifest[filename] = {'file': target, 'source': _digest(source),
+                              'bytes': len(source), 'built_bytes': len(built)}
+    with open(os.path.join(dist, MANIFEST), 'w') as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+    return manifest
+
+
+def is_stale(app):
+    """True when there is no build, or a BUNDLE source has changed since the last one."""
+    entries = manifest(app)
+    return any(filename not in entries or entries[filename]['source'] != cache_policy.fingerprint(app, filename)
+               for filename in BUNDLE)
+
+
+def ensure_built(app):
+    """Build the bundle unless the current one still matches every source; returns whether it built."""
+    if not is_stale(app):
+        return False
+    build(app)
+    return True
+
+
+def manifest(app):
+    """The current build's manifest, re-read whenever it changes on disk; {} before the first build."""
+    path = os.path.join(app.static_folder, DIST_DIR, MANIFEST)
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return {}
+    cached = _manifests.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path) as fh:
+        entries = json.load(fh)
+    _manifests[path] = (mtime, entries)
+    return entries
+
+
+# =====================
+# URLS
+# =====================
+def asset_url(filename, **values):
+    """
+    url_for('static', filename=...) that serves the built, hashed copy of a
+    BUNDLE file. A source edited since the last build (or never built) is
+    served as it is, so a stale bundle never outlives the edit.
+    """
+    app = current_app._get_current_object()
+    entry = manifest(app).get(filename)
+    if entry and entry['source'] == cache_policy.fingerprint(app, filename):
+        filename = entry['file']
+    return url_for('static', filename=filename, **values)
+
+
+@click.command('build-assets')
+def build_assets_command():
+    """Minify the stylesheets and scripts into static/dist with content-hashed names."""
+    for source, entry in sorted(build(current_app).items()):
+        click.echo(f"{source} -> {entry['file']} ({entry['bytes']} -> {entry['built_bytes']} bytes)")
+
+
+def init_app(app):
+    app.add_template_global(asset_url)
+    app.cli.add_command(build_assets_command)
@@ -0,0 +1,132 @@
+"""
+Report metrics three ways: columnar (analytics.py), SQL GROUP BY, and ORM loops.
+
+    python benchmarks/bench_analytics.py --rows 100000 [--json results.json]
+
+Times stock value by category, ageing, expiry-risk value and sell-through.
+Columnar is timed cold (load + compute) and warm (data version check and
+cache hit). The SQL variant uses SQLite's julianday().
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from seed import open_app, seed
+
+
+def sql_metrics(today):
+    from sqlalchemy import func, case
+    from database import db
+    from models import Product, Inventory, Sale, SaleItem
+    from analytics import AGEING_EDGES, EXPIRY_RISK_DAYS, SELL_THROUGH_DAYS
+
+    now = datetime.combine(today, datetime.min.time())
+    category = func.coalesce(Product.category, 'Uncategorized')
+    value = Inventory.quantity_on_hand * Product.unit_price
+    base = db.session.query(category).join(Inventory, Inventory.product_id == Product.id).group_by(category)
+    units = base.add_columns(func.sum(Inventory.quantity_on_hand), func.sum(value)).all()
+
+    age = func.julianday(func.date(now)) - func.julianday(func.date(Inventory.entry_date))
+    bucket = case(*[(age <= edge, i) for i, edge in enumerate(AGEING_EDGES)], else_=len(AGEING_EDGES))
+    ageing = db.session.query(bucket, func.sum(value)).join(Product, Product.id == Inventory.product_id).filter(
+        Inventory.entry_date.isnot(None)
+    ).group_by(bucket).all()
+
+    days_left = func.julianday(func.date(Inventory.expiry_date)) - func.julianday(func.date(now))
+    risk = base.add_columns(
+        func.sum(case(((days_left >= 0) & (days_left <= EXPIRY_RISK_DAYS), value), else_=0)),
+        func.sum(case((days_left < 0, value), else_=0))
+    ).filter(Inventory.expiry_date.isnot(None), Inventory.quantity_on_hand > 0).all()
+
+    sold = db.session.query(category, func.sum(SaleItem.quantity)).join(
+        SaleItem, SaleItem.product_id == Product.id
+    ).join(Sale, Sale.id == SaleItem.sale_id).filter(
+        Sale.sale_date >= now - timedelta(days=SELL_THROUGH_DAYS)
+    ).group_by(category).all()
+    return units, ageing, risk, sold
+
+
+def orm_metrics(today):
+    from sqlalchemy.orm import joinedload
+    from models import Inventory, Sale, SaleItem
+    from analytics import AGEING_EDGES, EXPIRY_RISK_DAYS, SELL_THROUGH_DAYS
+
+    now = datetime.combine(today, datetime.min.time())
+    units, value, ageing = defaultdict(float), defaultdict(float), defaultdict(float)
+    risk, lost, sold = defaultdict(float), defaultdict(float), defaultdict(float)
+    for inv in Inventory.query.options(joinedload(Inventory.product)).all():
+        if not inv.product:
+            continue
+        category = inv.product.category or 'Uncategorized'
+        qty = inv.quantity_on_hand or 0
+        amount = qty * (inv.product.unit_price or 0)
+        units[category] += qty
+        value[category] += amount
+        if inv.entry_date:
+            age = (today - inv.entry_date.date()).days
+            ageing[next((i for i, edge in enumerate(AGEING_EDGES) if age <= edge), len(AGEING_EDGES))] += amount
+        if inv.expiry_date and qty > 0:
+            left = (inv.expiry_date.date() - today).days
+            if 0 <= left <= EXPIRY_RISK_DAYS:
+                risk[category] += amount
+            elif left < 0:
+                lost[category] += amount
+    for item in SaleItem.query.join(Sale).options(joinedload(SaleItem.product)).filter(
+        Sale.sale_date >= now - timedelta(days=SELL_THROUGH_DAYS)
+    ):
+        if item.product:
+            sold[item.product.category or 'Uncategorized'] += item.quantity or 0
+    return units, value, ageing, risk, lost, sold
+
+
+def _time(fn, repeat):
+    from database import db
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+        db.session.expunge_all()
+    return round(statistics.median(samples) * 1000, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--db', default=None, help='SQLite file (default: /tmp/beshgebeya-bench-<rows>.db)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='Write results to this file')
+    args = parser.parse_args()
+
+    app = open_app(args.db or f'/tmp/beshgebeya-bench-{args.rows}.db')
+    with app.app_context():
+        seed(args.rows)
+        import analytics
+        today = datetime.utcnow().date()
+
+        def cold():
+            analytics.invalidate()
+            analytics.metrics(today)
+
+        results = {
+            'columnar_cold_ms': _time(cold, args.repeat),
+            'columnar_warm_ms': _time(lambda: analytics.metrics(today), args.repeat),
+            'sql_ms': _time(lambda: sql_metrics(today), args.repeat),
+            'orm_ms': _time(lambda: orm_metrics(today), args.repeat),
+        }
+
+    for name, ms in results.items():
+        print(f'{name:<18} {ms:>10.1f} ms')
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({'rows': args.rows, **results}, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
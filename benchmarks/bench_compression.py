@@ -0,0 +1,105 @@
+"""
+Bytes on the wire and compression CPU per response, identity vs gzip vs brotli.
+
+    python benchmarks/bench_compression.py --rows 10000 [--json compression.json]
+
+Each path is fetched in-process as the seeded admin, once per encoding,
+through the compression middleware. `*_bytes` is the body actually sent;
+`*_ms` is the CPU time (median of --repeat) to compress the identity body
+with the middleware's own encoders and levels. The streamed export is
+compressed chunk by chunk, as the app yields it, exactly as it is served.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from seed import open_app, seed
+import compression
+
+ADMIN = {'username': 'admin', 'password': 'admin123'}
+PATHS = [
+    '/',
+    '/products',
+    '/api/search/products?q=Product+1',
+    '/api/search/inventory?q=Product+1',
+    '/reports',
+    '/api/reports/top-products',
+    '/api/reports/expiry',
+    '/static/css/style.css',
+    '/static/js/main.js',
+    '/static/vendor/chart/chart.umd.min.js',
+    '/api/export/inventory.csv',
+]
+
+
+def _cpu_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.process_time()
+        fn()
+        samples.append(time.process_time() - started)
+    return round(statistics.median(samples) * 1000, 2)
+
+
+def _streamed(middleware, encoding, level, chunks):
+    return b''.join(middleware._stream(iter(chunks), compression.encoder(encoding, level)))
+
+
+def measure(client, middleware, path, repeat):
+    identity = client.get(path, buffered=False)
+    chunks = [bytes(c) for c in identity.response]
+    identity.close()
+    body = b''.join(chunks)
+    streamed = 'Content-Length' not in identity.headers
+    static = path.startswith('/static/')
+    result = {'path': path, 'status': identity.status_code, 'streamed': streamed, 'identity_bytes': len(body)}
+
+    for encoding in middleware.encodings:
+        response = client.get(path, headers={'Accept-Encoding': encoding})
+        result[f'{encoding}_bytes'] = len(response.data)
+        result[f'{encoding}_applied'] = response.headers.get('Content-Encoding') == encoding
+        level = (middleware.static_levels if static else middleware.levels)[encoding]
+        if streamed:
+            result[f'{encoding}_ms'] = _cpu_ms(lambda: _streamed(middleware, encoding, level, chunks), repeat)
+        else:
+            result[f'{encoding}_ms'] = _cpu_ms(lambda: compression.compress(encoding, level, body), repeat)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--db', default=None, help='SQLite file (default: /tmp/beshgebeya-bench-<rows>.db)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', help='Write results to this file')
+    args = parser.parse_args()
+
+    app = open_app(args.db or f'/tmp/beshgebeya-bench-{args.rows}.db')
+    with app.app_context():
+        seed(args.rows)
+
+    middleware = app.wsgi_app
+    while not isinstance(middleware, compression.CompressionMiddleware):
+        middleware = middleware.wsgi_app   # fails loudly when COMPRESS_ENABLED is off
+    client = app.test_client()
+    client.post('/login', data=ADMIN)
+
+    results = [measure(client, middleware, path, args.repeat) for path in PATHS]
+    for r in results:
+        line = f"{r['path']:<40} {r['identity_bytes']:>10} B"
+        for encoding in middleware.encodings:
+            ratio = r[f'{encoding}_bytes'] / r['identity_bytes'] if r['identity_bytes'] else 1
+            line += f"  {encoding} {r[f'{encoding}_bytes']:>9} B ({ratio:>5.1%}) {r[f'{encoding}_ms']:>7.2f} ms"
+        print(line + ('  [streamed]' if r['streamed'] else ''))
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({'rows': args.rows, 'min_size': middleware.min_size, 'levels': middleware.levels,
+                       'static_levels': middleware.static_levels, 'results': results}, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+Mixed read/write load under each engine profile (ENGINE_PROFILE=stock vs tuned).
+
+    python benchmarks/bench_engine.py --rows 100000 --readers 6 --writers 2 --duration 15 [--json engine.json]
+
+For each profile a fresh copy of the seeded SQLite file is served by
+gunicorn (gunicorn.conf.py, --workers x --threads). Reader threads cycle
+through barcode scans, inventory search, the products page and the
+dashboard while writer threads post one-line sales, all at once for
+--duration seconds. Latency percentiles and HTTP statuses are reported per
+side: `5xx` on the write side are mostly "database is locked". The copy
+starts in rollback-journal mode; the tuned profile switches it to WAL on
+its first connection.
+"""
+import argparse
+import itertools
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from seed import ROOT
+from bench_http import SCENARIOS, _free_port, _percentile, _sellable, _wait_until_up, login
+
+READS = ('scan', 'search-inventory', 'products', 'dashboard')
+WRITES = ('sale',)
+PROFILES = ('stock', 'tuned')
+
+
+def prepare(db_path, profile):
+    """Copy of db_path for one profile, back in rollback-journal mode like a never-tuned file."""
+    with sqlite3.connect(db_path) as conn:
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        conn.execute('PRAGMA journal_mode = DELETE')
+    copy = db_path.replace('.db', f'-{profile}.db')
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(copy + suffix):
+            os.remove(copy + suffix)
+    shutil.copyfile(db_path, copy)
+    return copy
+
+
+def start(db_path, profile, workers, threads):
+    port = _free_port()
+    env = {**os.environ, 'DATABASE_URL': 'sqlite:///' + os.path.abspath(db_path), 'SCHEDULER_ENABLED': '0',
+           'ENGINE_PROFILE': profile, 'WEB_CONCURRENCY': str(workers), 'GUNICORN_THREADS': str(threads),
+           'GUNICORN_TIMEOUT': '300'}
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                                '--bind', f'127.0.0.1:{port}'], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        _wait_until_up(base_url)
+    except Exception:
+        process.kill()
+        raise
+    return process, base_url
+
+
+def _summary(latencies, statuses, errors, elapsed):
+    ordered = sorted(latencies)
+    return {
+        'requests': len(ordered), 'errors': len(errors),
+        'statuses': {str(k): v for k, v in sorted(statuses.items())},
+        'server_errors': sum(v for k, v in statuses.items() if k >= 500),
+        'rps': round(len(ordered) / elapsed, 1),
+        'p50_ms': round(_percentile(ordered, 0.50), 1) if ordered else None,
+        'p95_ms': round(_percentile(ordered, 0.95), 1) if ordered else None,
+        'p99_ms': round(_percentile(ordered, 0.99), 1) if ordered else None,
+        'max_ms': round(ordered[-1], 1) if ordered else None,
+    }
+
+
+def run_mixed(base_url, data, readers, writers, duration, timeout):
+    sides = {'read': ([], {}, []), 'write': ([], {}, [])}
+    lock = threading.Lock()
+    clients = [('read', login(base_url), READS) for _ in range(readers)]
+    clients += [('write', login(base_url), WRITES) for _ in range(writers)]
+    deadline = time.monotonic() + duration
+
+    def worker(side, client, names):
+        latencies, statuses, errors = sides[side]
+        for name in itertools.cycle(names):
+            if time.monotonic() >= deadline:
+                return
+            method, path, kwargs = SCENARIOS[name](data)
+            started = time.perf_counter()
+            try:
+                response = client.request(method, base_url + path, timeout=timeout, allow_redirects=False, **kwargs)
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            except requests.RequestException as e:
+                with lock:
+                    errors.append(type(e).__name__)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, args=client) for client in clients]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+    return {side: _summary(*values, elapsed) for side, values in sides.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--db', default=None, help='SQLite file (default: /tmp/beshgebeya-bench-<rows>.db)')
+    parser.add_argument('--profile', action='append', choices=PROFILES, help='Run only these (repeatable)')
+    parser.add_argument('--readers', type=int, default=6, help='Concurrent reading client threads')
+    parser.add_argument('--writers', type=int, default=2, help='Concurrent selling client threads')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn threads per worker')
+    parser.add_argument('--duration', type=float, default=15, help='Seconds per profile')
+    parser.add_argument('--timeout', type=float, default=60, help='Per-request timeout in seconds')
+    parser.add_argument('--json', help='Write results to this file')
+    args = parser.parse_args()
+    db_path = args.db or f'/tmp/beshgebeya-bench-{args.rows}.db'
+    subprocess.run([sys.executable, os.path.join(ROOT, 'benchmarks', 'seed.py'), '--rows', str(args.rows),
+                    '--db', db_path], check=True, stdout=subprocess.DEVNULL)
+
+    results = []
+    for profile in args.profile or PROFILES:
+        copy = prepare(db_path, profile)
+        data = {'rows': args.rows, 'sellable': _sellable(copy)}
+        process, base_url = start(copy, profile, args.workers, args.threads)
+        try:
+            result = run_mixed(base_url, data, args.readers, args.writers, args.duration, args.timeout)
+        finally:
+            process.terminate()
+            process.wait()
+        results.append({'profile': profile, **result})
+        for side in ('read', 'write'):
+            r = result[side]
+            print(f"{profile:<6} {side:<5} {r['rps']:>8.1f} req/s  p50 {r['p50_ms'] or 0:>8.1f}  "
+                  f"p95 {r['p95_ms'] or 0:>8.1f}  p99 {r['p99_ms'] or 0:>8.1f} ms  "
+                  f"5xx {r['server_errors']}  errors {r['errors']}")
+
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({'rows': args.rows, 'readers': args.readers, 'writers': args.writers,
+                       'workers': args.workers, 'threads': args.threads, 'duration_s': args.duration,
+                       'results': results}, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Export throughput and peak memory, streamed vs. the old load-everything path.
+
+    python benchmarks/bench_export.py --rows 1000000 [--json results.json]
+
+Each case runs in a fresh subprocess so its peak RSS is its own. `legacy`
+reproduces what /reports used to do: load every inventory row as an ORM
+object and json.dumps the lot.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from seed import open_app, seed
+
+CASES = [('inventory', 'csv'), ('inventory', 'xlsx'), ('products', 'csv'), ('sales', 'csv'), ('inventory', 'legacy')]
+
+
+def _rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_case(db_path, dataset, fmt):
+    app = open_app(db_path)
+    from database import db
+    from models import User, Inventory, Product, SaleItem
+
+    with app.app_context():
+        admin = User.query.filter_by(username='admin').first()
+        baseline = _rss_mb()
+        started = time.perf_counter()
+        size = 0
+        if fmt == 'legacy':
+            inventory = Inventory.query.all()
+            size = len(json.dumps([{
+                'id': i.id, 'product_id': i.product_id, 'quantity_on_hand': i.quantity_on_hand,
+                'expiry_date': i.expiry_date.isoformat() if i.expiry_date else None,
+                'status': i.status, 'batch_number': i.batch_number
+            } for i in inventory]))
+            rows = len(inventory)
+        else:
+            client = app.test_client()
+            with client.session_transaction() as sess:
+                sess['user_id'] = admin.id
+                sess['username'] = admin.username
+                sess['is_admin'] = True
+            response = client.get(f'/api/export/{dataset}.{fmt}')
+            for chunk in response.response:
+                size += len(chunk)
+            response.close()
+            model = {'inventory': Inventory, 'products': Product, 'sales': SaleItem}[dataset]
+            rows = db.session.query(db.func.count(model.id)).scalar()
+        elapsed = time.perf_counter() - started
+
+    return {
+        'case': f'{dataset}.{fmt}', 'rows': rows, 'bytes': size, 'seconds': round(elapsed, 2),
+        'rows_per_s': round(rows / elapsed),
+        'peak_rss_mb': round(_rss_mb(), 1), 'rss_growth_mb': round(_rss_mb() - baseline, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--db', default=None, help='SQLite file (default: /tmp/beshgebeya-bench-<rows>.db)')
+    parser.add_argument('--json', help='Write results to this file')
+    parser.add_argument('--case', nargs=2, metavar=('DATASET', 'FORMAT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    db_path = args.db or f'/tmp/beshgebeya-bench-{args.rows}.db'
+
+    if args.case:
+        print(json.dumps(run_case(db_path, *args.case)))
+        return
+
+    app = open_app(db_path)
+    with app.app_context():
+        seed(args.rows)
+
+    results = []
+    for dataset, fmt in CASES:
+        out = subprocess.run(
+            [sys.executable, __file__, '--db', db_path, '--case', dataset, fmt],
+            check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        results.append(result)
+        print(f"{result['case']:<18} {result['seconds']:>8.2f}s  {result['bytes'] / 1e6:>8.1f} MB  "
+              f"{result['rows_per_s']:>9} rows/s  peak {result['peak_rss_mb']:>7.1f} MB "
+              f"(+{result['rss_growth_mb']:.1f})")
+
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({'rows': args.rows, 'results': results}, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
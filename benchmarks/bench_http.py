@@ -0,0 +1,244 @@
+"""
+HTTP throughput and tail latency of the main pages over seeded databases.
+
+    python benchmarks/bench_http.py --rows 1000 100000 1000000 --clients 8 --duration 10 --json http.json
+    python benchmarks/bench_http.py --rows 100000 --server gunicorn --workers 2 --scenario search-products
+
+Each database size is seeded with seed.py and served by its own process:
+either a threaded Werkzeug server inside a subprocess (`inprocess`, the
+default) or a local gunicorn. Every client thread logs in through POST
+/login as the seeded admin and then sends back-to-back requests for
+`--duration` seconds per scenario. A scenario whose warm-up request fails
+or times out is reported as skipped rather than hammered.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from seed import ROOT, barcode, open_app
+
+ADMIN = {'username': 'admin', 'password': 'admin123'}
+
+
+def _pick(data):
+    return random.randint(1, data['rows'])
+
+
+def _sellable(db_path):
+    """Products with stock at branch 1, the branch POST /sales sells from."""
+    with sqlite3.connect(db_path) as conn:
+        return [pid for (pid,) in conn.execute(
+            'SELECT product_id FROM inventory WHERE branch_id = 1 AND quantity_on_hand >= 1')]
+
+
+# Scenario name -> (method, path, request kwargs) built from the seeded data
+SCENARIOS = {
+    'dashboard': lambda data: ('GET', '/', {}),
+    'products': lambda data: ('GET', '/products', {}),
+    'inventory': lambda data: ('GET', '/inventory', {}),
+    'search-products': lambda data: ('GET', '/api/search/products', {'params': {'q': f'Product {_pick(data)}'}}),
+    'search-inventory': lambda data: ('GET', '/api/search/inventory', {'params': {'q': f'Product {_pick(data)}'}}),
+    'scan': lambda data: ('POST', '/search-product', {'json': {'code': barcode(_pick(data))}}),
+    'sale': lambda data: ('POST', '/sales', {'json': {'items': [
+        {'product_id': random.choice(data['sellable']), 'quantity': 1}]}}),
+    'reports': lambda data: ('GET', '/reports', {}),
+}
+
+
+# =====================
+# SERVERS
+# =====================
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_up(base_url, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(base_url + '/login', timeout=5)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server at {base_url} did not come up')
+
+
+def serve_inprocess(db_path, port):
+    """Entry point of the `--serve` subprocess: a threaded Werkzeug server over db_path."""
+    from werkzeug.serving import make_server
+    app = open_app(db_path)
+    make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+
+
+def start_server(args, db_path):
+    port = _free_port()
+    env = {**os.environ, 'DATABASE_URL': 'sqlite:///' + os.path.abspath(db_path), 'SCHEDULER_ENABLED': '0'}
+    if args.server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', 'app:app', '--bind', f'127.0.0.1:{port}',
+                   '--workers', str(args.workers), '--threads', str(args.threads), '--timeout', '300']
+    else:
+        command = [sys.executable, os.path.abspath(__file__), '--serve', db_path, str(port)]
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        _wait_until_up(base_url)
+    except Exception:
+        process.kill()
+        raise
+    return process, base_url
+
+
+# =====================
+# CLIENTS
+# =====================
+def login(base_url):
+    client = requests.Session()
+    response = client.post(base_url + '/login', data=ADMIN, allow_redirects=False, timeout=30)
+    if response.status_code != 302 or 'session' not in client.cookies:
+        raise RuntimeError(f'login failed: HTTP {response.status_code}')
+    return client
+
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))] if ordered else None
+
+
+def run_scenario(clients, base_url, name, data, duration, timeout):
+    method, path, kwargs = SCENARIOS[name](data)
+    try:
+        warm = clients[0].request(method, base_url + path, timeout=timeout, allow_redirects=False, **kwargs)
+        if warm.status_code >= 500:
+            return {'scenario': name, 'skipped': f'warm-up returned HTTP {warm.status_code}'}
+    except requests.RequestException as e:
+        return {'scenario': name, 'skipped': f'warm-up failed: {type(e).__name__}'}
+
+    latencies, statuses, errors = [], {}, []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker(client):
+        while time.monotonic() < deadline:
+            method, path, kwargs = SCENARIOS[name](data)
+            started = time.perf_counter()
+            try:
+                response = client.request(method, base_url + path, timeout=timeout, allow_redirects=False, **kwargs)
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            except requests.RequestException as e:
+                with lock:
+                    errors.append(type(e).__name__)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(c,)) for c in clients]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+
+    ordered = sorted(latencies)
+    return {
+        'scenario': name, 'method': method, 'path': path,
+        'requests': len(ordered), 'errors': len(errors),
+        'statuses': {str(k): v for k, v in sorted(statuses.items())},
+        'rps': round(len(ordered) / elapsed, 1),
+        'p50_ms': round(_percentile(ordered, 0.50), 1) if ordered else None,
+        'p95_ms': round(_percentile(ordered, 0.95), 1) if ordered else None,
+        'p99_ms': round(_percentile(ordered, 0.99), 1) if ordered else None,
+        'max_ms': round(ordered[-1], 1) if ordered else None,
+    }
+
+
+def run_size(args, rows):
+    db_path = args.db or f'/tmp/beshgebeya-bench-{rows}.db'
+    # Seed in a child process: the app binds DATABASE_URL once, at import
+    subprocess.run([sys.executable, os.path.join(ROOT, 'benchmarks', 'seed.py'), '--rows', str(rows), '--db', db_path],
+                   check=True, stdout=subprocess.DEVNULL)
+    data = {'rows': rows, 'sellable': _sellable(db_path)}
+    process, base_url = start_server(args, db_path)
+    try:
+        clients = [login(base_url) for _ in range(args.clients)]
+        results = []
+        for name in args.scenario or list(SCENARIOS):
+            result = run_scenario(clients, base_url, name, data, args.duration, args.timeout)
+            result['rows'] = rows
+            if process.poll() is not None:
+                # Killed under load (typically out of memory): note it and carry on with a fresh server
+                result['server_exit_code'] = process.returncode
+                print(f"{rows:>8} {name:<17} server exited with code {process.returncode}; restarting")
+                process, base_url = start_server(args, db_path)
+                clients = [login(base_url) for _ in range(args.clients)]
+            results.append(result)
+            if 'skipped' in result:
+                print(f"{rows:>8} {name:<17} skipped: {result['skipped']}")
+            elif not result['requests']:
+                print(f"{rows:>8} {name:<17} no request completed, errors {result['errors']}")
+            else:
+                print(f"{rows:>8} {name:<17} {result['rps']:>8.1f} req/s  p50 {result['p50_ms']:>8.1f}  "
+                      f"p95 {result['p95_ms']:>8.1f}  p99 {result['p99_ms']:>8.1f} ms  "
+                      f"errors {result['errors']}  {result['statuses']}")
+        return results
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def _revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--db', default=None, help='SQLite file (default: /tmp/beshgebeya-bench-<rows>.db)')
+    parser.add_argument('--server', choices=['inprocess', 'gunicorn'], default='inprocess')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn threads per worker')
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent client threads')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per scenario')
+    parser.add_argument('--timeout', type=float, default=60, help='Per-request timeout in seconds')
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS), help='Run only these (repeatable)')
+    parser.add_argument('--json', help='Write results to this file')
+    parser.add_argument('--serve', nargs=2, metavar=('DB', 'PORT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve_inprocess(args.serve[0], int(args.serve[1]))
+        return
+
+    results = []
+    for rows in args.rows:
+        results.extend(run_size(args, rows))
+
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({
+                'revision': _revision(), 'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+                'python': platform.python_version(), 'cpus': os.cpu_count(),
+                'server': args.server, 'workers': args.workers if args.server == 'gunicorn' else None,
+                'clients': args.clients, 'duration_s': args.duration, 'results': results
+            }, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
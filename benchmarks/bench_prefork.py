@@ -0,0 +1,179 @@
+"""
+Memory per gunicorn worker and first-request latency, preloaded and warmed vs not.
+
+    python benchmarks/bench_prefork.py --rows 100000 [--workers 4] [--json prefork.json]
+
+Gunicorn runs with gunicorn.conf.py twice: as configured (app built and
+warmed in the master before fork) and with GUNICORN_PRELOAD=0 (every
+worker imports the app itself). Memory is read from /proc/<pid>/smaps_rollup
+for each worker after boot and again after the paths below have been
+requested --repeat times: `pss` counts shared pages split among the
+processes mapping them, `private` the pages a worker holds alone.
+Latency runs a separate one-worker server so every request lands on the
+same process: `first_ms` is the first request for each path after boot,
+`warm_ms` the median of the --repeat requests after it. Linux only.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from seed import ROOT
+from bench_http import _free_port
+
+ADMIN = {'username': 'admin', 'password': 'admin123'}
+PATHS = [
+    '/',
+    '/products',
+    '/reports',
+    '/api/reports/expiry',
+    '/api/reports/top-products',
+    '/api/search/products?q=Product+1',
+    '/api/search/inventory?q=Product+1',
+]
+MODES = {'preload': '1', 'no-preload': '0'}
+
+
+# =====================
+# SERVER
+# =====================
+def start(db_path, preload, workers, timeout=120):
+    port = _free_port()
+    env = {**os.environ, 'DATABASE_URL': 'sqlite:///' + os.path.abspath(db_path), 'SCHEDULER_ENABLED': '0',
+           'GUNICORN_PRELOAD': preload, 'WEB_CONCURRENCY': str(workers)}
+    env.pop('METRICS_DIR', None)
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                                '--bind', f'127.0.0.1:{port}'], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f'http://127.0.0.1:{port}'
+    while time.perf_counter() - started < timeout:
+        try:
+            requests.get(base + '/login', timeout=5)
+            break
+        except requests.ConnectionError:
+            time.sleep(0.01)
+    else:
+        process.kill()
+        raise RuntimeError('gunicorn did not answer')
+    boot = time.perf_counter() - started
+    # The first answer comes from whichever worker is up first: wait for all of them
+    while len(worker_pids(process.pid)) < workers:
+        time.sleep(0.05)
+    return process, base, boot
+
+
+def stop(process):
+    process.terminate()
+    process.wait()
+
+
+def session(base):
+    client = requests.Session()
+    client.post(base + '/login', data=ADMIN)
+    return client
+
+
+# =====================
+# MEMORY
+# =====================
+def worker_pids(master_pid):
+    with open(f'/proc/{master_pid}/task/{master_pid}/children') as fh:
+        return [int(pid) for pid in fh.read().split()]
+
+
+def memory_kb(pid):
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as fh:
+        for line in fh:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {'rss': fields['Rss'], 'pss': fields['Pss'],
+            'private': fields['Private_Clean'] + fields['Private_Dirty']}
+
+
+def memory(master_pid):
+    workers = [memory_kb(pid) for pid in worker_pids(master_pid)]
+    result = {key: round(statistics.mean(w[key] for w in workers) / 1024, 1) for key in ('rss', 'pss', 'private')}
+    result['master_rss'] = round(memory_kb(master_pid)['rss'] / 1024, 1)
+    result['total_pss'] = round((sum(w['pss'] for w in workers) + memory_kb(master_pid)['pss']) / 1024, 1)
+    return result
+
+
+def measure_memory(db_path, preload, workers, repeat):
+    process, base, boot = start(db_path, preload, workers)
+    try:
+        after_boot = memory(process.pid)
+        # A session per request spreads the traffic over every worker
+        for _ in range(repeat * workers):
+            client = session(base)
+            for path in PATHS:
+                client.get(base + path)
+        return {'boot_s': round(boot, 3), 'after_boot': after_boot, 'after_traffic': memory(process.pid)}
+    finally:
+        stop(process)
+
+
+# =====================
+# LATENCY
+# =====================
+def _timed_get(client, url):
+    started = time.perf_counter()
+    client.get(url).raise_for_status()
+    return (time.perf_counter() - started) * 1000
+
+
+def measure_latency(db_path, preload, repeat):
+    process, base, boot = start(db_path, preload, 1)
+    try:
+        client = session(base)
+        results = []
+        for path in PATHS:
+            first = _timed_get(client, base + path)
+            warm = statistics.median(_timed_get(client, base + path) for _ in range(repeat))
+            results.append({'path': path, 'first_ms': round(first, 1), 'warm_ms': round(warm, 1)})
+        return {'boot_s': round(boot, 3), 'paths': results}
+    finally:
+        stop(process)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--db', default=None, help='SQLite file (default: /tmp/beshgebeya-bench-<rows>.db)')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', help='Write results to this file')
+    args = parser.parse_args()
+    db_path = args.db or f'/tmp/beshgebeya-bench-{args.rows}.db'
+    subprocess.run([sys.executable, os.path.join(ROOT, 'benchmarks', 'seed.py'), '--rows', str(args.rows),
+                    '--db', db_path], check=True, stdout=subprocess.DEVNULL)
+
+    results = {'rows': args.rows, 'workers': args.workers}
+    for mode, preload in MODES.items():
+        results[mode] = {'memory': measure_memory(db_path, preload, args.workers, args.repeat),
+                         'latency': measure_latency(db_path, preload, args.repeat)}
+
+    for mode in MODES:
+        mem, lat = results[mode]['memory'], results[mode]['latency']
+        print(f"{mode}: {args.workers} workers up in {mem['boot_s']:.2f}s, one worker in {lat['boot_s']:.2f}s")
+        for stage in ('after_boot', 'after_traffic'):
+            m = mem[stage]
+            print(f"  {stage:<14} per worker rss {m['rss']:>6.1f} MB  pss {m['pss']:>6.1f} MB  "
+                  f"private {m['private']:>6.1f} MB   master rss {m['master_rss']:>6.1f} MB  total pss {m['total_pss']:>6.1f} MB")
+        for r in lat['paths']:
+            print(f"  {r['path']:<40} first {r['first_ms']:>8.1f} ms  warm {r['warm_ms']:>8.1f} ms")
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
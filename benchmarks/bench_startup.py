@@ -0,0 +1,114 @@
+"""
+Import time of app.py (`python -X importtime`) and gunicorn worker boot time.
+
+    python benchmarks/bench_startup.py [--repeat 5] [--json startup.json]
+    python benchmarks/bench_startup.py --root /path/to/other/checkout   # compare another revision
+
+`import_ms` is the cumulative import time of the `app` module as reported
+by -X importtime, and `top_imports` its slowest direct imports. `boot_s`
+is the time from starting a one-worker gunicorn to its first answered
+request. Every run is a fresh interpreter against an already seeded
+SQLite file; the median of --repeat runs is reported.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from seed import ROOT
+from bench_http import _free_port
+
+
+def _env(db_path):
+    return {**os.environ, 'DATABASE_URL': 'sqlite:///' + os.path.abspath(db_path), 'SCHEDULER_ENABLED': '0'}
+
+
+def parse_importtime(stderr):
+    """(cumulative µs of `app`, {direct import of app: cumulative µs})"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        rows.append(((len(name) - len(name.lstrip()) - 1) // 2, int(cumulative), name.strip()))
+    total, children = 0, {}
+    # importtime lists a module's imports, indented one level deeper, just before it
+    for i, (depth, cumulative, name) in enumerate(rows):
+        if name == 'app' and depth == 0:
+            total = cumulative
+            start = i
+            while start > 0 and rows[start - 1][0] > 0:
+                start -= 1
+            children = {n: c for d, c, n in rows[start:i] if d == 1}
+    return total, children
+
+
+def measure_import(root, db_path):
+    started = time.perf_counter()
+    done = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=root, env=_env(db_path),
+                          capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - started
+    total, children = parse_importtime(done.stderr)
+    return wall, total, children
+
+
+def measure_boot(root, db_path, timeout=60):
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', 'app:app', '--workers', '1',
+                                '--bind', f'127.0.0.1:{port}'], cwd=root, env=_env(db_path),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                if requests.get(f'http://127.0.0.1:{port}/login', timeout=5).status_code == 200:
+                    return time.perf_counter() - started
+            except requests.ConnectionError:
+                time.sleep(0.01)
+        raise RuntimeError('gunicorn did not answer')
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--root', default=ROOT, help='Checkout to measure (default: this one)')
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--db', default=None, help='SQLite file (default: /tmp/beshgebeya-bench-<rows>.db)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', help='Write results to this file')
+    args = parser.parse_args()
+    db_path = args.db or f'/tmp/beshgebeya-bench-{args.rows}.db'
+    subprocess.run([sys.executable, os.path.join(ROOT, 'benchmarks', 'seed.py'), '--rows', str(args.rows),
+                    '--db', db_path], check=True, stdout=subprocess.DEVNULL)
+
+    imports = [measure_import(args.root, db_path) for _ in range(args.repeat)]
+    boots = [measure_boot(args.root, db_path) for _ in range(args.repeat)]
+    median_run = sorted(imports, key=lambda run: run[1])[len(imports) // 2]
+    top = sorted(median_run[2].items(), key=lambda item: item[1], reverse=True)[:10]
+    results = {
+        'root': os.path.abspath(args.root),
+        'import_ms': round(statistics.median(run[1] for run in imports) / 1000, 1),
+        'import_wall_ms': round(statistics.median(run[0] for run in imports) * 1000, 1),
+        'boot_s': round(statistics.median(boots), 3),
+        'top_imports': [{'module': name, 'ms': round(us / 1000, 1)} for name, us in top],
+    }
+
+    print(f"import app      {results['import_ms']:>8.1f} ms  (interpreter wall {results['import_wall_ms']:.1f} ms)")
+    print(f"gunicorn boot   {results['boot_s'] * 1000:>8.1f} ms  (start to first response, 1 worker)")
+    for entry in results['top_imports']:
+        print(f"  {entry['module']:<28} {entry['ms']:>8.1f} ms")
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
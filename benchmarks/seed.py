@@ -0,0 +1,114 @@
+"""
+Fill a SQLite database with synthetic products, inventory and sales for benchmarks.
+
+    python benchmarks/seed.py --rows 100000 --db /tmp/beshgebeya-bench.db
+
+Seeds `rows` products, one inventory row per product and `rows` sale lines
+(rows // 4 sales of 4 lines). Rows are written with Core executemany, so
+the ORM alert / calendar hooks do not run. Re-running against a database
+that already holds at least `rows` products is a no-op.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+BATCH = 10000
+CATEGORIES = ['Food', 'Commodities', 'Home Care', 'Personal Care']
+BRANDS = ['Addis', 'Abyssinia', 'Sheger', 'Entoto', None]
+STATUSES = ['AVAILABLE'] * 8 + ['LOW_STOCK', 'EXPIRED']
+PAYMENTS = ['CASH', 'CARD', 'MOBILE']
+BARCODE_BASE = 2000000000000
+
+
+def barcode(product_id):
+    """13-digit barcode given to seeded product `product_id`."""
+    return str(BARCODE_BASE + product_id)
+
+
+def open_app(db_path):
+    """Import the app against db_path and initialize it; must run before anything else imports app."""
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.abspath(db_path)
+    from app import app, initialize_database
+    initialize_database(app)
+    return app
+
+
+def _insert(table, rows):
+    from database import db
+    for start in range(0, len(rows), BATCH):
+        db.session.execute(table.insert(), rows[start:start + BATCH])
+
+
+def seed(rows, rng_seed=42):
+    """Top the current database up to `rows` products. Call inside an app context."""
+    from sqlalchemy import func
+    from database import db
+    from models import Product, Inventory, Sale, SaleItem, Branch, User
+
+    existing = db.session.query(func.count(Product.id)).scalar()
+    if existing >= rows:
+        return existing
+    rng = random.Random(rng_seed + existing)
+    now = datetime.utcnow()
+    branch_ids = [b for (b,) in db.session.query(Branch.id)]
+    user_id = db.session.query(User.id).filter_by(username='admin').scalar()
+    first_product = (db.session.query(func.max(Product.id)).scalar() or 0) + 1
+    first_sale = (db.session.query(func.max(Sale.id)).scalar() or 0) + 1
+    count = rows - existing
+
+    for offset in range(0, count, BATCH):
+        size = min(BATCH, count - offset)
+        ids = range(first_product + offset, first_product + offset + size)
+        _insert(Product.__table__, [{
+            'id': pid, 'name': f'Product {pid}', 'sku': f'BENCH-{pid}', 'barcode': barcode(pid),
+            'category': rng.choice(CATEGORIES), 'brand': rng.choice(BRANDS),
+            'supplier': f'Supplier {pid % 50}', 'unit_price': round(rng.uniform(5, 500), 2),
+            'branch_id': rng.choice(branch_ids), 'created_at': now - timedelta(days=rng.randint(0, 365))
+        } for pid in ids])
+        _insert(Inventory.__table__, [{
+            'product_id': pid, 'branch_id': rng.choice(branch_ids),
+            'quantity_on_hand': rng.randint(0, 200), 'threshold_min': 10,
+            'batch_number': f'B{pid % 1000}', 'status': rng.choice(STATUSES),
+            'expiry_date': now + timedelta(days=rng.randint(-30, 540)),
+            'entry_date': now - timedelta(days=rng.randint(0, 365)),
+            'last_updated': now, 'created_at': now
+        } for pid in ids])
+
+        sale_ids = range(first_sale + offset // 4, first_sale + (offset + size) // 4)
+        sales, items = [], []
+        for sid in sale_ids:
+            lines = [(rng.choice(ids), rng.randint(1, 5), round(rng.uniform(5, 500), 2)) for _ in range(4)]
+            sales.append({
+                'id': sid, 'user_id': user_id, 'branch_id': rng.choice(branch_ids),
+                'payment_type': rng.choice(PAYMENTS), 'total_amount': sum(q * p for _, q, p in lines),
+                'sale_date': now - timedelta(minutes=rng.randint(0, 525600))
+            })
+            items.extend({'sale_id': sid, 'product_id': pid, 'quantity': q, 'price': q * p} for pid, q, p in lines)
+        _insert(Sale.__table__, sales)
+        _insert(SaleItem.__table__, items)
+        db.session.commit()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--db', default='/tmp/beshgebeya-bench.db')
+    args = parser.parse_args()
+
+    app = open_app(args.db)
+    started = time.perf_counter()
+    with app.app_context():
+        total = seed(args.rows)
+    print(f'{args.db}: {total} products ({time.perf_counter() - started:.1f}s)')
+
+
+if __name__ == '__main__':
+    main()
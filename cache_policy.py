@@ -0,0 +1,110 @@
+import hashlib
+import os
+import re
+from flask import current_app, request, session
+from werkzeug.http import is_resource_modified
+
+# Query parameter carrying a static file's content hash
+VERSION_ARG = 'v'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+NO_STORE = 'no-store, no-cache, must-revalidate, max-age=0'
+REVALIDATE = 'private, no-cache'
+# Files built by assets.py carry their content hash in the name instead of ?v=
+HASHED_NAME = re.compile(r'^dist/.+\.[0-9a-f]{12}\.\w+$')
+
+_fingerprints = {}   # static path -> (mtime, content hash)
+
+
+# =====================
+# STATIC FINGERPRINTS
+# =====================
+def fingerprint(app, filename):
+    """Short content hash of a static file, recomputed only when its mtime changes."""
+    path = os.path.join(app.static_folder, filename)
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+    cached = _fingerprints.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, 'rb') as fh:
+        digest = hashlib.sha256(fh.read()).hexdigest()[:12]
+    _fingerprints[path] = (mtime, digest)
+    return digest
+
+
+# =====================
+# CONDITIONAL GETS
+# =====================
+def _etag(kind, object_id, changed_at):
+    return f'{kind}-{object_id}-{changed_at:%Y%m%d%H%M%S%f}'
+
+
+def not_modified(kind, object_id, changed_at):
+    """
+    A 304 when the client's If-None-Match / If-Modified-Since still match the
+    row's last change, else None. Rows without a timestamp are never 304'd.
+    """
+    if changed_at is None:
+        return None
+    etag = _etag(kind, object_id, changed_at)
+    if is_resource_modified(request.environ, etag=etag, last_modified=changed_at):
+        return None
+    response = current_app.response_class(status=304)
+    return with_validators(response, kind, object_id, changed_at)
+
+
+def with_validators(response, kind, object_id, changed_at):
+    """ETag and Last-Modified from the row's last change; the client revalidates on every use."""
+    if changed_at is not None:
+        response.set_etag(_etag(kind, object_id, changed_at))
+        response.last_modified = changed_at
+    response.headers['Cache-Control'] = REVALIDATE
+    return response
+
+
+# =====================
+# POLICY
+# =====================
+def apply(app, response):
+    """
+    Cache-Control by route:
+      - static files requested with their current ?v= hash, and the hashed
+        names built by assets.py: cached for a year, immutable
+      - other static files: Flask's default (revalidate with ETag / Last-Modified)
+      - views that set Cache-Control themselves: left alone
+      - HTML for a logged-in user: no-store, so pages never outlive a logout
+      - anything else for a logged-in user (JSON, exports): private, revalidate
+    """
+    if request.endpoint == 'static':
+        filename = request.view_args['filename']
+        version = request.args.get(VERSION_ARG)
+        if response.status_code in (200, 304) and (
+                HASHED_NAME.match(filename) or version and version == fingerprint(app, filename)):
+            response.headers['Cache-Control'] = IMMUTABLE
+        return response
+    if 'Cache-Control' in response.headers or 'user_id' not in session:
+        return response
+    if response.mimetype == 'text/html':
+        response.headers['Cache-Control'] = NO_STORE
+        response.headers['Pragma'] = 'no-cache'
+        response.headers['Expires'] = '-1'
+    else:
+        response.headers['Cache-Control'] = REVALIDATE
+    return response
+
+
+def init_app(app):
+    @app.url_defaults
+    def _fingerprint_static(endpoint, values):
+        # Every url_for('static', filename=...) carries the file's hash
+        if endpoint == 'static' and 'filename' in values and VERSION_ARG not in values \
+                and not HASHED_NAME.match(values['filename']):
+            version = fingerprint(app, values['filename'])
+            if version:
+                values[VERSION_ARG] = version
+
+    @app.after_request
+    def _cache_headers(response):
+        return apply(app, response)
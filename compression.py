@@ -0,0 +1,185 @@
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:   # optional: without it only gzip is offered
+    brotli = None
+
+# Response types worth compressing; images, fonts and XLSX (a zip) already are
+COMPRESSIBLE = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/xml', 'text/javascript',
+    'application/javascript', 'application/json', 'application/xml', 'image/svg+xml',
+}
+# Compressed static files kept per process, keyed by (path, ETag, encoding)
+STATIC_CACHE_SIZE = 64
+
+
+def _env_flag(name, default='0'):
+    return os.environ.get(name, default).lower() in ('1', 'true', 'yes')
+
+
+# =====================
+# ENCODERS
+# =====================
+class GzipEncoder:
+    name = 'gzip'
+
+    def __init__(self, level):
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._z.compress(data)
+
+    def flush(self):
+        # Sync flush: everything so far can be decoded by the client right away
+        return self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._z.flush()
+
+
+class BrotliEncoder:
+    name = 'br'
+
+    def __init__(self, quality):
+        self._c = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._c.process(data)
+
+    def flush(self):
+        return self._c.flush()
+
+    def finish(self):
+        return self._c.finish()
+
+
+def encoder(name, level):
+    return BrotliEncoder(level) if name == 'br' else GzipEncoder(level)
+
+
+def compress(name, level, data):
+    """One-shot compression of a whole body."""
+    enc = encoder(name, level)
+    return enc.compress(data) + enc.finish()
+
+
+# =====================
+# MIDDLEWARE
+# =====================
+class CompressionMiddleware:
+    """
+    WSGI middleware that compresses responses for clients that accept it.
+
+    Brotli is preferred over gzip at equal quality in Accept-Encoding. A
+    response with a Content-Length is compressed in one go once it reaches
+    `min_size`; one without (the streamed exports) is compressed chunk by
+    chunk as the app yields, so nothing is buffered. Responses that are
+    already encoded, partial, not a text type, or marked
+    `Cache-Control: no-transform` pass through untouched. Static files are
+    compressed once, at the highest level, and reused while their ETag holds.
+    """
+
+    def __init__(self, wsgi_app, min_size=1024, gzip_level=6, brotli_quality=4):
+        self.wsgi_app = wsgi_app
+        self.min_size = min_size
+        self.levels = {'gzip': gzip_level, 'br': brotli_quality}
+        self.static_levels = {'gzip': 9, 'br': 11}
+        self.encodings = ['br', 'gzip'] if brotli else ['gzip']
+        self._static = OrderedDict()
+        self._static_lock = threading.Lock()
+
+    def negotiate(self, environ):
+        return parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING', '')).best_match(self.encodings)
+
+    def __call__(self, environ, start_response):
+        captured = {}
+
+        def capture(status, headers, exc_info=None):
+            captured.update(status=status, headers=headers, exc_info=exc_info)
+            return lambda data: None
+
+        body = self.wsgi_app(environ, capture)
+        status, headers = captured['status'], Headers(captured['headers'])
+        encoding = self._eligible(environ, status, headers)
+        if encoding is None:
+            start_response(status, headers.to_wsgi_list(), captured['exc_info'])
+            return body
+
+        headers['Content-Encoding'] = encoding
+        etag = headers.get('ETag')
+        if etag and not etag.startswith('W/'):
+            # Same entity, different bytes: the validator becomes weak
+            headers['ETag'] = 'W/' + etag
+        if 'Content-Length' not in headers:
+            start_response(status, headers.to_wsgi_list(), captured['exc_info'])
+            return self._stream(body, encoder(encoding, self.levels[encoding]))
+
+        data = self._buffered(environ, body, encoding, etag)
+        headers['Content-Length'] = str(len(data))
+        start_response(status, headers.to_wsgi_list(), captured['exc_info'])
+        return [data]
+
+    def _eligible(self, environ, status, headers):
+        """The encoding to use, or None; adds Vary whenever the answer depends on Accept-Encoding."""
+        code = int(status.split(' ', 1)[0])
+        mimetype = headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if code < 200 or code in (204, 206, 304) or mimetype not in COMPRESSIBLE \
+                or 'Content-Encoding' in headers or 'no-transform' in headers.get('Cache-Control', ''):
+            return None
+        vary = headers.get('Vary', '')
+        if 'accept-encoding' not in vary.lower():
+            headers['Vary'] = f'{vary}, Accept-Encoding' if vary else 'Accept-Encoding'
+        length = headers.get('Content-Length')
+        if environ['REQUEST_METHOD'] == 'HEAD' or (length is not None and int(length) < self.min_size):
+            return None
+        return self.negotiate(environ)
+
+    def _buffered(self, environ, body, encoding, etag):
+        try:
+            static = etag and environ.get('PATH_INFO', '').startswith('/static/')
+            key = (environ.get('PATH_INFO'), etag, encoding)
+            if static:
+                with self._static_lock:
+                    if key in self._static:
+                        self._static.move_to_end(key)
+                        return self._static[key]
+            data = compress(encoding, (self.static_levels if static else self.levels)[encoding], b''.join(body))
+            if static:
+                with self._static_lock:
+                    self._static[key] = data
+                    while len(self._static) > STATIC_CACHE_SIZE:
+                        self._static.popitem(last=False)
+            return data
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+
+    def _stream(self, body, enc):
+        try:
+            for chunk in body:
+                if chunk:
+                    data = enc.compress(chunk) + enc.flush()
+                    if data:
+                        yield data
+            yield enc.finish()
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+
+
+def init_app(app):
+    # Off when a proxy in front (nginx, a CDN) already compresses
+    app.config.setdefault('COMPRESS_ENABLED', _env_flag('COMPRESS_ENABLED', '1'))
+    # COMPRESS_MIN_SIZE: bodies smaller than this (bytes) are sent as they are
+    app.config.setdefault('COMPRESS_MIN_SIZE', int(os.environ.get('COMPRESS_MIN_SIZE', 1024)))
+    app.config.setdefault('COMPRESS_GZIP_LEVEL', int(os.environ.get('COMPRESS_GZIP_LEVEL', 6)))
+    app.config.setdefault('COMPRESS_BROTLI_QUALITY', int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4)))
+    if app.config['COMPRESS_ENABLED']:
+        app.wsgi_app = CompressionMiddleware(app.wsgi_app, app.config['COMPRESS_MIN_SIZE'],
+                                             app.config['COMPRESS_GZIP_LEVEL'], app.config['COMPRESS_BROTLI_QUALITY'])
@@ -0,0 +1,55 @@
+import os
+import tempfile
+
+# Point the app at a throwaway SQLite file before app.py is imported
+_test_dir = tempfile.mkdtemp(prefix='beshgebeya-test-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_test_dir, 'test.db')
+
+import pytest
+
+
+@pytest.fixture
+def app():
+    from app import app as flask_app, db, initialize_database
+    flask_app.config['TESTING'] = True
+    with flask_app.app_context():
+        db.drop_all()
+    initialize_database(flask_app)
+    with flask_app.app_context():
+        yield flask_app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    from models import User
+    admin = User.query.filter_by(username='admin').first()
+    test_client = app.test_client()
+    with test_client.session_transaction() as sess:
+        sess['user_id'] = admin.id
+        sess['username'] = admin.username
+        sess['is_admin'] = True
+    return test_client
+
+
+@pytest.fixture
+def count_statements(app):
+    """`with count_statements() as statements:` collects the SQL sent to the database inside the block."""
+    from contextlib import contextmanager
+    from sqlalchemy import event
+    from database import db
+
+    @contextmanager
+    def counting():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+    return counting
@@ -0,0 +1,108 @@
+import os
+from flask import current_app, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from database import db
+
+PROFILES = ('tuned', 'stock')
+
+
+def _env_flag(name, default='0'):
+    return os.environ.get(name, default).lower() in ('1', 'true', 'yes', 'on')
+
+
+# =====================
+# PROFILES
+# =====================
+def sqlite_pragmas(config):
+    """PRAGMAs run on every new SQLite connection, in order."""
+    return [
+        # Readers no longer wait for a writer, nor a writer for readers
+        ('journal_mode', config['SQLITE_JOURNAL_MODE']),
+        # In WAL mode NORMAL only syncs at checkpoints: a power cut can drop the last commits, never corrupt
+        ('synchronous', config['SQLITE_SYNCHRONOUS']),
+        ('busy_timeout', int(config['SQLITE_BUSY_TIMEOUT_MS'])),
+        # Negative cache_size is in KiB; the page cache is per connection
+        ('cache_size', -int(config['SQLITE_CACHE_SIZE_MB'] * 1024)),
+        # Reads served from the OS page cache, shared by every connection and worker
+        ('mmap_size', int(config['SQLITE_MMAP_SIZE_MB'] * 1024 * 1024)),
+    ]
+
+
+def engine_options(uri, config):
+    """create_engine() keyword arguments of the configured profile for this database URI."""
+    if config['ENGINE_PROFILE'] == 'stock':
+        return {}
+    backend = make_url(uri).get_backend_name()
+    if backend == 'sqlite':
+        return {}
+    return {
+        'pool_size': int(config['DB_POOL_SIZE']),
+        'max_overflow': int(config['DB_MAX_OVERFLOW']),
+        'pool_pre_ping': bool(config['DB_POOL_PRE_PING']),
+        # Recycle before the server or a proxy drops the idle connection itself
+        'pool_recycle': int(config['DB_POOL_RECYCLE']),
+    }
+
+
+# =====================
+# WIRING
+# =====================
+def _on_connect(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+    return set_pragmas
+
+
+def init_app(app):
+    """Call before db.init_app(app): the engine options are read when the engine is created."""
+    config = app.config
+    # ENGINE_PROFILE: "tuned", or "stock" for SQLAlchemy's and the driver's defaults
+    config.setdefault('ENGINE_PROFILE', os.environ.get('ENGINE_PROFILE', 'tuned'))
+    if config['ENGINE_PROFILE'] not in PROFILES:
+        raise ValueError(f"ENGINE_PROFILE must be one of {PROFILES}, not {config['ENGINE_PROFILE']!r}")
+    config.setdefault('SQLITE_JOURNAL_MODE', os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'))
+    config.setdefault('SQLITE_SYNCHRONOUS', os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'))
+    config.setdefault('SQLITE_BUSY_TIMEOUT_MS', int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)))
+    config.setdefault('SQLITE_CACHE_SIZE_MB', float(os.environ.get('SQLITE_CACHE_SIZE_MB', 16)))
+    config.setdefault('SQLITE_MMAP_SIZE_MB', float(os.environ.get('SQLITE_MMAP_SIZE_MB', 256)))
+    config.setdefault('DB_POOL_SIZE', int(os.environ.get('DB_POOL_SIZE', 5)))
+    config.setdefault('DB_MAX_OVERFLOW', int(os.environ.get('DB_MAX_OVERFLOW', 10)))
+    config.setdefault('DB_POOL_PRE_PING', _env_flag('DB_POOL_PRE_PING', '1'))
+    config.setdefault('DB_POOL_RECYCLE', int(os.environ.get('DB_POOL_RECYCLE', 1800)))
+    config.setdefault('DB_STATEMENT_TIMEOUT_MS', int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000)))
+    # Options set explicitly in SQLALCHEMY_ENGINE_OPTIONS win over the profile's
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = {**engine_options(config['SQLALCHEMY_DATABASE_URI'], config),
+                                           **config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
+
+
+def _request_statement_timeout(session, transaction, connection):
+    """
+    PostgreSQL statement_timeout for transactions begun while serving a
+    request. CLI commands, migrations and scheduler jobs legitimately run
+    long statements over all history, so they get none.
+    """
+    if not has_request_context() or connection.dialect.name != 'postgresql':
+        return
+    config = current_app.config
+    if config['ENGINE_PROFILE'] == 'stock' or not int(config['DB_STATEMENT_TIMEOUT_MS']):
+        return
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(config['DB_STATEMENT_TIMEOUT_MS'])}")
+
+
+def init_engine(app):
+    """
+    Call after db.init_app(app): runs the SQLite PRAGMAs on each new
+    connection and sets the PostgreSQL statement timeout in requests.
+    """
+    if not event.contains(db.session, 'after_begin', _request_statement_timeout):
+        event.listen(db.session, 'after_begin', _request_statement_timeout)
+    if app.config['ENGINE_PROFILE'] == 'stock':
+        return
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine, 'connect', _on_connect(sqlite_pragmas(app.config)))
@@ -0,0 +1,184 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from database import db
+from models import Inventory
+
+# Inventory columns that move a row within (or in/out of) the calendar
+WATCHED_COLUMNS = ('expiry_date', 'quantity_on_hand')
+TOUCHED_KEY = 'expiry_touched_inventory'
+
+
+class ExpiryCalendar:
+    """
+    In-memory FEFO index of stocked inventory, bucketed by expiry day.
+
+    Only rows with an expiry date and quantity_on_hand > 0 are indexed. Each
+    day bucket keeps its (expiry_date, inventory_id) pairs sorted, and the
+    populated days are kept in a sorted list, so range counts touch one
+    bucket per day in the window and "next K" walks just far enough to fill K.
+
+    The calendar is rebuilt from the database once per TTL and patched in
+    between from committed inventory changes, so other workers' writes show
+    up at the latest one TTL later.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._days = []        # sorted day ordinals that have entries
+        self._buckets = {}     # day ordinal -> sorted [(expiry_date, inventory_id)]
+        self._entries = {}     # inventory_id -> (expiry_date, quantity_on_hand)
+        self._stale = set()    # ids changed since the last refresh
+        self._loaded_at = None
+
+    # ---- maintenance ----
+    def _add(self, inv_id, expiry, qty):
+        day = expiry.toordinal()
+        bucket = self._buckets.get(day)
+        if bucket is None:
+            bucket = self._buckets[day] = []
+            insort(self._days, day)
+        insort(bucket, (expiry, inv_id))
+        self._entries[inv_id] = (expiry, qty)
+
+    def _remove(self, inv_id):
+        entry = self._entries.pop(inv_id, None)
+        if entry is None:
+            return
+        day = entry[0].toordinal()
+        bucket = self._buckets[day]
+        bucket.remove((entry[0], inv_id))
+        if not bucket:
+            del self._buckets[day]
+            del self._days[bisect_left(self._days, day)]
+
+    def _set(self, inv_id, expiry, qty):
+        self._remove(inv_id)
+        if expiry is not None and qty is not None and qty > 0:
+            self._add(inv_id, expiry, qty)
+
+    def load(self):
+        """Rebuild the whole calendar with one query."""
+        rows = db.session.query(Inventory.id, Inventory.expiry_date, Inventory.quantity_on_hand).filter(
+            Inventory.expiry_date.isnot(None),
+            Inventory.quantity_on_hand > 0
+        ).all()
+        with self._lock:
+            self._days, self._buckets, self._entries = [], {}, {}
+            self._stale.clear()
+            for inv_id, expiry, qty in rows:
+                self._add(inv_id, expiry, qty)
+            self._loaded_at = time.monotonic()
+
+    def mark_stale(self, inventory_ids):
+        with self._lock:
+            self._stale.update(inventory_ids)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def ensure_fresh(self, ttl=None):
+        """Reload when older than ttl seconds, otherwise re-read only the rows marked stale."""
+        if ttl is None:
+            ttl = current_app.config['EXPIRY_INDEX_TTL'] if has_app_context() else 300
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > ttl:
+            self.load()
+            return
+        with self._lock:
+            stale, self._stale = self._stale, set()
+        if not stale:
+            return
+        rows = db.session.query(Inventory.id, Inventory.expiry_date, Inventory.quantity_on_hand).filter(
+            Inventory.id.in_(stale)
+        ).all()
+        with self._lock:
+            for inv_id in stale:
+                self._remove(inv_id)
+            for inv_id, expiry, qty in rows:
+                self._set(inv_id, expiry, qty)
+
+    # ---- queries ----
+    def window(self, start=None, end=None, limit=0):
+        """
+        Count entries expiring in [start, end] (None = unbounded) and return
+        the first `limit` inventory ids in FEFO order: (count, ids).
+        """
+        with self._lock:
+            lo = bisect_left(self._days, start.toordinal()) if start else 0
+            hi = bisect_right(self._days, end.toordinal()) if end else len(self._days)
+            count = 0
+            ids = []
+            for idx in range(lo, hi):
+                day = self._days[idx]
+                bucket = self._buckets[day]
+                if (start and day == start.toordinal()) or (end and day == end.toordinal()):
+                    matches = [(e, i) for e, i in bucket if (not start or e >= start) and (not end or e <= end)]
+                else:
+                    matches = bucket
+                count += len(matches)
+                if len(ids) < limit:
+                    ids.extend(i for _, i in matches[:limit - len(ids)])
+            return count, ids
+
+    def expiring_within(self, days, today=None, limit=0):
+        """What expires between today and today + days."""
+        today = today or datetime.utcnow()
+        return self.window(today, today + timedelta(days=days), limit)
+
+    def next_to_move(self, k, today=None):
+        """The k not-yet-expired inventory ids to sell first."""
+        today = today or datetime.utcnow()
+        return self.window(today, None, k)[1]
+
+    def expiry_of(self, inventory_id):
+        entry = self._entries.get(inventory_id)
+        return entry[0] if entry else None
+
+
+calendar = ExpiryCalendar()
+
+
+# =====================
+# COMMIT HOOKS
+# =====================
+def touch(inventory_ids, session=None):
+    """Mark rows changed by bulk statements so the calendar re-reads them after commit."""
+    session = session or db.session()
+    session.info.setdefault(TOUCHED_KEY, set()).update(i for i in inventory_ids if i is not None)
+
+
+def _after_flush(session, flush_context):
+    touched = set()
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, Inventory):
+            touched.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, Inventory):
+            attrs = inspect(obj).attrs
+            if any(attrs[col].history.has_changes() for col in WATCHED_COLUMNS):
+                touched.add(obj.id)
+    if touched:
+        touch(touched, session)
+
+
+def _after_commit(session):
+    touched = session.info.pop(TOUCHED_KEY, None)
+    if touched:
+        calendar.mark_stale(touched)
+
+
+def _after_soft_rollback(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop(TOUCHED_KEY, None)
+
+
+def init_app(app):
+    app.config.setdefault('EXPIRY_INDEX_TTL', 300)
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'after_flush', _after_flush)
+        event.listen(db.session, 'after_commit', _after_commit)
+        event.listen(db.session, 'after_soft_rollback', _after_soft_rollback)
@@ -0,0 +1,126 @@
+import csv
+import io
+import re
+import tempfile
+from datetime import datetime
+from sqlalchemy import select
+from database import db
+from models import Product, Inventory, Sale, SaleItem
+from search import product_filters, inventory_filters
+from sales import history_filters
+
+# Rows fetched per database round trip, and per chunk of the response body
+EXPORT_CHUNK = 1000
+# Bytes per chunk when streaming the finished XLSX file
+XLSX_READ_SIZE = 64 * 1024
+# Control characters that XLSX (XML) cannot hold
+ILLEGAL_XLSX_CHARS = re.compile(r'[\000-\010]|[\013-\014]|[\016-\037]')
+
+
+# =====================
+# DATASETS
+# =====================
+def _date_arg(args, key):
+    value = args.get(key)
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+
+def products_export(args):
+    columns = [
+        ('ID', Product.id), ('Name', Product.name), ('Local Name', Product.local_name),
+        ('SKU', Product.sku), ('Barcode', Product.barcode), ('Category', Product.category),
+        ('Brand', Product.brand), ('Supplier', Product.supplier), ('Unit Price', Product.unit_price),
+        ('Created', Product.created_at),
+    ]
+    stmt = select(*[c for _, c in columns]).where(*product_filters(
+        args.get('q', '').strip(), args.get('category_id', type=int), args.get('branch_id', type=int)
+    )).order_by(Product.id.desc())
+    return [h for h, _ in columns], stmt
+
+
+def inventory_export(args):
+    columns = [
+        ('ID', Inventory.id), ('Product', Product.name), ('SKU', Product.sku),
+        ('Branch', Inventory.branch_id), ('Quantity', Inventory.quantity_on_hand),
+        ('Unit', Inventory.unit_of_measure), ('Batch', Inventory.batch_number),
+        ('Expiry', Inventory.expiry_date), ('Status', Inventory.status), ('Entry Date', Inventory.entry_date),
+    ]
+    stmt = select(*[c for _, c in columns]).join(Product, Product.id == Inventory.product_id).where(
+        *inventory_filters(args.get('q', '').strip(), args.get('category_id', type=int),
+                           args.get('branch_id', type=int))
+    ).order_by(Inventory.id.desc())
+    return [h for h, _ in columns], stmt
+
+
+def sales_export(args):
+    """One row per sale line. Raises ValueError on malformed dates."""
+    columns = [
+        ('Sale', Sale.id), ('Date', Sale.sale_date), ('Branch', Sale.branch_id),
+        ('Payment', Sale.payment_type), ('Product', Product.name),
+        ('Quantity', SaleItem.quantity), ('Amount', SaleItem.price),
+    ]
+    stmt = select(*[c for _, c in columns]).join(SaleItem, SaleItem.sale_id == Sale.id).outerjoin(
+        Product, Product.id == SaleItem.product_id
+    ).where(*history_filters(
+        _date_arg(args, 'start'), _date_arg(args, 'end'),
+        args.get('branch_id', type=int), args.get('payment_type') or None
+    )).order_by(Sale.sale_date.desc(), Sale.id.desc(), SaleItem.id)
+    return [h for h, _ in columns], stmt
+
+
+# Dataset name (as used in /api/export/<name>.<fmt>) -> (headers, select) builder
+DATASETS = {
+    'products': products_export,
+    'inventory': inventory_export,
+    'sales': sales_export,
+}
+
+
+# =====================
+# STREAMING WRITERS
+# =====================
+def _partitions(stmt):
+    """Result rows in lists of EXPORT_CHUNK, read through a streaming cursor."""
+    result = db.session.execute(stmt.execution_options(yield_per=EXPORT_CHUNK))
+    yield from result.partitions()
+
+
+def iter_csv(headers, stmt):
+    """CSV body, one chunk per partition. UTF-8 BOM so Excel shows Amharic names."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(headers)
+    for rows in _partitions(stmt):
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _xlsx_cell(value):
+    return ILLEGAL_XLSX_CHARS.sub('', value) if isinstance(value, str) else value
+
+
+def iter_xlsx(headers, stmt, title='Export'):
+    """
+    XLSX body built with openpyxl's write-only workbook, which spools rows
+    to disk as they are appended. The zip can only be streamed once it is
+    complete, so the first byte goes out after the last row is read.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    sheet.append(headers)
+    for rows in _partitions(stmt):
+        for row in rows:
+            sheet.append([_xlsx_cell(v) for v in row])
+
+    with tempfile.TemporaryFile() as fh:
+        workbook.save(fh)
+        fh.seek(0)
+        while chunk := fh.read(XLSX_READ_SIZE):
+            yield chunk
@@ -0,0 +1,102 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from flask import current_app, has_request_context, request
+from markupsafe import Markup
+import metrics
+
+# Locales a row can be rendered for; the first is the default
+LOCALES = ('en', 'am')
+
+
+# =====================
+# LRU STORE
+# =====================
+class FragmentCache:
+    """
+    Rendered HTML by key, least recently used first out. Bounded by the
+    total length of the cached HTML rather than by entry count, since rows
+    differ a lot in size.
+    """
+
+    def __init__(self, max_chars):
+        self.max_chars = max_chars
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+            return html
+
+    def set(self, key, html):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            if len(html) > self.max_chars:
+                return
+            self._entries[key] = html
+            self.size += len(html)
+            while self.size > self.max_chars:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_cache = FragmentCache(32 * 1024 * 1024)
+
+
+# =====================
+# ROWS
+# =====================
+def _locale():
+    if not has_request_context():
+        return LOCALES[0]
+    return request.accept_languages.best_match(LOCALES, default=LOCALES[0])
+
+
+def cached_row(template, row_id, version, **context):
+    """
+    One table row rendered from `template`, reused while the row is
+    unchanged. `version` is whatever changes when the row's output would:
+    its updated_at / last_updated stamps. The key also holds the locale and
+    today's date, since days-left badges move at midnight.
+    """
+    key = (template, row_id, version, _locale(), datetime.utcnow().date())
+    html = _cache.get(key)
+    if html is None:
+        metrics.FRAGMENT_LOOKUPS.inc(result='miss')
+        # Plain Jinja render: no context processors or template signals per row
+        html = current_app.jinja_env.get_template(template).render(**context)
+        _cache.set(key, html)
+    else:
+        metrics.FRAGMENT_LOOKUPS.inc(result='hit')
+    return Markup(html)
+
+
+def clear():
+    _cache.clear()
+
+
+def stats():
+    return {'entries': len(_cache), 'chars': _cache.size, 'max_chars': _cache.max_chars}
+
+
+def init_app(app):
+    global _cache
+    # FRAGMENT_CACHE_MB: rendered rows kept per worker process; 0 turns the cache off
+    app.config.setdefault('FRAGMENT_CACHE_MB', float(os.environ.get('FRAGMENT_CACHE_MB', 32)))
+    _cache = FragmentCache(int(app.config['FRAGMENT_CACHE_MB'] * 1024 * 1024))
+    app.add_template_global(cached_row)
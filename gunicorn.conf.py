@@ -0,0 +1,63 @@
+"""
+Gunicorn settings, read automatically when gunicorn starts in this directory.
+
+    gunicorn                      # or: gunicorn -c gunicorn.conf.py
+
+The app is built once in the master (preload_app), the database seeded and
+the app warmed there before the workers fork, so they share its imports,
+templates and indexes copy-on-write instead of each building them on its
+first requests.
+Every setting can still be overridden on the command line.
+"""
+import glob
+import os
+
+
+def _env_flag(name, default='0'):
+    return os.environ.get(name, default).lower() in ('1', 'true', 'yes', 'on')
+
+
+def _cpus():
+    # CPUs this process may run on, which is fewer than the machine has under a cpuset
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+wsgi_app = 'app:create_app()'
+bind = os.environ.get('GUNICORN_BIND') or f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# GUNICORN_PRELOAD=0 makes every worker import and warm the app on its own
+preload_app = _env_flag('GUNICORN_PRELOAD', '1')
+
+# Processes for CPU (template rendering, report maths), threads to overlap
+# database waits; WEB_CONCURRENCY is the platform's usual override
+workers = int(os.environ.get('WEB_CONCURRENCY') or min(2 * _cpus() + 1, 12))
+threads = int(os.environ.get('GUNICORN_THREADS') or (2 if _cpus() <= 2 else 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+
+
+def on_starting(server):
+    metrics_dir = os.environ.get('METRICS_DIR')
+    if metrics_dir:
+        # Value files of the previous run's workers would be summed into /metrics
+        for path in glob.glob(os.path.join(metrics_dir, 'metrics-*.db')):
+            os.remove(path)
+    if server.cfg.preload_app:
+        import warmup
+        app = server.app.wsgi()
+        if _env_flag('SEED_ON_START', '1'):
+            # The deploy's seed step, for hosts with no release phase (Render);
+            # initialize_database() holds the initialization lock while it runs
+            from app import initialize_database
+            initialize_database(app)
+        timings = warmup.warm(app)
+        server.log.info("Warmed in %.3fs: %s", sum(timings.values()),
+                        ', '.join(f'{name} {seconds * 1000:.0f}ms' for name, seconds in timings.items()))
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        import warmup
+        warmup.reset_after_fork(worker.app.wsgi())
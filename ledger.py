@@ -0,0 +1,231 @@
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from sqlalchemy import select, insert, update, delete, func, exists, literal, DateTime
+from database import db
+from models import Inventory, StockMovement, StockCheckpoint, JobRun
+import alerts
+import expiry_index
+from rollups import upsert_add
+from scheduler import register_job, worker_id
+
+# Attempts at an absolute stock count before giving up on a row that keeps changing
+SET_RETRIES = 5
+
+
+class LedgerError(Exception):
+    """A stock change that could not be recorded consistently."""
+
+
+def _changed(inventory_ids, objects=()):
+    """Core UPDATEs bypass the ORM: expire stale copies and tell the commit hooks."""
+    for inv in objects:
+        db.session.expire(inv, ['quantity_on_hand', 'last_updated'])
+    alerts.touch_inventory(inventory_ids)
+    expiry_index.touch(inventory_ids)
+
+
+# =====================
+# WRITES
+# =====================
+def append(movements):
+    """Insert movement dicts (inventory_id, delta, reason, reference, user_id) with one executemany."""
+    now = datetime.utcnow()
+    rows = [{'reference': None, 'user_id': None, **m, 'created_at': now} for m in movements if m['delta']]
+    if rows:
+        db.session.execute(insert(StockMovement.__table__), rows)
+
+
+def adjust(inv, delta, reason, reference=None, user_id=None):
+    """
+    Relative change: one `quantity_on_hand = quantity_on_hand + delta` UPDATE
+    plus the movement row. The database applies the increment, so concurrent
+    receipts and imports never overwrite each other.
+    """
+    if not delta:
+        return
+    table = Inventory.__table__
+    db.session.execute(
+        update(table).where(table.c.id == inv.id)
+        .values(quantity_on_hand=func.coalesce(table.c.quantity_on_hand, 0) + delta)
+    )
+    append([{'inventory_id': inv.id, 'delta': delta, 'reason': reason,
+             'reference': reference, 'user_id': user_id}])
+    _changed([inv.id], [inv])
+
+
+def set_quantity(inv, quantity, reason='COUNT', reference=None, user_id=None):
+    """
+    Absolute stock count. Compare-and-set against the value just read, so the
+    recorded delta is exactly what the count replaced even if a sale lands
+    in between. Returns the delta.
+    """
+    table = Inventory.__table__
+    for _ in range(SET_RETRIES):
+        current = db.session.execute(select(table.c.quantity_on_hand).where(table.c.id == inv.id)).scalar()
+        unchanged = table.c.quantity_on_hand.is_(None) if current is None else table.c.quantity_on_hand == current
+        result = db.session.execute(update(table).where(table.c.id == inv.id, unchanged).values(quantity_on_hand=quantity))
+        if result.rowcount == 1:
+            delta = quantity - (current or 0)
+            append([{'inventory_id': inv.id, 'delta': delta, 'reason': reason,
+                     'reference': reference, 'user_id': user_id}])
+            _changed([inv.id], [inv])
+            return delta
+    raise LedgerError(f'Inventory {inv.id} kept changing during the stock count; try again')
+
+
+def opened(inv, reason='RECEIPT', reference=None, user_id=None):
+    """Record the starting quantity of a newly flushed Inventory row."""
+    append([{'inventory_id': inv.id, 'delta': inv.quantity_on_hand or 0, 'reason': reason,
+             'reference': reference, 'user_id': user_id}])
+
+
+def record_sales(sales, inventory):
+    """
+    SALE movements for flushed sales whose stock was already decremented,
+    one per sale and inventory row. `inventory` maps product_id -> Inventory.
+    """
+    movements = []
+    for sale in sales:
+        per_row = defaultdict(float)
+        for item in sale.items:
+            inv = inventory.get(item.product_id)
+            if inv is not None:
+                per_row[inv.id] -= item.quantity or 0
+        movements.extend({'inventory_id': inv_id, 'delta': delta, 'reason': 'SALE',
+                          'reference': f'sale:{sale.id}', 'user_id': sale.user_id}
+                         for inv_id, delta in per_row.items())
+    append(movements)
+
+
+# =====================
+# CHECKPOINTS
+# =====================
+def baseline():
+    """
+    Open a checkpoint for every inventory row that has none, holding whatever
+    part of its cached quantity the ledger does not explain yet (stock that
+    predates the ledger or was loaded in bulk). Returns rows opened.
+    """
+    moved = select(func.coalesce(func.sum(StockMovement.delta), 0)).where(
+        StockMovement.inventory_id == Inventory.id
+    ).scalar_subquery()
+    rows = select(
+        Inventory.id, func.coalesce(Inventory.quantity_on_hand, 0) - moved, literal(0),
+        literal(datetime.utcnow(), DateTime)
+    ).where(~exists().where(StockCheckpoint.inventory_id == Inventory.id))
+    result = db.session.execute(insert(StockCheckpoint.__table__).from_select(
+        ['inventory_id', 'quantity', 'folded_count', 'compacted_through'], rows
+    ))
+    return result.rowcount
+
+
+def compact(before):
+    """
+    Fold every movement created before `before` into its row's checkpoint and
+    delete it, in one transaction (caller commits). Returns movements folded.
+    """
+    baseline()
+    folded = db.session.query(
+        StockMovement.inventory_id, func.sum(StockMovement.delta), func.count(StockMovement.id)
+    ).filter(StockMovement.created_at < before).group_by(StockMovement.inventory_id).all()
+    upsert_add(StockCheckpoint, [
+        {'inventory_id': inv_id, 'quantity': total, 'folded_count': count, 'compacted_through': before}
+        for inv_id, total, count in folded
+    ], ['inventory_id'], ['quantity', 'folded_count'], replace_columns=['compacted_through'])
+    db.session.execute(delete(StockMovement).where(StockMovement.created_at < before))
+    return sum(count for _, _, count in folded)
+
+
+# =====================
+# QUERIES
+# =====================
+def _ledger_totals():
+    moved = select(StockMovement.inventory_id, func.sum(StockMovement.delta).label('moved')).group_by(
+        StockMovement.inventory_id
+    ).subquery()
+    return moved, func.coalesce(StockCheckpoint.quantity, 0) + func.coalesce(moved.c.moved, 0)
+
+
+def on_hand(inventory_id):
+    """Quantity rebuilt from the ledger (checkpoint + remaining movements)."""
+    checkpoint = db.session.get(StockCheckpoint, inventory_id)
+    moved = db.session.query(func.sum(StockMovement.delta)).filter_by(inventory_id=inventory_id).scalar()
+    return (checkpoint.quantity if checkpoint else 0) + (moved or 0)
+
+
+def verify(limit=100):
+    """Inventory rows whose cached quantity disagrees with the ledger: [(id, cached, ledger)]."""
+    moved, total = _ledger_totals()
+    cached = func.coalesce(Inventory.quantity_on_hand, 0)
+    return db.session.query(Inventory.id, cached, total).outerjoin(
+        StockCheckpoint, StockCheckpoint.inventory_id == Inventory.id
+    ).outerjoin(moved, moved.c.inventory_id == Inventory.id).filter(
+        func.abs(cached - total) > 1e-6
+    ).order_by(Inventory.id).limit(limit).all()
+
+
+def history(inventory_id, before_id=None, limit=50):
+    """Newest-first movements for one row (keyset on id) and its checkpoint."""
+    query = StockMovement.query.filter_by(inventory_id=inventory_id)
+    if before_id:
+        query = query.filter(StockMovement.id < before_id)
+    movements = query.order_by(StockMovement.id.desc()).limit(limit).all()
+    return movements, db.session.get(StockCheckpoint, inventory_id)
+
+
+# =====================
+# COMPACTION JOB
+# =====================
+@register_job('ledger', 'LEDGER_COMPACTION_INTERVAL')
+def compaction_job(lock):
+    """Fold movements older than the retention window into checkpoints."""
+    started = time.monotonic()
+    run = JobRun(job='ledger', owner=worker_id(), started_at=datetime.utcnow(),
+                 chunks=1, rows_scanned=0, expired_count=0, created_count=0,
+                 updated_count=0, resolved_count=0, completed=False)
+    try:
+        cutoff = datetime.utcnow() - timedelta(days=current_app.config['LEDGER_RETENTION_DAYS'])
+        run.rows_scanned = compact(cutoff)
+        db.session.commit()
+        run.completed = True
+    except Exception as e:
+        db.session.rollback()
+        run.error = str(e)
+        current_app.logger.exception("[Scheduler] ledger compaction failed")
+
+    run.duration_ms = int((time.monotonic() - started) * 1000)
+    db.session.add(run)
+    db.session.commit()
+    return run
+
+
+@click.command('compact-ledger')
+@click.option('--days', type=int, help='Keep this many days of movements (default: LEDGER_RETENTION_DAYS).')
+def compact_ledger_command(days):
+    """Fold old stock movements into per-row checkpoints."""
+    days = days if days is not None else current_app.config['LEDGER_RETENTION_DAYS']
+    folded = compact(datetime.utcnow() - timedelta(days=days))
+    db.session.commit()
+    click.echo(f"Folded {folded} movements older than {days} days.")
+
+
+@click.command('verify-ledger')
+def verify_ledger_command():
+    """List inventory rows whose cached quantity disagrees with the ledger."""
+    if baseline():
+        db.session.commit()
+    mismatches = verify()
+    for inv_id, cached, total in mismatches:
+        click.echo(f"inventory {inv_id}: cached {cached}, ledger {total}")
+    click.echo(f"{len(mismatches)} mismatched rows" if mismatches else "Ledger matches cached quantities.")
+
+
+def init_app(app):
+    app.config.setdefault('LEDGER_RETENTION_DAYS', int(os.environ.get('LEDGER_RETENTION_DAYS', 90)))
+    app.config.setdefault('LEDGER_COMPACTION_INTERVAL', int(os.environ.get('LEDGER_COMPACTION_INTERVAL', 86400)))
+    app.cli.add_command(compact_ledger_command)
+    app.cli.add_command(verify_ledger_command)
@@ -0,0 +1,246 @@
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from flask import g, request
+
+# Upper bounds (seconds) of the request latency buckets; +Inf is implied
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Initial size of a worker's value file; doubled whenever it fills up
+INITIAL_FILE_SIZE = 64 * 1024
+
+_header = struct.Struct('q')
+_length = struct.Struct('i')
+_value = struct.Struct('d')
+
+
+# =====================
+# STORAGE
+# =====================
+class MemoryValues:
+    """Per-process values, used when no METRICS_DIR is configured."""
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, key, amount):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def totals(self):
+        with self._lock:
+            return dict(self._values)
+
+
+class MmapValues:
+    """
+    One append-only value file per worker process in a shared directory.
+
+    Each entry is a length-prefixed key padded to 8 bytes followed by a
+    double; the header holds the bytes in use and is written last, so a
+    reader in another process never sees a half-written entry. Only the
+    owning process writes its file; totals() sums every worker's file.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _open(self):
+        # A forked worker inherits the parent's map: start its own file instead
+        self._pid = os.getpid()
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'metrics-{self._pid}.db')
+        self._file = open(path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.truncate(INITIAL_FILE_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._used = _header.unpack_from(self._map, 0)[0] or _header.size
+        self._positions = {key: pos for key, _, pos in _entries(self._map, self._used)}
+
+    def _append(self, key):
+        encoded = key.encode('utf-8')
+        padded = encoded + b' ' * (-(_length.size + len(encoded)) % 8)
+        size = _length.size + len(padded) + _value.size
+        while self._used + size > len(self._map):
+            self._map.close()
+            self._file.truncate(os.fstat(self._file.fileno()).st_size * 2)
+            self._map = mmap.mmap(self._file.fileno(), 0)
+        start = self._used
+        _length.pack_into(self._map, start, len(encoded))
+        self._map[start + _length.size:start + _length.size + len(padded)] = padded
+        position = start + _length.size + len(padded)
+        _value.pack_into(self._map, position, 0.0)
+        self._used += size
+        _header.pack_into(self._map, 0, self._used)
+        self._positions[key] = position
+        return position
+
+    def inc(self, key, amount):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._open()
+            position = self._positions.get(key)
+            if position is None:
+                position = self._append(key)
+            _value.pack_into(self._map, position, _value.unpack_from(self._map, position)[0] + amount)
+
+    def totals(self):
+        totals = {}
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.db')):
+            with open(path, 'rb') as fh:
+                data = fh.read()
+            if len(data) < _header.size:
+                continue
+            for key, value, _ in _entries(data, _header.unpack_from(data, 0)[0]):
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+
+def _entries(data, used):
+    """(key, value, value offset) for every complete entry of a value file."""
+    pos = _header.size
+    while pos < used:
+        length = _length.unpack_from(data, pos)[0]
+        key_start = pos + _length.size
+        position = key_start + length + (-(_length.size + length) % 8)
+        yield bytes(data[key_start:key_start + length]).decode('utf-8'), _value.unpack_from(data, position)[0], position
+        pos = position + _value.size
+
+
+_store = MemoryValues()
+
+
+# =====================
+# METRIC TYPES
+# =====================
+def _key(name, labels):
+    return json.dumps([name, sorted(labels.items())])
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        REGISTRY.append(self)
+
+    def inc(self, amount=1, **labels):
+        _store.inc(_key(self.name + '_total', labels), amount)
+
+    def samples(self, totals):
+        name = self.name + '_total'
+        return [(sample, labels, value) for sample, labels, value in totals if sample == name]
+
+
+class Histogram:
+    """Bucket counts are stored per bucket and made cumulative when exposed."""
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self.buckets = tuple(buckets) + (float('inf'),)
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        le = next(b for b in self.buckets if value <= b)
+        _store.inc(_key(self.name + '_bucket', {**labels, 'le': _format_le(le)}), 1)
+        _store.inc(_key(self.name + '_sum', labels), value)
+        _store.inc(_key(self.name + '_count', labels), 1)
+
+    def samples(self, totals):
+        series = {}
+        for sample, labels, value in totals:
+            if sample == self.name + '_bucket':
+                labels = dict(labels)
+                le = labels.pop('le')
+                series.setdefault(tuple(labels.items()), {'buckets': {}})['buckets'][le] = value
+            elif sample in (self.name + '_sum', self.name + '_count'):
+                series.setdefault(tuple(labels.items()), {'buckets': {}})[sample] = value
+
+        samples = []
+        for labels, values in sorted(series.items()):
+            labels = dict(labels)
+            cumulative = 0.0
+            for bound in self.buckets:
+                cumulative += values['buckets'].get(_format_le(bound), 0.0)
+                samples.append((self.name + '_bucket', {**labels, 'le': _format_le(bound)}, cumulative))
+            samples.append((self.name + '_sum', labels, values.get(self.name + '_sum', 0.0)))
+            samples.append((self.name + '_count', labels, values.get(self.name + '_count', 0.0)))
+        return samples
+
+
+def _format_le(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+REGISTRY = []
+
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Request latency by Flask endpoint.',
+                            ['endpoint', 'method'])
+IMPORTS = Counter('beshgebeya_imports', 'Product import runs.', ['source'])
+IMPORT_ROWS = Counter('beshgebeya_import_rows', 'Rows processed by product imports.', ['result'])
+SALES = Counter('beshgebeya_sales', 'Sales committed.', ['channel'])
+SCANNER_LOOKUPS = Counter('beshgebeya_scanner_lookups', 'Barcode / local code lookups.', ['result'])
+ALERT_RUNS = Counter('beshgebeya_alert_runs', 'Alert evaluation runs: scheduler, run-jobs and the dashboard.', ['outcome'])
+SEARCHES = Counter('beshgebeya_searches', 'Live searches from the product and inventory pages.', ['kind'])
+FRAGMENT_LOOKUPS = Counter('beshgebeya_fragment_lookups', 'Rendered table rows served from / added to the fragment cache.',
+                           ['result'])
+
+
+# =====================
+# EXPOSITION
+# =====================
+def _format_value(value):
+    # Integral values in full: `:g` would round a counter past 1e6 to six digits
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def render():
+    """Every metric in Prometheus text format (0.0.4), summed across workers."""
+    totals = []
+    for key, value in _store.totals().items():
+        sample, labels = json.loads(key)
+        totals.append((sample, dict(labels), value))
+    lines = []
+    for metric in REGISTRY:
+        kind = 'histogram' if isinstance(metric, Histogram) else 'counter'
+        name = metric.name if kind == 'histogram' else metric.name + '_total'
+        lines.append(f'# HELP {name} {metric.help}')
+        lines.append(f'# TYPE {name} {kind}')
+        for sample, labels, value in metric.samples(totals):
+            label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            value = _format_value(value)
+            lines.append(f'{sample}{{{label_text}}} {value}' if label_text else f'{sample} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+# =====================
+# REQUEST TIMING
+# =====================
+def _start_request():
+    g.metrics_started = time.perf_counter()
+
+
+def _finish_request(response):
+    started = g.pop('metrics_started', None)
+    if started is not None:
+        REQUEST_LATENCY.observe(time.perf_counter() - started,
+                                endpoint=request.endpoint or 'unmatched', method=request.method)
+    return response
+
+
+def init_app(app):
+    global _store
+    app.config.setdefault('METRICS_DIR', os.environ.get('METRICS_DIR'))
+    app.config.setdefault('METRICS_TOKEN', os.environ.get('METRICS_TOKEN'))
+    if app.config['METRICS_DIR']:
+        _store = MmapValues(app.config['METRICS_DIR'])
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
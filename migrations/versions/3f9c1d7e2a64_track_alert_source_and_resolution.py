@@ -0,0 +1,43 @@
+"""Track alert source and resolution
+
+Revision ID: 3f9c1d7e2a64
+Revises: b23cd3a28142
+Create Date: 2026-10-19 09:12:44.518203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.engine.reflection import Inspector
+
+# revision identifiers, used by Alembic.
+revision = '3f9c1d7e2a64'
+down_revision = 'b23cd3a28142'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = Inspector.from_engine(bind)
+    columns = [c['name'] for c in inspector.get_columns('alert')]
+    indexes = [idx['name'] for idx in inspector.get_indexes('alert')]
+
+    with op.batch_alter_table('alert', schema=None) as batch_op:
+        if 'inventory_id' not in columns:
+            batch_op.add_column(sa.Column('inventory_id', sa.Integer(), nullable=True))
+        if 'resolved_at' not in columns:
+            batch_op.add_column(sa.Column('resolved_at', sa.DateTime(), nullable=True))
+
+    with op.batch_alter_table('alert', schema=None) as batch_op:
+        if 'ix_alert_inventory_id' not in indexes:
+            batch_op.create_index('ix_alert_inventory_id', ['inventory_id'], unique=False)
+        if 'ix_alert_resolved_at' not in indexes:
+            batch_op.create_index('ix_alert_resolved_at', ['resolved_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('alert', schema=None) as batch_op:
+        batch_op.drop_index('ix_alert_resolved_at')
+        batch_op.drop_index('ix_alert_inventory_id')
+        batch_op.drop_column('resolved_at')
+        batch_op.drop_column('inventory_id')
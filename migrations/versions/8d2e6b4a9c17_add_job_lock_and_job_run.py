@@ -0,0 +1,61 @@
+"""Add job_lock and job_run tables for the background scheduler
+
+Revision ID: 8d2e6b4a9c17
+Revises: 3f9c1d7e2a64
+Create Date: 2026-10-19 10:03:27.904415
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.engine.reflection import Inspector
+
+# revision identifiers, used by Alembic.
+revision = '8d2e6b4a9c17'
+down_revision = '3f9c1d7e2a64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = Inspector.from_engine(bind)
+    tables = inspector.get_table_names()
+
+    if 'job_lock' not in tables:
+        op.create_table('job_lock',
+            sa.Column('name', sa.String(length=50), nullable=False),
+            sa.Column('owner', sa.String(length=100), nullable=True),
+            sa.Column('expires_at', sa.DateTime(), nullable=True),
+            sa.Column('cursor', sa.Integer(), nullable=True),
+            sa.Column('last_run_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('name')
+        )
+
+    if 'job_run' not in tables:
+        op.create_table('job_run',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('job', sa.String(length=50), nullable=False),
+            sa.Column('owner', sa.String(length=100), nullable=True),
+            sa.Column('started_at', sa.DateTime(), nullable=True),
+            sa.Column('duration_ms', sa.Integer(), nullable=True),
+            sa.Column('chunks', sa.Integer(), nullable=True),
+            sa.Column('rows_scanned', sa.Integer(), nullable=True),
+            sa.Column('expired_count', sa.Integer(), nullable=True),
+            sa.Column('created_count', sa.Integer(), nullable=True),
+            sa.Column('updated_count', sa.Integer(), nullable=True),
+            sa.Column('resolved_count', sa.Integer(), nullable=True),
+            sa.Column('completed', sa.Boolean(), nullable=True),
+            sa.Column('error', sa.Text(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('job_run', schema=None) as batch_op:
+            batch_op.create_index('ix_job_run_job', ['job'], unique=False)
+            batch_op.create_index('ix_job_run_started_at', ['started_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('job_run', schema=None) as batch_op:
+        batch_op.drop_index('ix_job_run_started_at')
+        batch_op.drop_index('ix_job_run_job')
+    op.drop_table('job_run')
+    op.drop_table('job_lock')
@@ -0,0 +1,39 @@
+"""Add last-modified indexes on inventory and product
+
+Revision ID: a93e5c1d7b26
+Revises: f2b7d4e8a051
+Create Date: 2026-10-19 15:47:12.208934
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.engine.reflection import Inspector
+
+# revision identifiers, used by Alembic.
+revision = 'a93e5c1d7b26'
+down_revision = 'f2b7d4e8a051'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = Inspector.from_engine(bind)
+    inventory_indexes = [idx['name'] for idx in inspector.get_indexes('inventory')]
+    product_indexes = [idx['name'] for idx in inspector.get_indexes('product')]
+
+    with op.batch_alter_table('inventory', schema=None) as batch_op:
+        if 'ix_inventory_last_updated' not in inventory_indexes:
+            batch_op.create_index('ix_inventory_last_updated', ['last_updated'], unique=False)
+
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        if 'ix_product_updated_at' not in product_indexes:
+            batch_op.create_index('ix_product_updated_at', ['updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.drop_index('ix_product_updated_at')
+
+    with op.batch_alter_table('inventory', schema=None) as batch_op:
+        batch_op.drop_index('ix_inventory_last_updated')
@@ -0,0 +1,38 @@
+"""Add inventory valuation snapshots
+
+Revision ID: b6d2f8a4c390
+Revises: a93e5c1d7b26
+Create Date: 2026-10-19 16:21:40.883517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.engine.reflection import Inspector
+
+# revision identifiers, used by Alembic.
+revision = 'b6d2f8a4c390'
+down_revision = 'a93e5c1d7b26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = Inspector.from_engine(bind)
+    tables = inspector.get_table_names()
+
+    if 'inventory_valuation' not in tables:
+        op.create_table('inventory_valuation',
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('branch_id', sa.Integer(), nullable=False),
+            sa.Column('category', sa.String(length=100), nullable=False),
+            sa.Column('units', sa.Float(), nullable=False),
+            sa.Column('value', sa.Float(), nullable=False),
+            sa.Column('line_count', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('day', 'branch_id', 'category')
+        )
+
+
+def downgrade():
+    op.drop_table('inventory_valuation')
@@ -0,0 +1,59 @@
+"""Add stock movement ledger and checkpoints
+
+Revision ID: c4e9a1b7d2f5
+Revises: b6d2f8a4c390
+Create Date: 2026-10-19 17:05:29.471630
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.engine.reflection import Inspector
+
+# revision identifiers, used by Alembic.
+revision = 'c4e9a1b7d2f5'
+down_revision = 'b6d2f8a4c390'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = Inspector.from_engine(bind)
+    tables = inspector.get_table_names()
+
+    if 'stock_movement' not in tables:
+        op.create_table('stock_movement',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('inventory_id', sa.Integer(), nullable=False),
+            sa.Column('delta', sa.Float(), nullable=False),
+            sa.Column('reason', sa.String(length=20), nullable=False),
+            sa.Column('reference', sa.String(length=64), nullable=True),
+            sa.Column('user_id', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('stock_movement', schema=None) as batch_op:
+            batch_op.create_index('ix_stock_movement_inventory_id', ['inventory_id'], unique=False)
+            batch_op.create_index('ix_stock_movement_created_at', ['created_at'], unique=False)
+
+    if 'stock_checkpoint' not in tables:
+        op.create_table('stock_checkpoint',
+            sa.Column('inventory_id', sa.Integer(), nullable=False),
+            sa.Column('quantity', sa.Float(), nullable=False),
+            sa.Column('folded_count', sa.Integer(), nullable=False),
+            sa.Column('compacted_through', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('inventory_id')
+        )
+        # Existing stock becomes each row's opening balance
+        op.execute(
+            "INSERT INTO stock_checkpoint (inventory_id, quantity, folded_count, compacted_through) "
+            "SELECT id, COALESCE(quantity_on_hand, 0), 0, CURRENT_TIMESTAMP FROM inventory"
+        )
+
+
+def downgrade():
+    op.drop_table('stock_checkpoint')
+    with op.batch_alter_table('stock_movement', schema=None) as batch_op:
+        batch_op.drop_index('ix_stock_movement_created_at')
+        batch_op.drop_index('ix_stock_movement_inventory_id')
+    op.drop_table('stock_movement')
@@ -0,0 +1,34 @@
+"""Add inventory expiry and entry date indexes
+
+Revision ID: c71a0e5f3b98
+Revises: 8d2e6b4a9c17
+Create Date: 2026-10-19 11:26:51.377802
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.engine.reflection import Inspector
+
+# revision identifiers, used by Alembic.
+revision = 'c71a0e5f3b98'
+down_revision = '8d2e6b4a9c17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = Inspector.from_engine(bind)
+    indexes = [idx['name'] for idx in inspector.get_indexes('inventory')]
+
+    with op.batch_alter_table('inventory', schema=None) as batch_op:
+        if 'ix_inventory_expiry_qty' not in indexes:
+            batch_op.create_index('ix_inventory_expiry_qty', ['expiry_date', 'quantity_on_hand'], unique=False)
+        if 'ix_inventory_entry_date' not in indexes:
+            batch_op.create_index('ix_inventory_entry_date', ['entry_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('inventory', schema=None) as batch_op:
+        batch_op.drop_index('ix_inventory_entry_date')
+        batch_op.drop_index('ix_inventory_expiry_qty')
@@ -0,0 +1,35 @@
+"""Add client_ref idempotency key to sale
+
+Revision ID: d4b8f2c6e013
+Revises: c71a0e5f3b98
+Create Date: 2026-10-19 12:40:09.261574
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.engine.reflection import Inspector
+
+# revision identifiers, used by Alembic.
+revision = 'd4b8f2c6e013'
+down_revision = 'c71a0e5f3b98'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = Inspector.from_engine(bind)
+    columns = [c['name'] for c in inspector.get_columns('sale')]
+    constraints = [uc['name'] for uc in inspector.get_unique_constraints('sale')]
+
+    with op.batch_alter_table('sale', schema=None) as batch_op:
+        if 'client_ref' not in columns:
+            batch_op.add_column(sa.Column('client_ref', sa.String(length=64), nullable=True))
+        if 'uq_sale_client_ref' not in constraints:
+            batch_op.create_unique_constraint('uq_sale_client_ref', ['client_ref'])
+
+
+def downgrade():
+    with op.batch_alter_table('sale', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_sale_client_ref', type_='unique')
+        batch_op.drop_column('client_ref')
@@ -0,0 +1,54 @@
+"""Add daily sales rollup tables
+
+Revision ID: e5a3c9d1f742
+Revises: d4b8f2c6e013
+Create Date: 2026-10-19 13:52:18.640027
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.engine.reflection import Inspector
+
+# revision identifiers, used by Alembic.
+revision = 'e5a3c9d1f742'
+down_revision = 'd4b8f2c6e013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = Inspector.from_engine(bind)
+    tables = inspector.get_table_names()
+
+    if 'sales_daily_product' not in tables:
+        op.create_table('sales_daily_product',
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('branch_id', sa.Integer(), nullable=False),
+            sa.Column('product_id', sa.Integer(), nullable=False),
+            sa.Column('quantity', sa.Integer(), nullable=False),
+            sa.Column('revenue', sa.Float(), nullable=False),
+            sa.Column('line_count', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('day', 'branch_id', 'product_id')
+        )
+        with op.batch_alter_table('sales_daily_product', schema=None) as batch_op:
+            batch_op.create_index('ix_sales_daily_product_product_id', ['product_id'], unique=False)
+
+    if 'sales_daily_payment' not in tables:
+        op.create_table('sales_daily_payment',
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('branch_id', sa.Integer(), nullable=False),
+            sa.Column('payment_type', sa.String(length=20), nullable=False),
+            sa.Column('sale_count', sa.Integer(), nullable=False),
+            sa.Column('revenue', sa.Float(), nullable=False),
+            sa.PrimaryKeyConstraint('day', 'branch_id', 'payment_type')
+        )
+
+    # Existing history is backfilled with: flask rebuild-rollups
+
+
+def downgrade():
+    op.drop_table('sales_daily_payment')
+    with op.batch_alter_table('sales_daily_product', schema=None) as batch_op:
+        batch_op.drop_index('ix_sales_daily_product_product_id')
+    op.drop_table('sales_daily_product')
@@ -0,0 +1,39 @@
+"""Add sales history indexes
+
+Revision ID: f2b7d4e8a051
+Revises: e5a3c9d1f742
+Create Date: 2026-10-19 14:02:37.614205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.engine.reflection import Inspector
+
+# revision identifiers, used by Alembic.
+revision = 'f2b7d4e8a051'
+down_revision = 'e5a3c9d1f742'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = Inspector.from_engine(bind)
+    sale_indexes = [idx['name'] for idx in inspector.get_indexes('sale')]
+    item_indexes = [idx['name'] for idx in inspector.get_indexes('sale_item')]
+
+    with op.batch_alter_table('sale', schema=None) as batch_op:
+        if 'ix_sale_sale_date_id' not in sale_indexes:
+            batch_op.create_index('ix_sale_sale_date_id', ['sale_date', 'id'], unique=False)
+
+    with op.batch_alter_table('sale_item', schema=None) as batch_op:
+        if 'ix_sale_item_sale_id' not in item_indexes:
+            batch_op.create_index('ix_sale_item_sale_id', ['sale_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('sale_item', schema=None) as batch_op:
+        batch_op.drop_index('ix_sale_item_sale_id')
+
+    with op.batch_alter_table('sale', schema=None) as batch_op:
+        batch_op.drop_index('ix_sale_sale_date_id')
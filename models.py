@@ -78,13 +78,17 @@ class Product(db.Model):
     supplier = db.Column(db.String(100))
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     inventory = db.relationship('Inventory', backref='product', lazy=True)
     sale_items = db.relationship('SaleItem', backref='product', lazy=True)
 
 
 class Inventory(db.Model):
+    __table_args__ = (
+        # FEFO lookups filter on expiry and stock together
+        db.Index('ix_inventory_expiry_qty', 'expiry_date', 'quantity_on_hand'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=True)
     branch_id = db.Column(db.Integer, db.ForeignKey('branch.id'), nullable=True)
@@ -100,20 +104,25 @@ class Inventory(db.Model):
     extra_info = db.Column(db.String(255))
     
     expiry_date = db.Column(db.DateTime)
-    entry_date = db.Column(db.DateTime, default=datetime.utcnow)
+    entry_date = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     batch_number = db.Column(db.String(50))
     status = db.Column(db.String(20), default='AVAILABLE')
-    last_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    last_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
 class Sale(db.Model):
+    __table_args__ = (
+        # Keyset pagination of the sales history (newest first)
+        db.Index('ix_sale_sale_date_id', 'sale_date', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     branch_id = db.Column(db.Integer, db.ForeignKey('branch.id'), nullable=True)
     total_amount = db.Column(db.Float, nullable=False)
     payment_type = db.Column(db.String(20), default='CASH') # CASH, CARD, MOBILE
     sale_date = db.Column(db.DateTime, default=datetime.utcnow)
+    client_ref = db.Column(db.String(64), unique=True, nullable=True) # Idempotency key from offline tills
     
     items = db.relationship('SaleItem', backref='sale', lazy=True)
     user = db.relationship('User', backref='sales', lazy=True)
@@ -122,23 +131,79 @@ class Sale(db.Model):
 
 class SaleItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    sale_id = db.Column(db.Integer, db.ForeignKey('sale.id'), nullable=True)
+    sale_id = db.Column(db.Integer, db.ForeignKey('sale.id'), nullable=True, index=True)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     price = db.Column(db.Float, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
+class SalesDailyProduct(db.Model):
+    """Per-day, per-branch, per-product sales rollup (branch 0 = sale had no branch)."""
+    __tablename__ = 'sales_daily_product'
+    day = db.Column(db.Date, primary_key=True)
+    branch_id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, primary_key=True, index=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+    line_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class SalesDailyPayment(db.Model):
+    """Per-day, per-branch, per-payment-type sales rollup."""
+    __tablename__ = 'sales_daily_payment'
+    day = db.Column(db.Date, primary_key=True)
+    branch_id = db.Column(db.Integer, primary_key=True)
+    payment_type = db.Column(db.String(20), primary_key=True)
+    sale_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+
+
+class InventoryValuation(db.Model):
+    """Stock on hand and its value per branch and category, snapshotted once a day."""
+    __tablename__ = 'inventory_valuation'
+    day = db.Column(db.Date, primary_key=True)  # leading PK column: range scans by date
+    branch_id = db.Column(db.Integer, primary_key=True)
+    category = db.Column(db.String(100), primary_key=True)
+    units = db.Column(db.Float, nullable=False, default=0.0)
+    value = db.Column(db.Float, nullable=False, default=0.0)
+    line_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class StockMovement(db.Model):
+    """Append-only ledger of signed stock changes; Inventory.quantity_on_hand is its cached total."""
+    __tablename__ = 'stock_movement'
+    id = db.Column(db.Integer, primary_key=True)
+    inventory_id = db.Column(db.Integer, nullable=False, index=True)
+    delta = db.Column(db.Float, nullable=False)
+    reason = db.Column(db.String(20), nullable=False)  # SALE, RECEIPT, IMPORT, ADJUSTMENT, COUNT
+    reference = db.Column(db.String(64))  # e.g. sale:42
+    user_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+class StockCheckpoint(db.Model):
+    """Movements folded away by compaction: their summed delta per inventory row."""
+    __tablename__ = 'stock_checkpoint'
+    inventory_id = db.Column(db.Integer, primary_key=True)
+    quantity = db.Column(db.Float, nullable=False, default=0.0)
+    folded_count = db.Column(db.Integer, nullable=False, default=0)
+    compacted_through = db.Column(db.DateTime)
+
+
 class Alert(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     type = db.Column(db.String(20), nullable=False)
     message = db.Column(db.Text, nullable=False)
     product_id = db.Column(db.Integer)
     branch_id = db.Column(db.Integer)
+    inventory_id = db.Column(db.Integer, index=True) # Source row, used to diff alerts between runs
     quantity = db.Column(db.Integer)
     days_until_expiry = db.Column(db.Integer)
     is_read = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    resolved_at = db.Column(db.DateTime, index=True) # NULL while the alert is still open
 
 
 class ImportLog(db.Model):
@@ -150,3 +215,30 @@ class ImportLog(db.Model):
     failed_count = db.Column(db.Integer, default=0)
     log_filename = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class JobLock(db.Model):
+    """Lease row used to elect a single leader for background jobs across workers."""
+    __tablename__ = 'job_lock'
+    name = db.Column(db.String(50), primary_key=True)
+    owner = db.Column(db.String(100))
+    expires_at = db.Column(db.DateTime)
+    cursor = db.Column(db.Integer) # Last inventory id processed by an unfinished pass
+    last_run_at = db.Column(db.DateTime) # Set when a pass completes
+
+
+class JobRun(db.Model):
+    __tablename__ = 'job_run'
+    id = db.Column(db.Integer, primary_key=True)
+    job = db.Column(db.String(50), nullable=False, index=True)
+    owner = db.Column(db.String(100))
+    started_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    duration_ms = db.Column(db.Integer)
+    chunks = db.Column(db.Integer, default=0)
+    rows_scanned = db.Column(db.Integer, default=0)
+    expired_count = db.Column(db.Integer, default=0)
+    created_count = db.Column(db.Integer, default=0)
+    updated_count = db.Column(db.Integer, default=0)
+    resolved_count = db.Column(db.Integer, default=0)
+    completed = db.Column(db.Boolean, default=False) # False when the time budget ran out mid-pass
+    error = db.Column(db.Text)
@@ -0,0 +1,126 @@
+import os
+import time
+from collections import deque
+from datetime import datetime
+from flask import g, request, has_request_context, before_render_template, template_rendered
+from sqlalchemy import event
+from database import db
+
+# Recent requests kept per process; the admin page shows the slowest of them
+BUFFER_SIZE = 500
+
+_recent = deque(maxlen=BUFFER_SIZE)
+_enabled = False
+
+
+def _env_flag(name, default='0'):
+    return os.environ.get(name, default).lower() in ('1', 'true', 'yes')
+
+
+# =====================
+# HOOKS
+# =====================
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'profile' in g:
+        context._profiler_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_profiler_started', None)
+    if started is not None and has_request_context() and 'profile' in g:
+        g.profile['sql_ms'] += (time.perf_counter() - started) * 1000
+        g.profile['sql_count'] += 1
+
+
+def _before_render(sender, template, context, **extra):
+    if 'profile' in g:
+        g.profile['render_started'].append(time.perf_counter())
+
+
+def _after_render(sender, template, context, **extra):
+    if 'profile' in g and g.profile['render_started']:
+        g.profile['render_ms'] += (time.perf_counter() - g.profile['render_started'].pop()) * 1000
+
+
+def _start_request():
+    if _enabled:
+        g.profile = {'started': time.perf_counter(), 'sql_ms': 0.0, 'sql_count': 0,
+                     'render_ms': 0.0, 'render_started': []}
+
+
+def _finish_request(response):
+    profile = g.pop('profile', None)
+    if profile is None:
+        return response
+    total_ms = (time.perf_counter() - profile['started']) * 1000
+    response.headers['Server-Timing'] = (
+        f'db;dur={profile["sql_ms"]:.1f};desc="{profile["sql_count"]} queries", '
+        f'render;dur={profile["render_ms"]:.1f}, total;dur={total_ms:.1f}'
+    )
+    _recent.append({
+        'at': datetime.utcnow(),
+        'method': request.method,
+        'path': request.path,
+        'endpoint': request.endpoint,
+        'status': response.status_code,
+        'total_ms': round(total_ms, 1),
+        'sql_ms': round(profile['sql_ms'], 1),
+        'sql_count': profile['sql_count'],
+        'render_ms': round(profile['render_ms'], 1),
+    })
+    return response
+
+
+# =====================
+# SWITCH
+# =====================
+def enable(app):
+    """
+    Start timing requests. Engine and template listeners are only attached
+    while enabled, so a disabled profiler costs one flag check per request.
+    """
+    global _enabled
+    with app.app_context():
+        engine = db.engine
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+    _enabled = True
+
+
+def disable(app):
+    global _enabled
+    _enabled = False
+    with app.app_context():
+        engine = db.engine
+    if event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.remove(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.remove(engine, 'after_cursor_execute', _after_cursor_execute)
+    before_render_template.disconnect(_before_render, app)
+    template_rendered.disconnect(_after_render, app)
+
+
+def is_enabled():
+    return _enabled
+
+
+# =====================
+# QUERIES
+# =====================
+def slowest(limit=50):
+    """Slowest of the recent requests handled by this process, slowest first."""
+    return sorted(list(_recent), key=lambda r: r['total_ms'], reverse=True)[:limit]
+
+
+def clear():
+    _recent.clear()
+
+
+def init_app(app):
+    app.config.setdefault('PROFILER_ENABLED', _env_flag('PROFILER_ENABLED'))
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    if app.config['PROFILER_ENABLED']:
+        enable(app)
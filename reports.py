@@ -0,0 +1,113 @@
+from sqlalchemy import func
+from database import db
+from models import Product, Inventory
+import analytics
+import valuation
+
+# Statuses always shown on the stock health chart, even when empty
+STATUSES = ('AVAILABLE', 'LOW_STOCK', 'EXPIRED', 'DISCONTINUED')
+# Label for inventory rows with no status
+NO_STATUS = 'UNKNOWN'
+
+
+def _series(rows):
+    """[(label, value), ...] -> the {labels, data} shape Chart.js consumes."""
+    return {
+        'labels': [label for label, _ in rows],
+        'data': [float(value or 0) for _, value in rows]
+    }
+
+
+def _label(column, default):
+    """column, with NULL and empty strings reported as default (as `value || default` did in the browser)."""
+    return func.coalesce(func.nullif(column, ''), default)
+
+
+def _month(column):
+    """YYYY-MM of a datetime column, in the current database's dialect."""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.to_char(column, 'YYYY-MM')
+    return func.strftime('%Y-%m', column)
+
+
+# =====================
+# CHART SERIES
+# =====================
+def category_distribution():
+    """Products per category."""
+    label = _label(Product.category, 'Uncategorized')
+    return _series(db.session.query(label, func.count(Product.id)).group_by(label).order_by(label).all())
+
+
+def brand_share():
+    """Products per brand."""
+    label = _label(Product.brand, 'Generic')
+    return _series(db.session.query(label, func.count(Product.id)).group_by(label).order_by(label).all())
+
+
+def status_health():
+    """Units on hand per inventory status."""
+    totals = dict.fromkeys(STATUSES, 0)
+    label = _label(Inventory.status, NO_STATUS)
+    totals.update(db.session.query(label, func.sum(Inventory.quantity_on_hand)).group_by(label).all())
+    return _series(totals.items())
+
+
+def expiry_timeline():
+    """Units on hand per expiry month."""
+    month = _month(Inventory.expiry_date)
+    return _series(db.session.query(month, func.sum(Inventory.quantity_on_hand)).filter(
+        Inventory.expiry_date.isnot(None)
+    ).group_by(month).order_by(month).all())
+
+
+def top_products(limit=10):
+    """Products with the most units on hand."""
+    quantity = func.sum(Inventory.quantity_on_hand)
+    return _series(db.session.query(Product.name, quantity).join(
+        Inventory, Inventory.product_id == Product.id
+    ).group_by(Product.name).order_by(quantity.desc()).limit(limit).all())
+
+
+def top_suppliers(limit=5):
+    """Suppliers by number of products."""
+    label = _label(Product.supplier, 'Unknown')
+    count = func.count(Product.id)
+    return _series(db.session.query(label, count).group_by(label).order_by(count.desc()).limit(limit).all())
+
+
+def creation_timeline():
+    """Products added per day."""
+    day = func.date(Product.created_at)
+    rows = db.session.query(day, func.count(Product.id)).filter(
+        Product.created_at.isnot(None)
+    ).group_by(day).order_by(day).all()
+    return _series([(str(d), n) for d, n in rows])
+
+
+def batch_distribution(limit=10):
+    """Batches with the most units on hand."""
+    label = _label(Inventory.batch_number, 'Default')
+    quantity = func.sum(Inventory.quantity_on_hand)
+    return _series(db.session.query(label, quantity).group_by(label).order_by(quantity.desc()).limit(limit).all())
+
+
+# Report name (as used in /api/reports/<name>) -> series builder
+REPORTS = {
+    'categories': category_distribution,
+    'brands': brand_share,
+    'status': status_health,
+    'expiry': expiry_timeline,
+    'top-products': top_products,
+    'suppliers': top_suppliers,
+    'created': creation_timeline,
+    'batches': batch_distribution,
+    # Columnar metrics, cached per data version
+    'stock-value': lambda: analytics.metrics()['stock-value'],
+    'ageing': lambda: analytics.metrics()['ageing'],
+    'expiry-risk': lambda: analytics.metrics()['expiry-risk'],
+    'sell-through': lambda: analytics.metrics()['sell-through'],
+    # Nightly snapshots
+    'valuation': valuation.value_trend,
+}
+
@@ -0,0 +1,191 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+import click
+from sqlalchemy import select, delete, insert, func
+from database import db
+from models import Sale, SaleItem, Product, SalesDailyProduct, SalesDailyPayment
+
+# Rollup key used when a sale has no branch / payment type recorded
+NO_BRANCH = 0
+NO_PAYMENT_TYPE = 'UNKNOWN'
+
+
+def upsert_add(model, rows, key_columns, sum_columns, replace_columns=()):
+    """
+    INSERT the rows, adding to the existing counters on key conflict
+    (replace_columns are overwritten instead).
+
+    The increment happens inside the database (ON CONFLICT DO UPDATE on
+    SQLite and PostgreSQL), so concurrent workers never lose an update.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        # No portable upsert: read-modify-write, fine for single-writer setups
+        for row in rows:
+            existing = db.session.get(model, tuple(row[k] for k in key_columns))
+            if existing:
+                for col in sum_columns:
+                    setattr(existing, col, (getattr(existing, col) or 0) + row[col])
+                for col in replace_columns:
+                    setattr(existing, col, row[col])
+            else:
+                db.session.add(model(**row))
+        return
+
+    stmt = dialect_insert(table).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={**{col: table.c[col] + stmt.excluded[col] for col in sum_columns},
+              **{col: stmt.excluded[col] for col in replace_columns}}
+    )
+    db.session.execute(stmt)
+
+
+# =====================
+# INCREMENTAL UPDATES
+# =====================
+def record_sales(sales):
+    """
+    Fold newly added sales into the rollups, inside the caller's transaction.
+
+    Call after the sales have been flushed so sale_date defaults are set.
+    """
+    by_product = defaultdict(lambda: [0, 0.0, 0])
+    by_payment = defaultdict(lambda: [0, 0.0])
+    for sale in sales:
+        day = (sale.sale_date or datetime.utcnow()).date()
+        branch = sale.branch_id or NO_BRANCH
+        payment = by_payment[(day, branch, sale.payment_type or NO_PAYMENT_TYPE)]
+        payment[0] += 1
+        payment[1] += sale.total_amount or 0
+        for item in sale.items:
+            product = by_product[(day, branch, item.product_id)]
+            product[0] += item.quantity or 0
+            product[1] += item.price or 0
+            product[2] += 1
+
+    upsert_add(SalesDailyProduct, [
+        {'day': d, 'branch_id': b, 'product_id': p, 'quantity': q, 'revenue': r, 'line_count': n}
+        for (d, b, p), (q, r, n) in by_product.items()
+    ], ['day', 'branch_id', 'product_id'], ['quantity', 'revenue', 'line_count'])
+    upsert_add(SalesDailyPayment, [
+        {'day': d, 'branch_id': b, 'payment_type': t, 'sale_count': n, 'revenue': r}
+        for (d, b, t), (n, r) in by_payment.items()
+    ], ['day', 'branch_id', 'payment_type'], ['sale_count', 'revenue'])
+
+
+# =====================
+# REBUILD
+# =====================
+def rebuild(start=None, end=None):
+    """
+    Recompute the rollups for [start, end] (dates, None = unbounded) from the
+    sale tables with two INSERT ... SELECT ... GROUP BY statements. Caller commits.
+    """
+    sale_day = func.date(Sale.sale_date)
+    sale_filters = []
+    product_scope, payment_scope = [], []
+    if start:
+        sale_filters.append(Sale.sale_date >= datetime.combine(start, datetime.min.time()))
+        product_scope.append(SalesDailyProduct.day >= start)
+        payment_scope.append(SalesDailyPayment.day >= start)
+    if end:
+        sale_filters.append(Sale.sale_date < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+        product_scope.append(SalesDailyProduct.day <= end)
+        payment_scope.append(SalesDailyPayment.day <= end)
+
+    db.session.execute(delete(SalesDailyProduct).where(*product_scope))
+    db.session.execute(delete(SalesDailyPayment).where(*payment_scope))
+
+    branch = func.coalesce(Sale.branch_id, NO_BRANCH)
+    product_rows = select(
+        sale_day, branch, SaleItem.product_id,
+        func.sum(SaleItem.quantity), func.sum(SaleItem.price), func.count(SaleItem.id)
+    ).join(Sale, Sale.id == SaleItem.sale_id).where(*sale_filters).group_by(
+        sale_day, branch, SaleItem.product_id
+    )
+    db.session.execute(insert(SalesDailyProduct.__table__).from_select(
+        ['day', 'branch_id', 'product_id', 'quantity', 'revenue', 'line_count'], product_rows
+    ))
+
+    payment_type = func.coalesce(Sale.payment_type, NO_PAYMENT_TYPE)
+    payment_rows = select(
+        sale_day, branch, payment_type, func.count(Sale.id), func.coalesce(func.sum(Sale.total_amount), 0)
+    ).where(*sale_filters).group_by(sale_day, branch, payment_type)
+    db.session.execute(insert(SalesDailyPayment.__table__).from_select(
+        ['day', 'branch_id', 'payment_type', 'sale_count', 'revenue'], payment_rows
+    ))
+
+
+# =====================
+# QUERIES
+# =====================
+def total_revenue(branch_id=None):
+    query = db.session.query(func.sum(SalesDailyPayment.revenue))
+    if branch_id:
+        query = query.filter(SalesDailyPayment.branch_id == branch_id)
+    return query.scalar() or 0
+
+
+def revenue_summary(start, end, branch_id=None):
+    """Daily revenue/sale counts plus totals per payment type for [start, end]."""
+    filters = [SalesDailyPayment.day >= start, SalesDailyPayment.day <= end]
+    if branch_id:
+        filters.append(SalesDailyPayment.branch_id == branch_id)
+
+    days = db.session.query(
+        SalesDailyPayment.day, func.sum(SalesDailyPayment.revenue), func.sum(SalesDailyPayment.sale_count)
+    ).filter(*filters).group_by(SalesDailyPayment.day).order_by(SalesDailyPayment.day).all()
+    payments = db.session.query(
+        SalesDailyPayment.payment_type, func.sum(SalesDailyPayment.revenue), func.sum(SalesDailyPayment.sale_count)
+    ).filter(*filters).group_by(SalesDailyPayment.payment_type).all()
+
+    return {
+        'days': [{'date': d.isoformat(), 'revenue': float(r or 0), 'sales': int(n or 0)} for d, r, n in days],
+        'by_payment_type': [{'payment_type': t, 'revenue': float(r or 0), 'sales': int(n or 0)} for t, r, n in payments],
+        'total_revenue': float(sum(r or 0 for _, r, _ in days)),
+        'total_sales': int(sum(n or 0 for _, _, n in days))
+    }
+
+
+def product_volume(start, end, branch_id=None, order_by='revenue', limit=20):
+    """Top products by revenue or quantity sold over [start, end]."""
+    filters = [SalesDailyProduct.day >= start, SalesDailyProduct.day <= end]
+    if branch_id:
+        filters.append(SalesDailyProduct.branch_id == branch_id)
+    quantity = func.sum(SalesDailyProduct.quantity).label('quantity')
+    revenue = func.sum(SalesDailyProduct.revenue).label('revenue')
+
+    rows = db.session.query(
+        SalesDailyProduct.product_id, Product.name, quantity, revenue
+    ).outerjoin(Product, Product.id == SalesDailyProduct.product_id).filter(*filters).group_by(
+        SalesDailyProduct.product_id, Product.name
+    ).order_by((quantity if order_by == 'quantity' else revenue).desc()).limit(limit).all()
+
+    return [{'product_id': pid, 'name': name, 'quantity': int(q or 0), 'revenue': float(r or 0)}
+            for pid, name, q, r in rows]
+
+
+# =====================
+# CLI
+# =====================
+@click.command('rebuild-rollups')
+@click.option('--start', type=click.DateTime(formats=['%Y-%m-%d']), help='First day to rebuild (default: all history).')
+@click.option('--end', type=click.DateTime(formats=['%Y-%m-%d']), help='Last day to rebuild (default: all history).')
+def rebuild_rollups_command(start, end):
+    """Recompute the daily sales rollup tables from Sale/SaleItem."""
+    rebuild(start.date() if start else None, end.date() if end else None)
+    db.session.commit()
+    days = db.session.query(func.count(func.distinct(SalesDailyPayment.day))).scalar()
+    click.echo(f"Rollups rebuilt ({days} days of sales).")
+
+
+def init_app(app):
+    app.cli.add_command(rebuild_rollups_command)
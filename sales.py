@@ -0,0 +1,344 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import update, or_, and_
+from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy.exc import IntegrityError
+from database import db
+from models import Product, Inventory, Sale, SaleItem
+import alerts
+import expiry_index
+import rollups
+import ledger
+
+
+# Offline till uploads: sales committed per transaction / accepted per request
+SYNC_CHUNK_SIZE = 100
+SYNC_MAX_BATCH = 1000
+
+# Sales shown per page of the history view
+HISTORY_PAGE_SIZE = 25
+
+
+class SaleError(Exception):
+    """A basket that cannot be sold as-is (e.g. a line is short on stock)."""
+
+
+def parse_lines(items):
+    """Normalise the JSON basket into (product_id, quantity, price-or-None) tuples."""
+    lines = []
+    for item in items:
+        try:
+            product_id, quantity = int(item['product_id']), int(item['quantity'])
+        except (KeyError, TypeError, ValueError) as e:
+            raise SaleError(f'Invalid line {item!r}: {e}')
+        if product_id <= 0:
+            raise SaleError(f'Invalid product_id {product_id}')
+        # A zero or negative line would pass the stock check and add stock
+        if quantity <= 0:
+            raise SaleError(f'Quantity must be positive, got {quantity} for product {product_id}')
+        lines.append((product_id, quantity, item.get('price')))
+    return lines
+
+
+def load_basket(product_ids, branch_id, lock=False):
+    """
+    Fetch products and their branch inventory rows for a basket: one query each.
+
+    With lock=True the inventory rows are taken FOR UPDATE (PostgreSQL; other
+    backends ignore it) in id order so concurrent tills never deadlock.
+    """
+    products = {p.id: p for p in Product.query.filter(Product.id.in_(product_ids))} if product_ids else {}
+    inventory = {}
+    if products:
+        inv_query = Inventory.query.filter(
+            Inventory.product_id.in_(products.keys()),
+            Inventory.branch_id == branch_id
+        ).order_by(Inventory.id)
+        if lock and db.session.get_bind().dialect.name == 'postgresql':
+            inv_query = inv_query.with_for_update()
+        for inv in inv_query:
+            inventory.setdefault(inv.product_id, inv)
+    return products, inventory
+
+
+def decrement_stock(needed, inventory, products):
+    """
+    Apply conditional decrements, one UPDATE per inventory row.
+
+    `quantity_on_hand >= n` is checked by the database in the same statement
+    as the subtraction, so two workers selling the last units cannot both win.
+    Raises SaleError on the first short line; the caller rolls back.
+    """
+    table = Inventory.__table__
+    touched = []
+    for product_id, quantity in needed.items():
+        inv = inventory.get(product_id)
+        if inv is None or (inv.quantity_on_hand or 0) < quantity:
+            raise SaleError(f'Insufficient stock for {products[product_id].name}')
+        result = db.session.execute(
+            update(table)
+            .where(table.c.id == inv.id, table.c.quantity_on_hand >= quantity)
+            .values(quantity_on_hand=table.c.quantity_on_hand - quantity)
+        )
+        if result.rowcount != 1:
+            raise SaleError(f'Insufficient stock for {products[product_id].name}')
+        touched.append(inv.id)
+
+    # The ORM copies are now stale, and the commit hooks can't see Core updates
+    for inv in inventory.values():
+        db.session.expire(inv, ['quantity_on_hand', 'last_updated'])
+    alerts.touch_inventory(touched)
+    expiry_index.touch(touched)
+
+
+def build_sale(lines, products, user_id=None, branch_id=1, payment_type='CASH', **extra):
+    """
+    Price a basket into an unsaved Sale. Returns (sale, needed) where needed
+    maps product_id -> total units. Unknown products are skipped, as before.
+    """
+    needed = defaultdict(int)
+    sale_items = []
+    total_amount = 0
+    for product_id, quantity, price in lines:
+        product = products.get(product_id)
+        if not product:
+            continue
+        # Use unit_price from product as default if not provided
+        unit = float(price if price is not None else (product.unit_price or 0))
+        needed[product_id] += quantity
+        sale_items.append(SaleItem(product_id=product_id, quantity=quantity, price=unit * quantity))
+        total_amount += unit * quantity
+
+    sale = Sale(
+        user_id=user_id,
+        branch_id=branch_id,
+        total_amount=total_amount,
+        payment_type=payment_type,
+        items=sale_items,
+        **extra
+    )
+    return sale, needed
+
+
+def record_sale(items, user_id=None, branch_id=1, payment_type='CASH', **extra):
+    """
+    Decrement stock for a basket and add the Sale with its items to the session.
+
+    The daily rollups and the stock ledger are updated in the same transaction. Raises SaleError
+    when any line is short; the caller owns commit/rollback. Extra keyword arguments (client_ref, sale_date) are set on the Sale.
+    """
+    lines = parse_lines(items)
+    products, inventory = load_basket({pid for pid, _, _ in lines}, branch_id, lock=True)
+    sale, needed = build_sale(lines, products, user_id, branch_id, payment_type, **extra)
+    decrement_stock(needed, inventory, products)
+    db.session.add(sale)
+    db.session.flush()
+    rollups.record_sales([sale])
+    ledger.record_sales([sale], inventory)
+    return sale
+
+
+# =====================
+# OFFLINE SYNC
+# =====================
+def _parse_sale_date(value):
+    """ISO-8601 timestamp from the till, stored as naive UTC like the rest of the schema."""
+    if not value:
+        return None
+    dt = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if dt.tzinfo:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _sync_chunk(chunk, results, user_id, branch_id):
+    """
+    Validate and write one chunk of queued sales with set-based reads.
+
+    Products and inventory for every sale in the chunk are loaded with one
+    query each; sales are then accepted in upload order against a running
+    in-memory balance, and the accepted totals are applied with one
+    conditional decrement per product. Raises SaleError if the database
+    disagrees with that balance (a concurrent sale got there first).
+    """
+    product_ids = {pid for _, entry in chunk for pid, _, _ in entry['lines']}
+    products, inventory = load_basket(product_ids, branch_id, lock=True)
+    available = {pid: inv.quantity_on_hand or 0 for pid, inv in inventory.items()}
+
+    accepted = []
+    chunk_needed = defaultdict(int)
+    for idx, entry in chunk:
+        sale, needed = build_sale(entry['lines'], products, user_id, branch_id,
+                                  entry['payment_type'], **entry['extra'])
+        short = [pid for pid, qty in needed.items() if available.get(pid, 0) < qty]
+        if short:
+            results[idx] = {'client_ref': entry['client_ref'], 'status': 'rejected',
+                            'error': f'Insufficient stock for {products[short[0]].name}'}
+            continue
+        for pid, qty in needed.items():
+            available[pid] -= qty
+            chunk_needed[pid] += qty
+        accepted.append((idx, entry, sale))
+
+    decrement_stock(chunk_needed, inventory, products)
+    db.session.add_all([sale for _, _, sale in accepted])
+    db.session.flush()
+    rollups.record_sales([sale for _, _, sale in accepted])
+    ledger.record_sales([sale for _, _, sale in accepted], inventory)
+    for idx, entry, sale in accepted:
+        results[idx] = {'client_ref': entry['client_ref'], 'status': 'created',
+                        'sale_id': sale.id, 'total': sale.total_amount}
+
+
+def _sync_one(entry, user_id, branch_id):
+    """Fallback: write a single queued sale in its own transaction."""
+    ref = entry['client_ref']
+    try:
+        existing = db.session.query(Sale.id).filter_by(client_ref=ref).scalar()
+        if existing:
+            return {'client_ref': ref, 'status': 'duplicate', 'sale_id': existing}
+        products, inventory = load_basket({pid for pid, _, _ in entry['lines']}, branch_id, lock=True)
+        sale, needed = build_sale(entry['lines'], products, user_id, branch_id,
+                                  entry['payment_type'], **entry['extra'])
+        decrement_stock(needed, inventory, products)
+        db.session.add(sale)
+        db.session.flush()
+        rollups.record_sales([sale])
+        ledger.record_sales([sale], inventory)
+        db.session.commit()
+        return {'client_ref': ref, 'status': 'created', 'sale_id': sale.id, 'total': sale.total_amount}
+    except SaleError as e:
+        db.session.rollback()
+        return {'client_ref': ref, 'status': 'rejected', 'error': str(e)}
+    except IntegrityError:
+        # Same client_ref committed by a concurrent upload
+        db.session.rollback()
+        existing = db.session.query(Sale.id).filter_by(client_ref=ref).scalar()
+        return {'client_ref': ref, 'status': 'duplicate', 'sale_id': existing}
+
+
+def sync_sales(entries, user_id=None, branch_id=1, chunk_size=SYNC_CHUNK_SIZE):
+    """
+    Ingest a batch of sales recorded offline, keyed by client-generated client_ref.
+
+    Replays (already-stored refs, or the same ref twice in the batch) come back
+    as 'duplicate' with the original sale id, so a till can safely re-upload
+    its whole queue. Each chunk commits as one transaction. Returns one result
+    dict per entry, in input order.
+    """
+    results = [None] * len(entries)
+    pending = []
+    first_seen = {}
+    repeats = []
+
+    for idx, raw in enumerate(entries):
+        ref = str((raw or {}).get('client_ref') or '').strip()
+        if not ref:
+            results[idx] = {'client_ref': None, 'status': 'rejected', 'error': 'Missing client_ref'}
+            continue
+        if ref in first_seen:
+            repeats.append((idx, ref))
+            continue
+        first_seen[ref] = idx
+        try:
+            lines = parse_lines(raw.get('items') or [])
+            sale_date = _parse_sale_date(raw.get('sale_date'))
+        except (SaleError, KeyError, TypeError, ValueError) as e:
+            results[idx] = {'client_ref': ref, 'status': 'rejected', 'error': f'Invalid sale: {e}'}
+            continue
+        if not lines:
+            results[idx] = {'client_ref': ref, 'status': 'rejected', 'error': 'No items in sale'}
+            continue
+        extra = {'client_ref': ref}
+        if sale_date:
+            extra['sale_date'] = sale_date
+        pending.append((idx, {'client_ref': ref, 'lines': lines, 'extra': extra,
+                              'payment_type': raw.get('payment_type') or 'CASH'}))
+
+    # Replays of sales stored by an earlier upload
+    existing = {}
+    refs = [entry['client_ref'] for _, entry in pending]
+    for start in range(0, len(refs), 500):
+        existing.update(db.session.query(Sale.client_ref, Sale.id).filter(
+            Sale.client_ref.in_(refs[start:start + 500])
+        ))
+    fresh = []
+    for idx, entry in pending:
+        if entry['client_ref'] in existing:
+            results[idx] = {'client_ref': entry['client_ref'], 'status': 'duplicate',
+                            'sale_id': existing[entry['client_ref']]}
+        else:
+            fresh.append((idx, entry))
+
+    for start in range(0, len(fresh), chunk_size):
+        chunk = fresh[start:start + chunk_size]
+        try:
+            _sync_chunk(chunk, results, user_id, branch_id)
+            db.session.commit()
+        except (SaleError, IntegrityError):
+            # Lost a race with another till or upload: settle this chunk sale by sale
+            db.session.rollback()
+            for idx, entry in chunk:
+                results[idx] = _sync_one(entry, user_id, branch_id)
+
+    for idx, ref in repeats:
+        # A repeat shares its first copy's fate: stored (so a duplicate now) or rejected, with the same error
+        original = results[first_seen[ref]]
+        if original['status'] in ('created', 'duplicate'):
+            results[idx] = {'client_ref': ref, 'status': 'duplicate', 'sale_id': original.get('sale_id')}
+        else:
+            results[idx] = dict(original, client_ref=ref)
+    return results
+
+
+# =====================
+# HISTORY
+# =====================
+def encode_cursor(sale):
+    return f"{sale.sale_date.isoformat()}_{sale.id}"
+
+
+def decode_cursor(value):
+    """Inverse of encode_cursor; raises ValueError on a malformed cursor."""
+    stamp, sale_id = value.rsplit('_', 1)
+    return datetime.fromisoformat(stamp), int(sale_id)
+
+
+def history_filters(start=None, end=None, branch_id=None, payment_type=None):
+    """WHERE clauses for the sales history filters (dates inclusive); shared with exports."""
+    filters = []
+    if start:
+        filters.append(Sale.sale_date >= datetime.combine(start, datetime.min.time()))
+    if end:
+        filters.append(Sale.sale_date < datetime.combine(end, datetime.min.time()) + timedelta(days=1))
+    if branch_id:
+        filters.append(Sale.branch_id == branch_id)
+    if payment_type:
+        filters.append(Sale.payment_type == payment_type)
+    return filters
+
+
+def sales_history_page(before=None, start=None, end=None, branch_id=None, payment_type=None,
+                       page_size=HISTORY_PAGE_SIZE):
+    """
+    One page of sales, newest first, with items, products, users and branches
+    eager-loaded. Keyset pagination on (sale_date, id): `before` is the
+    decoded cursor of the last sale on the previous page, so deep pages cost
+    the same as the first. Returns (sales, next_cursor-or-None).
+    """
+    query = Sale.query.options(
+        selectinload(Sale.items).joinedload(SaleItem.product),
+        joinedload(Sale.user),
+        joinedload(Sale.branch)
+    ).filter(*history_filters(start, end, branch_id, payment_type))
+    if before:
+        stamp, sale_id = before
+        query = query.filter(or_(
+            Sale.sale_date < stamp,
+            and_(Sale.sale_date == stamp, Sale.id < sale_id)
+        ))
+
+    rows = query.order_by(Sale.sale_date.desc(), Sale.id.desc()).limit(page_size + 1).all()
+    page = rows[:page_size]
+    next_cursor = encode_cursor(page[-1]) if len(rows) > page_size else None
+    return page, next_cursor
@@ -0,0 +1,258 @@
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from sqlalchemy import update, or_, true
+from sqlalchemy.exc import IntegrityError
+from database import db
+from models import Inventory, JobLock, JobRun
+from alerts import evaluate_alerts
+import metrics
+
+# Registered periodic jobs: name -> (callable, config key holding its interval in seconds)
+JOBS = {}
+
+_worker_thread = None
+_worker_pid = None
+_stop_event = threading.Event()
+
+
+def register_job(name, interval_key):
+    """Decorator adding a function to the periodic job table."""
+    def decorator(f):
+        JOBS[name] = (f, interval_key)
+        return f
+    return decorator
+
+
+def worker_id():
+    """Identify this process in lock rows and run history."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _env_flag(name, default='0'):
+    return os.environ.get(name, default).lower() in ('1', 'true', 'yes')
+
+
+# =====================
+# LEADER ELECTION
+# =====================
+def acquire_lock(name, ttl_seconds, due_after=None):
+    """
+    Try to take the lease on a job's lock row with a single conditional UPDATE.
+
+    The lease is free when it has no owner or its previous holder let it
+    expire (crashed mid-run). With due_after set, the lease is only granted
+    if the job last completed at least that many seconds ago, so every worker
+    can poll cheaply and exactly one of them runs the job per interval.
+    """
+    now = datetime.utcnow()
+    if db.session.get(JobLock, name) is None:
+        try:
+            db.session.add(JobLock(name=name))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+
+    criteria = [
+        JobLock.name == name,
+        or_(JobLock.owner.is_(None), JobLock.expires_at < now)
+    ]
+    if due_after is not None:
+        criteria.append(or_(
+            JobLock.last_run_at.is_(None),
+            JobLock.last_run_at <= now - timedelta(seconds=due_after)
+        ))
+
+    result = db.session.execute(
+        update(JobLock)
+        .where(*criteria)
+        .values(owner=worker_id(), expires_at=now + timedelta(seconds=ttl_seconds))
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def release_lock(name, completed=False):
+    values = {'owner': None, 'expires_at': None}
+    if completed:
+        values['last_run_at'] = datetime.utcnow()
+    db.session.execute(
+        update(JobLock).where(JobLock.name == name, JobLock.owner == worker_id()).values(**values)
+    )
+    db.session.commit()
+
+
+def run_job(name, due_after=None):
+    """Run a registered job under its lock. Returns the JobRun, or None if another worker holds it."""
+    func, _ = JOBS[name]
+    ttl = current_app.config['SCHEDULER_BUDGET'] + current_app.config['SCHEDULER_LEASE_GRACE']
+    if not acquire_lock(name, ttl, due_after=due_after):
+        # A periodic run that is simply not due yet is not a skipped one
+        if due_after is None:
+            _count_run(name, None)
+        return None
+
+    run = None
+    try:
+        run = func(db.session.get(JobLock, name))
+    except Exception:
+        _count_run(name, None, outcome='error')
+        raise
+    finally:
+        db.session.rollback()
+        release_lock(name, completed=bool(run and run.completed))
+    _count_run(name, run)
+    return run
+
+
+def _count_run(name, run, outcome=None):
+    if name != 'alerts':
+        return
+    if outcome is None:
+        outcome = 'skipped' if run is None else 'error' if run.error else 'completed' if run.completed else 'partial'
+    metrics.ALERT_RUNS.inc(outcome=outcome)
+
+
+# =====================
+# JOBS
+# =====================
+@register_job('alerts', 'ALERT_WORKER_INTERVAL')
+def alert_job(lock):
+    """
+    Expiry transitions and alert evaluation, in inventory-id chunks.
+
+    Each chunk commits on its own. When the time budget runs out the position
+    is saved in the lock row's cursor and the next run resumes from there.
+    """
+    config = current_app.config
+    budget = config['SCHEDULER_BUDGET']
+    chunk_size = config['ALERT_WORKER_CHUNK']
+    started = time.monotonic()
+    today = datetime.utcnow()
+    cursor = lock.cursor
+
+    run = JobRun(job='alerts', owner=worker_id(), started_at=today,
+                 chunks=0, rows_scanned=0, expired_count=0, created_count=0,
+                 updated_count=0, resolved_count=0, completed=False)
+    try:
+        while True:
+            ids = [row[0] for row in db.session.query(Inventory.id).filter(
+                Inventory.id > cursor if cursor is not None else true()
+            ).order_by(Inventory.id).limit(chunk_size)]
+            last_chunk = len(ids) < chunk_size
+            id_range = (cursor + 1 if cursor is not None else None, None if last_chunk else ids[-1])
+
+            stats = evaluate_alerts(today, id_range)
+            run.chunks += 1
+            run.rows_scanned += len(ids)
+            run.expired_count += stats['expired']
+            run.created_count += stats['created']
+            run.updated_count += stats['updated']
+            run.resolved_count += stats['resolved']
+
+            cursor = None if last_chunk else ids[-1]
+            db.session.execute(update(JobLock).where(JobLock.name == lock.name).values(cursor=cursor))
+            db.session.commit()
+
+            if last_chunk:
+                run.completed = True
+                break
+            if time.monotonic() - started >= budget:
+                break
+    except Exception as e:
+        db.session.rollback()
+        run.error = str(e)
+        current_app.logger.exception("[Scheduler] alerts job failed")
+
+    run.duration_ms = int((time.monotonic() - started) * 1000)
+    db.session.add(run)
+    db.session.commit()
+    return run
+
+
+# =====================
+# BACKGROUND THREAD
+# =====================
+def run_due_jobs():
+    """One scheduler tick: run every job whose interval has elapsed and whose lease is free."""
+    for name, (_, interval_key) in JOBS.items():
+        run_job(name, due_after=current_app.config[interval_key])
+
+
+def _worker_loop(app):
+    poll = app.config['SCHEDULER_POLL']
+    while True:
+        with app.app_context():
+            try:
+                run_due_jobs()
+            except Exception:
+                app.logger.exception("[Scheduler] tick failed")
+            finally:
+                db.session.remove()
+        if _stop_event.wait(poll):
+            break
+
+
+def start_background_worker(app):
+    """Start the scheduler thread for this process (once, and again after a fork)."""
+    global _worker_thread, _worker_pid
+    if _worker_thread is not None and _worker_thread.is_alive() and _worker_pid == os.getpid():
+        return
+    _stop_event.clear()
+    _worker_pid = os.getpid()
+    _worker_thread = threading.Thread(target=_worker_loop, args=(app,), name='scheduler', daemon=True)
+    _worker_thread.start()
+
+
+def stop_background_worker():
+    _stop_event.set()
+
+
+# =====================
+# CLI
+# =====================
+@click.command('run-jobs')
+@click.option('--job', 'job_names', multiple=True, help='Job to run (default: all registered jobs).')
+@click.option('--loop', is_flag=True, help='Keep running on each job\'s interval instead of exiting.')
+def run_jobs_command(job_names, loop):
+    """Run background jobs (alert evaluation, expiry transitions) now."""
+    names = job_names or list(JOBS)
+    while True:
+        for name in names:
+            due_after = current_app.config[JOBS[name][1]] if loop else None
+            run = run_job(name, due_after=due_after)
+            if run is None:
+                if not loop:
+                    click.echo(f"{name}: skipped, another worker holds the lock")
+                continue
+            click.echo(
+                f"{name}: {run.chunks} chunks, {run.rows_scanned} rows in {run.duration_ms} ms "
+                f"(expired {run.expired_count}, created {run.created_count}, "
+                f"updated {run.updated_count}, resolved {run.resolved_count})"
+                + ("" if run.completed else " - budget reached, will resume")
+                + (f" ERROR: {run.error}" if run.error else "")
+            )
+        if not loop:
+            break
+        time.sleep(current_app.config['SCHEDULER_POLL'])
+
+
+def init_app(app):
+    app.config.setdefault('SCHEDULER_ENABLED', _env_flag('SCHEDULER_ENABLED'))
+    app.config.setdefault('SCHEDULER_POLL', int(os.environ.get('SCHEDULER_POLL', 60)))
+    app.config.setdefault('SCHEDULER_BUDGET', float(os.environ.get('SCHEDULER_BUDGET', 10)))
+    app.config.setdefault('SCHEDULER_LEASE_GRACE', 60)
+    app.config.setdefault('ALERT_WORKER_INTERVAL', int(os.environ.get('ALERT_WORKER_INTERVAL', 900)))
+    app.config.setdefault('ALERT_WORKER_CHUNK', int(os.environ.get('ALERT_WORKER_CHUNK', 1000)))
+
+    app.cli.add_command(run_jobs_command)
+
+    @app.before_request
+    def _ensure_scheduler():
+        # Started lazily so CLI commands and a preloading master never spawn it
+        if app.config['SCHEDULER_ENABLED']:
+            start_background_worker(app)
@@ -0,0 +1,40 @@
+from sqlalchemy import or_
+from models import Product, Inventory
+
+
+def product_filters(query=None, category_id=None, branch_id=None):
+    """WHERE clauses for the product search box; shared by the HTMX search and exports."""
+    filters = []
+    if query:
+        filters.append(or_(
+            Product.name.ilike(f'%{query}%'),
+            Product.local_name.ilike(f'%{query}%'),
+            Product.sku.ilike(f'%{query}%'),
+            Product.barcode.ilike(f'%{query}%'),
+            Product.category.ilike(f'%{query}%'),
+            Product.brand.ilike(f'%{query}%')
+        ))
+    if category_id:
+        filters.append(Product.category_id == category_id)
+    if branch_id:
+        filters.append(Product.branch_id == branch_id)
+    return filters
+
+
+def inventory_filters(query=None, category_id=None, branch_id=None):
+    """WHERE clauses for the inventory search box (Inventory joined to Product)."""
+    filters = []
+    if query:
+        filters.append(or_(
+            Product.name.ilike(f'%{query}%'),
+            Product.local_name.ilike(f'%{query}%'),
+            Product.sku.ilike(f'%{query}%'),
+            Product.barcode.ilike(f'%{query}%'),
+            Inventory.batch_number.ilike(f'%{query}%'),
+            Inventory.extra_info.ilike(f'%{query}%')
+        ))
+    if category_id:
+        filters.append(Product.category_id == category_id)
+    if branch_id:
+        filters.append(Inventory.branch_id == branch_id)
+    return filters
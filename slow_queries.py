@@ -0,0 +1,144 @@
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from flask import request, has_request_context
+from sqlalchemy import event
+from database import db
+
+# Slow queries kept per process for the admin page
+KEEP = 200
+# Bind parameters whose name matches are masked in the log
+SENSITIVE_PARAMS = re.compile(r'password|token|secret|email|phone|google_id|apple_id', re.I)
+# Only statements that read or change rows get a plan; EXPLAIN never runs them
+EXPLAINABLE = re.compile(r'\s*(SELECT|WITH|UPDATE|DELETE|INSERT)\b', re.I)
+REDACTED = '***'
+
+_log = deque(maxlen=KEEP)
+_threshold_ms = 0
+
+
+# =====================
+# CAPTURE
+# =====================
+def _redact(parameters, context):
+    """Bound values with sensitive ones masked; unnamed raw-SQL params are masked entirely."""
+    if isinstance(parameters, dict):
+        return {k: REDACTED if SENSITIVE_PARAMS.search(k) else v for k, v in parameters.items()}
+    names = getattr(context.compiled, 'positiontup', None) if context is not None else None
+    if names is None:
+        return [REDACTED] * len(parameters or ())
+    return [REDACTED if SENSITIVE_PARAMS.search(name) else value for name, value in zip(names, parameters)]
+
+
+def _explain(conn, statement, parameters):
+    """Query plan read through a plain DBAPI cursor, so no engine events fire for it."""
+    if conn.dialect.name == 'sqlite':
+        prefix, format_row = 'EXPLAIN QUERY PLAN ', lambda row: row[-1]
+    elif conn.dialect.name == 'postgresql':
+        prefix, format_row = 'EXPLAIN ', lambda row: row[0]
+    else:
+        return None
+    # It runs inside the app's own transaction, which a failed statement aborts
+    # on PostgreSQL: a savepoint keeps the failure from reaching the request
+    savepoint = conn.dialect.name == 'postgresql'
+    cursor = conn.connection.cursor()
+    try:
+        if savepoint:
+            cursor.execute('SAVEPOINT slow_query_explain')
+        try:
+            cursor.execute(prefix + statement, parameters)
+            plan = '\n'.join(str(format_row(row)) for row in cursor.fetchall())
+        except Exception as e:
+            if savepoint:
+                cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+            plan = f'(plan unavailable: {e})'
+        if savepoint:
+            cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+        return plan
+    except Exception as e:
+        return f'(plan unavailable: {e})'
+    finally:
+        cursor.close()
+
+
+def _caller():
+    if has_request_context():
+        return f'{request.method} {request.path} ({request.endpoint or "unmatched"})'
+    return threading.current_thread().name
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._slow_query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_slow_query_started', None)
+    if started is None:
+        return
+    duration_ms = (time.perf_counter() - started) * 1000
+    if duration_ms < _threshold_ms:
+        return
+    plan = None
+    if not executemany and EXPLAINABLE.match(statement):
+        # Same statement text: reuse the plan captured last time instead of explaining again
+        plan = next((q['plan'] for q in reversed(_log) if q['statement'] == statement), None)
+        if plan is None:
+            plan = _explain(conn, statement, parameters)
+    _log.append({
+        'at': datetime.utcnow(),
+        'duration_ms': round(duration_ms, 1),
+        'statement': statement,
+        'parameters': None if executemany else _redact(parameters, context),
+        'caller': _caller(),
+        'plan': plan,
+    })
+
+
+# =====================
+# QUERIES
+# =====================
+def recent(limit=KEEP):
+    """Slow queries seen by this process, newest first."""
+    return list(reversed(_log))[:limit]
+
+
+def by_statement():
+    """Slow queries grouped by SQL text: count, total and worst time, latest plan; worst total first."""
+    groups = {}
+    for q in _log:
+        group = groups.setdefault(q['statement'], {'statement': q['statement'], 'count': 0,
+                                                   'total_ms': 0.0, 'max_ms': 0.0, 'callers': set()})
+        group['count'] += 1
+        group['total_ms'] = round(group['total_ms'] + q['duration_ms'], 1)
+        group['max_ms'] = max(group['max_ms'], q['duration_ms'])
+        group['callers'].add(q['caller'])
+        group['plan'] = q['plan'] or group.get('plan')
+    return sorted(groups.values(), key=lambda g: g['total_ms'], reverse=True)
+
+
+def clear():
+    _log.clear()
+
+
+def set_threshold(app, threshold_ms):
+    """Attach the listeners for a threshold above zero, detach them for zero."""
+    global _threshold_ms
+    _threshold_ms = threshold_ms
+    with app.app_context():
+        engine = db.engine
+    attached = event.contains(engine, 'before_cursor_execute', _before_cursor_execute)
+    if threshold_ms > 0 and not attached:
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    elif threshold_ms <= 0 and attached:
+        event.remove(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.remove(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def init_app(app):
+    # 0 turns the log off
+    app.config.setdefault('SLOW_QUERY_MS', float(os.environ.get('SLOW_QUERY_MS', 250)))
+    set_threshold(app, app.config['SLOW_QUERY_MS'])
@@ -877,3 +877,17 @@ function showToast(message, type) {
   }
 })();
 
+
+// =====================
+// EXPORTS
+// =====================
+// Download a server-side export with the page's current filter values
+function exportWithFilters(url, selector) {
+  var params = new URLSearchParams();
+  document.querySelectorAll(selector).forEach(function (el) {
+    if (el.name && el.value) params.append(el.name, el.value);
+  });
+  var query = params.toString();
+  window.location = query ? url + '?' + query : url;
+}
+window.exportWithFilters = exportWithFilters;
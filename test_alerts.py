@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+from database import db
+from models import Product, Inventory, Alert
+from alerts import evaluate_alerts
+
+
+def _stock(name, qty, expiry=None, threshold=10):
+    product = Product(name=name, sku=name.upper())
+    db.session.add(product)
+    db.session.flush()
+    inv = Inventory(product_id=product.id, branch_id=1, quantity_on_hand=qty,
+                    threshold_min=threshold, expiry_date=expiry, status='AVAILABLE')
+    db.session.add(inv)
+    db.session.commit()
+    return inv
+
+
+def test_alerts_are_diffed_not_rebuilt(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'ALERT_HOOKS_ENABLED', False)
+    today = datetime.utcnow()
+    low = _stock('Sugar', 3)
+    _stock('Milk', 50, expiry=today + timedelta(days=3))
+    expired = _stock('Bread', 20, expiry=today - timedelta(days=1))
+
+    stats = evaluate_alerts(today)
+    db.session.commit()
+    assert stats['created'] == 3
+    assert stats['expired'] == 1
+    assert db.session.get(Inventory, expired.id).status == 'EXPIRED'
+
+    # Read state survives a re-run with no changes
+    low_alert = Alert.query.filter_by(type='LOW_STOCK', inventory_id=low.id).one()
+    low_alert.is_read = True
+    db.session.commit()
+
+    stats = evaluate_alerts(today)
+    db.session.commit()
+    assert (stats['created'], stats['updated'], stats['resolved']) == (0, 0, 0)
+    assert db.session.get(Alert, low_alert.id).is_read is True
+
+    # Restocking resolves the low-stock alert instead of deleting it
+    db.session.get(Inventory, low.id).quantity_on_hand = 100
+    db.session.commit()
+    stats = evaluate_alerts(today)
+    db.session.commit()
+    assert stats['resolved'] == 1
+    assert db.session.get(Alert, low_alert.id).resolved_at is not None
+    assert Alert.query.filter(Alert.resolved_at.is_(None)).count() == 2
+
+
+def test_changed_figures_update_open_alert(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'ALERT_HOOKS_ENABLED', False)
+    today = datetime.utcnow()
+    inv = _stock('Rice', 5)
+    evaluate_alerts(today)
+    db.session.commit()
+    alert_id = Alert.query.filter_by(inventory_id=inv.id).one().id
+
+    db.session.get(Inventory, inv.id).quantity_on_hand = 2
+    db.session.commit()
+    stats = evaluate_alerts(today)
+    db.session.commit()
+
+    assert stats['updated'] == 1
+    alert = db.session.get(Alert, alert_id)
+    assert alert.quantity == 2
+    assert 'Only 2' in alert.message
+
+
+def test_commit_hook_raises_and_clears_alerts(client):
+    inv = _stock('Oil', 50)
+    assert Alert.query.count() == 0
+
+    # A sale that drops stock under the threshold raises the alert on commit
+    r = client.post('/sales', json={'items': [{'product_id': inv.product_id, 'quantity': 45}]})
+    assert r.get_json()['success']
+    alert = Alert.query.filter_by(type='LOW_STOCK', inventory_id=inv.id).one()
+    assert alert.resolved_at is None
+
+    # Restocking through the API resolves it without a full scan
+    client.put(f'/api/inventory/{inv.id}', json={'quantity_on_hand': 80})
+    db.session.expire_all()
+    assert db.session.get(Alert, alert.id).resolved_at is not None
+
+
+def test_commit_hook_ignores_untracked_columns(app):
+    inv = _stock('Salt', 100)
+    db.session.get(Inventory, inv.id).batch_number = 'B-1'
+    db.session.commit()
+    assert Alert.query.count() == 0
+
+    db.session.get(Inventory, inv.id).expiry_date = datetime.utcnow() + timedelta(days=2)
+    db.session.commit()
+    assert Alert.query.filter_by(type='NEAR_EXPIRY', inventory_id=inv.id).count() == 1
+
+
+def test_low_stock_with_a_distant_expiry_is_not_near_expiry(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'ALERT_HOOKS_ENABLED', False)
+    today = datetime.utcnow()
+    milk = _stock('Milk', 2, expiry=today + timedelta(days=364))
+
+    evaluate_alerts(today)
+    db.session.commit()
+    assert [a.type for a in Alert.query.filter_by(inventory_id=milk.id)] == ['LOW_STOCK']
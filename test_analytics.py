@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+from database import db
+from models import Product, Inventory, Sale, SaleItem
+import analytics
+
+
+def _seed(today):
+    now = datetime.combine(today, datetime.min.time())
+    tea = Product(name='Tea', category='Drinks', unit_price=10)
+    soap = Product(name='Soap', unit_price=4)
+    db.session.add_all([tea, soap])
+    db.session.flush()
+    db.session.add_all([
+        Inventory(product_id=tea.id, quantity_on_hand=5, entry_date=now - timedelta(days=10),
+                  expiry_date=now + timedelta(days=20)),
+        Inventory(product_id=tea.id, quantity_on_hand=3, entry_date=now - timedelta(days=200),
+                  expiry_date=now - timedelta(days=1)),
+        Inventory(product_id=soap.id, quantity_on_hand=10, entry_date=now - timedelta(days=400)),
+        Sale(sale_date=now - timedelta(days=2), total_amount=20,
+             items=[SaleItem(product_id=tea.id, quantity=2, price=20)]),
+        Sale(sale_date=now - timedelta(days=60), total_amount=40,
+             items=[SaleItem(product_id=soap.id, quantity=10, price=40)]),
+    ])
+    db.session.commit()
+
+
+def test_metrics_match_hand_computed_values(app):
+    today = datetime.utcnow().date()
+    _seed(today)
+    analytics.invalidate()
+    m = analytics.metrics(today)
+
+    assert m['stock-units'] == {'labels': ['Drinks', 'Uncategorized'], 'data': [8.0, 10.0]}
+    assert m['stock-value']['data'] == [80.0, 40.0]
+    assert dict(zip(m['ageing']['labels'], m['ageing']['data'])) == {
+        '0-30d': 50.0, '31-90d': 0.0, '91-180d': 0.0, '181-365d': 30.0, '>365d': 40.0
+    }
+    assert m['expiry-risk']['data'] == [50.0, 0.0]
+    assert m['expiry-risk']['expired'] == [30.0, 0.0]
+    # Tea: 2 sold in the window vs 8 on hand; the soap sale is outside it
+    assert m['sell-through']['data'] == [20.0, 0.0]
+
+
+def test_metrics_are_cached_until_data_changes(app, monkeypatch):
+    today = datetime.utcnow().date()
+    _seed(today)
+    analytics.invalidate()
+    first = analytics.metrics(today)
+
+    loads = []
+    original = analytics.load_columns
+    monkeypatch.setattr(analytics, 'load_columns', lambda day: loads.append(day) or original(day))
+    assert analytics.metrics(today) is first
+    assert loads == []
+
+    inv = Inventory.query.filter_by(quantity_on_hand=10).one()
+    inv.quantity_on_hand = 4
+    db.session.commit()
+    assert analytics.metrics(today)['stock-units']['data'] == [8.0, 4.0]
+    assert len(loads) == 1
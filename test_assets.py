@@ -0,0 +1,53 @@
+import re
+import shutil
+import assets
+
+
+def test_minifiers_keep_literals_and_meaning():
+    css = '/* theme */\na > b ,\n c :hover {\n  width: calc(100% - 12px);\n  content: "a  /* b */";\n}\n'
+    assert assets.minify_css(css) == 'a>b,c :hover{width:calc(100% - 12px);content:"a  /* b */"}'
+    # A quote inside a comment does not open a string
+    assert assets.minify_css("/* Chrome's gap */\na { content: 'a :  b' }") == "a{content:'a :  b'}"
+
+    js = "// greet\nconst  a = `x ${ '}' }  // y`;\n  /* note */ const re = /\\/\\//g;\n\nreturn a\n"
+    assert assets.minify_js(js) == "const  a = `x ${ '}' }  // y`;\nconst re = /\\/\\//g;\nreturn a"
+
+
+def test_built_bundle_is_served_under_hashed_immutable_names(app, client, tmp_path, monkeypatch):
+    static = tmp_path / 'static'
+    shutil.copytree(app.static_folder, static, ignore=shutil.ignore_patterns('dist', 'images*', 'vendor'))
+    monkeypatch.setattr(app, 'static_folder', str(static))
+
+    # Before a build the sources are served as they are
+    page = client.get('/products').get_data(as_text=True)
+    assert re.search(r'/static/css/style\.css\?v=[0-9a-f]{12}', page)
+
+    built = assets.build(app)
+    assert set(built) == set(assets.BUNDLE)
+    page = client.get('/products').get_data(as_text=True)
+    css = re.search(r'/static/dist/css/style\.[0-9a-f]{12}\.css"', page).group(0)[:-1]
+    assert re.search(r'/static/dist/js/main\.[0-9a-f]{12}\.js"', page)
+    # GSAP is the one library not vendored yet
+    assert re.findall(r'https://[^"]+', page.split('<audio')[0]) == ['https://cdnjs.cloudflare.com/ajax/libs/gsap/3.12.5/gsap.min.js']
+
+    response = client.get(css)
+    assert response.status_code == 200 and len(response.data) < built['css/style.css']['bytes']
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+
+    # An edit after the build falls back to the source instead of the stale bundle
+    with open(static / 'css' / 'style.css', 'a') as fh:
+        fh.write('\n.edited { color: red; }\n')
+    page = client.get('/products').get_data(as_text=True)
+    assert re.search(r'/static/css/style\.css\?v=[0-9a-f]{12}', page)
+
+
+def test_ensure_built_rebuilds_only_a_missing_or_stale_bundle(app, tmp_path, monkeypatch):
+    static = tmp_path / 'static'
+    shutil.copytree(app.static_folder, static, ignore=shutil.ignore_patterns('dist', 'images*', 'vendor'))
+    monkeypatch.setattr(app, 'static_folder', str(static))
+
+    assert assets.is_stale(app) and assets.ensure_built(app)
+    assert not assets.ensure_built(app)
+    with open(static / 'js' / 'main.js', 'a') as fh:
+        fh.write('\n// edited\n')
+    assert assets.is_stale(app) and assets.ensure_built(app)
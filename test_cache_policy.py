@@ -0,0 +1,33 @@
+import re
+from database import db
+from models import Product, Inventory
+
+
+def test_static_assets_are_fingerprinted_and_immutable(client):
+    page = client.get('/products')
+    assert page.headers['Cache-Control'].startswith('no-store')
+    css = re.search(r'/static/vendor/inter/inter\.css\?v=[0-9a-f]+', page.get_data(as_text=True)).group(0)
+
+    assert client.get(css).headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert 'immutable' not in client.get('/static/vendor/inter/inter.css?v=stale').headers.get('Cache-Control', '')
+    assert 'immutable' not in client.get('/static/vendor/inter/inter.css').headers.get('Cache-Control', '')
+
+
+def test_product_and_inventory_apis_answer_304_until_changed(client):
+    product = Product(name='Teff', sku='TEFF', unit_price=90)
+    db.session.add(product)
+    db.session.flush()
+    inv = Inventory(product_id=product.id, branch_id=1, quantity_on_hand=5)
+    db.session.add(inv)
+    db.session.commit()
+
+    for url in (f'/api/products/{product.id}', f'/api/inventory/{inv.id}'):
+        first = client.get(url)
+        assert first.status_code == 200 and first.headers['Cache-Control'] == 'private, no-cache'
+        etag = first.headers['ETag']
+        assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+        assert client.get(url, headers={'If-Modified-Since': first.headers['Last-Modified']}).status_code == 304
+
+    client.put(f'/api/inventory/{inv.id}', json={'quantity_on_hand': 7})
+    refreshed = client.get(f'/api/inventory/{inv.id}', headers={'If-None-Match': etag})
+    assert refreshed.status_code == 200 and refreshed.get_json()['inventory']['quantity_on_hand'] == 7
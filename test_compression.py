@@ -0,0 +1,58 @@
+import gzip
+import compression
+from database import db
+from models import Product, Inventory
+
+
+def _stock(count):
+    for i in range(count):
+        product = Product(name=f'Product {i}', sku=f'SKU-{i}', unit_price=10 + i)
+        db.session.add(product)
+        db.session.flush()
+        db.session.add(Inventory(product_id=product.id, branch_id=1, quantity_on_hand=i))
+    db.session.commit()
+
+
+def test_large_responses_are_gzipped_small_ones_are_not(client):
+    _stock(30)
+    plain = client.get('/api/search/products')
+    zipped = client.get('/api/search/products', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in plain.headers and plain.headers['Vary'].endswith('Accept-Encoding')
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert int(zipped.headers['Content-Length']) < len(plain.data) / 3
+    assert gzip.decompress(zipped.data) == plain.data
+
+    small = client.get('/api/reports/status', headers={'Accept-Encoding': 'gzip'})
+    assert len(small.data) < 1024 and 'Content-Encoding' not in small.headers
+    refused = client.get('/api/search/products', headers={'Accept-Encoding': 'gzip;q=0, identity'})
+    assert 'Content-Encoding' not in refused.headers
+
+
+def test_streamed_export_is_compressed_chunk_by_chunk(client):
+    _stock(30)
+    plain = client.get('/api/export/inventory.csv')
+    zipped = client.get('/api/export/inventory.csv', headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip' and 'Content-Length' not in zipped.headers
+    assert gzip.decompress(zipped.data) == plain.data
+
+    xlsx = client.get('/api/export/inventory.xlsx', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in xlsx.headers
+
+
+def test_static_files_get_weak_etags_and_still_revalidate(client):
+    first = client.get('/static/css/style.css', headers={'Accept-Encoding': 'gzip'})
+    assert first.headers['Content-Encoding'] == 'gzip' and first.headers['ETag'].startswith('W/')
+    again = client.get('/static/css/style.css', headers={'Accept-Encoding': 'gzip',
+                                                         'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+
+
+def test_brotli_is_negotiated_and_preferred(client):
+    import brotli   # in requirements.txt; its absence should fail here, not skip
+    assert 'br' in compression.CompressionMiddleware(None).encodings
+    _stock(30)
+    plain = client.get('/api/search/products')
+    response = client.get('/api/search/products', headers={'Accept-Encoding': 'gzip, deflate, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.data) == plain.data
+    assert compression.CompressionMiddleware(None).negotiate({'HTTP_ACCEPT_ENCODING': 'br;q=0.5, gzip'}) == 'gzip'
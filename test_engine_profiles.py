@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import text
+import engine_profiles
+from database import db
+
+DEFAULTS = {
+    'ENGINE_PROFILE': 'tuned', 'DB_POOL_SIZE': 5, 'DB_MAX_OVERFLOW': 10, 'DB_POOL_PRE_PING': True,
+    'DB_POOL_RECYCLE': 1800, 'DB_STATEMENT_TIMEOUT_MS': 30000,
+}
+
+
+def test_sqlite_connections_run_the_tuned_pragmas(app):
+    def pragma(name):
+        return db.session.execute(text(f'PRAGMA {name}')).scalar()
+    assert pragma('journal_mode') == 'wal'
+    assert pragma('synchronous') == 1   # NORMAL
+    assert pragma('busy_timeout') == app.config['SQLITE_BUSY_TIMEOUT_MS']
+    assert pragma('cache_size') == -int(app.config['SQLITE_CACHE_SIZE_MB'] * 1024)
+    assert app.config['SQLALCHEMY_ENGINE_OPTIONS'] == {}
+
+
+def test_postgresql_gets_pool_settings():
+    options = engine_profiles.engine_options('postgresql://u:p@db/shop', DEFAULTS)
+    assert options == {'pool_size': 5, 'max_overflow': 10, 'pool_pre_ping': True, 'pool_recycle': 1800}
+    assert engine_profiles.engine_options('postgresql://u:p@db/shop', {**DEFAULTS, 'ENGINE_PROFILE': 'stock'}) == {}
+
+
+def test_statement_timeout_applies_to_request_transactions_only(app, monkeypatch):
+    executed = []
+    connection = SimpleNamespace(dialect=SimpleNamespace(name='postgresql'), exec_driver_sql=executed.append)
+    monkeypatch.setitem(app.config, 'DB_STATEMENT_TIMEOUT_MS', 30000)
+    engine_profiles._request_statement_timeout(None, None, connection)   # CLI, migrations, jobs
+    assert executed == []
+    with app.test_request_context('/'):
+        engine_profiles._request_statement_timeout(None, None, connection)
+    assert executed == ['SET LOCAL statement_timeout = 30000']
+
+
+def test_explicit_engine_options_win_and_unknown_profiles_are_refused():
+    from app import create_app
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'postgresql://u:p@db/shop',
+                      'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': 20}})
+    assert app.config['SQLALCHEMY_ENGINE_OPTIONS']['pool_size'] == 20
+    assert app.config['SQLALCHEMY_ENGINE_OPTIONS']['pool_pre_ping'] is True
+    with pytest.raises(ValueError):
+        create_app({'ENGINE_PROFILE': 'fast'})
@@ -0,0 +1,61 @@
+import random
+from datetime import datetime, timedelta
+from database import db
+from models import Product, Inventory
+from expiry_index import ExpiryCalendar, calendar
+
+
+def _seed(count, today):
+    rng = random.Random(7)
+    product = Product(name='Tea', sku='TEA')
+    db.session.add(product)
+    db.session.flush()
+    for _ in range(count):
+        db.session.add(Inventory(
+            product_id=product.id, branch_id=1,
+            quantity_on_hand=rng.choice([0, 1, 5, 20]),
+            expiry_date=today + timedelta(days=rng.randint(-30, 400), hours=rng.randint(0, 23))
+        ))
+    db.session.commit()
+
+
+def test_window_matches_sql(app):
+    today = datetime.utcnow()
+    _seed(300, today)
+    cal = ExpiryCalendar()
+    cal.load()
+
+    for lo, hi in [(0, 30), (0, 90), (90, 180), (-30, 0)]:
+        start, end = today + timedelta(days=lo), today + timedelta(days=hi)
+        expected = Inventory.query.filter(
+            Inventory.expiry_date.between(start, end),
+            Inventory.quantity_on_hand > 0
+        ).order_by(Inventory.expiry_date, Inventory.id).all()
+        count, ids = cal.window(start, end, limit=10)
+        assert count == len(expected)
+        assert ids == [i.id for i in expected[:10]]
+
+    first = Inventory.query.filter(
+        Inventory.expiry_date >= today, Inventory.quantity_on_hand > 0
+    ).order_by(Inventory.expiry_date, Inventory.id).limit(5).all()
+    assert cal.next_to_move(5, today) == [i.id for i in first]
+
+
+def test_committed_writes_update_calendar(app):
+    today = datetime.utcnow()
+    _seed(20, today)
+    calendar.load()
+
+    product_id = Product.query.first().id
+    inv = Inventory(product_id=product_id, branch_id=1, quantity_on_hand=3,
+                    expiry_date=today + timedelta(hours=1))
+    db.session.add(inv)
+    db.session.commit()
+    calendar.ensure_fresh(ttl=3600)
+    assert calendar.next_to_move(1, today) == [inv.id]
+
+    # Selling out removes it from the FEFO order
+    db.session.get(Inventory, inv.id).quantity_on_hand = 0
+    db.session.commit()
+    calendar.ensure_fresh(ttl=3600)
+    assert inv.id not in calendar.next_to_move(50, today)
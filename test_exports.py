@@ -0,0 +1,47 @@
+import csv
+import io
+from datetime import datetime
+import openpyxl
+from database import db
+from models import Product, Inventory, Sale, SaleItem
+import exports
+
+
+def _seed():
+    for n in range(5):
+        product = Product(name=f'Oil {n}' if n % 2 else f'Rice {n}', sku=f'SKU{n}', unit_price=n)
+        db.session.add(product)
+        db.session.flush()
+        db.session.add(Inventory(product_id=product.id, branch_id=1, quantity_on_hand=n, batch_number=f'B{n}'))
+        db.session.add(Sale(branch_id=1, total_amount=n, payment_type='CASH', sale_date=datetime(2026, 10, 1 + n),
+                            items=[SaleItem(product_id=product.id, quantity=1, price=n)]))
+    db.session.commit()
+
+
+def test_csv_export_streams_in_chunks_with_search_filters(client, monkeypatch):
+    _seed()
+    monkeypatch.setattr(exports, 'EXPORT_CHUNK', 1)
+
+    r = client.get('/api/export/products.csv?q=oil')
+    assert r.status_code == 200 and 'attachment' in r.headers['Content-Disposition']
+    assert r.is_streamed
+    rows = list(csv.reader(io.StringIO(r.get_data(as_text=True).lstrip('\ufeff'))))
+    assert rows[0][:2] == ['ID', 'Name']
+    assert [row[1] for row in rows[1:]] == ['Oil 3', 'Oil 1']
+
+    exported = client.get('/api/export/inventory.csv?q=b3').get_data(as_text=True)
+    assert [row[6] for row in csv.reader(io.StringIO(exported))][1:] == ['B3']
+
+    r = client.get('/api/export/sales.csv?start=2026-10-02&end=2026-10-03')
+    assert [row[0] for row in csv.reader(io.StringIO(r.get_data(as_text=True)))][1:] == ['3', '2']
+    assert client.get('/api/export/sales.csv?start=yesterday').status_code == 400
+    assert client.get('/api/export/users.csv').status_code == 404
+
+
+def test_xlsx_export_opens_in_openpyxl(client):
+    _seed()
+    r = client.get('/api/export/inventory.xlsx?branch_id=1')
+    assert r.status_code == 200
+    workbook = openpyxl.load_workbook(io.BytesIO(r.data), read_only=True)
+    rows = list(workbook['Inventory'].iter_rows(values_only=True))
+    assert rows[0][0] == 'ID' and len(rows) == 6
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+import fragments
+from database import db
+from models import Category, Product, Inventory
+
+
+def _lookups(result):
+    import metrics
+    return sum(v for k, v in metrics._store.totals().items() if 'fragment_lookups' in k and f'"{result}"' in k)
+
+
+def test_search_reuses_rows_and_rerenders_only_changed_ones(client):
+    fragments.clear()
+    for i in range(5):
+        product = Product(name=f'Teff {i}', sku=f'TEFF-{i}', unit_price=10 + i)
+        db.session.add(product)
+        db.session.flush()
+        db.session.add(Inventory(product_id=product.id, branch_id=1, quantity_on_hand=20,
+                                 expiry_date=datetime.utcnow() + timedelta(days=3)))
+    db.session.commit()
+
+    first = client.get('/api/search/inventory?q=Teff').get_data(as_text=True)
+    assert first.count('badge-warning') == 5 and fragments.stats()['entries'] == 5
+    misses, hits = _lookups('miss'), _lookups('hit')
+    assert client.get('/api/search/inventory?q=Teff').get_data(as_text=True) == first
+    assert _lookups('hit') == hits + 5 and _lookups('miss') == misses
+
+    inv = Inventory.query.first()
+    client.put(f'/api/inventory/{inv.id}', json={'quantity_on_hand': 1234})
+    changed = client.get('/api/search/inventory?q=Teff').get_data(as_text=True)
+    assert '1234' in changed and _lookups('miss') == misses + 1
+
+    # Editing the product changes its inventory rows as well
+    product = Product.query.get(inv.product_id)
+    product.name = 'Red Teff'
+    db.session.commit()
+    assert 'Red Teff' in client.get('/api/search/inventory?q=Teff').get_data(as_text=True)
+    assert 'Red Teff' in client.get('/api/search/products?q=Teff').get_data(as_text=True)
+
+
+def test_cache_is_bounded_and_evicts_least_recently_used():
+    cache = fragments.FragmentCache(max_chars=10)
+    cache.set('a', 'aaaa')
+    cache.set('b', 'bbbb')
+    assert cache.get('a') == 'aaaa'     # b is now the least recently used
+    cache.set('c', 'cccc')
+    assert cache.get('b') is None and cache.get('a') == 'aaaa' and cache.get('c') == 'cccc'
+    assert cache.size == 8
+    cache.set('huge', 'x' * 11)
+    assert cache.get('huge') is None and cache.size == 8
+
+
+def test_renaming_a_category_rerenders_its_product_rows(client):
+    fragments.clear()
+    category = Category.query.filter_by(name='Food').one()
+    db.session.add(Product(name='Teff', sku='TEFF', unit_price=10, category_id=category.id))
+    db.session.commit()
+    assert '>Food<' in client.get('/api/search/products?q=Teff').get_data(as_text=True)
+
+    category.name = 'Grains'
+    db.session.commit()
+    html = client.get('/api/search/products?q=Teff').get_data(as_text=True)
+    assert '>Grains<' in html and '>Food<' not in html
@@ -0,0 +1,69 @@
+import threading
+from datetime import datetime, timedelta
+from database import db
+from models import Product, Inventory, StockMovement, StockCheckpoint
+import ledger
+
+
+def _stock(qty):
+    product = Product(name='Flour', sku='FLOUR', unit_price=10)
+    db.session.add(product)
+    db.session.flush()
+    inv = Inventory(product_id=product.id, branch_id=1, quantity_on_hand=qty, status='AVAILABLE')
+    db.session.add(inv)
+    db.session.flush()
+    ledger.opened(inv)
+    db.session.commit()
+    return product, inv
+
+
+def test_sales_receipts_and_counts_are_recorded(client):
+    product, inv = _stock(20)
+    assert client.post('/sales', json={'items': [{'product_id': product.id, 'quantity': 3}]}).status_code == 200
+    assert client.put(f'/api/inventory/{inv.id}', json={'quantity_on_hand': 12}).get_json()['success']
+
+    db.session.expire_all()
+    assert db.session.get(Inventory, inv.id).quantity_on_hand == 12
+    body = client.get(f'/api/inventory/{inv.id}/movements').get_json()
+    assert [(m['reason'], m['delta']) for m in body['movements']] == [('ADJUSTMENT', -5), ('SALE', -3), ('RECEIPT', 20)]
+    assert body['movements'][1]['reference'].startswith('sale:')
+    assert ledger.verify() == []
+
+
+def test_concurrent_adjustments_are_not_lost(app):
+    _, inv = _stock(0)
+    inv_id = inv.id
+    db.session.remove()
+
+    def receive():
+        with app.app_context():
+            for _ in range(10):
+                ledger.adjust(db.session.get(Inventory, inv_id), 1, 'RECEIPT')
+                db.session.commit()
+            db.session.remove()
+
+    workers = [threading.Thread(target=receive) for _ in range(4)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+    assert db.session.get(Inventory, inv_id).quantity_on_hand == 40
+    assert ledger.on_hand(inv_id) == 40
+
+
+def test_compaction_folds_old_movements(app):
+    _, inv = _stock(10)
+    ledger.adjust(inv, -4, 'SALE')
+    db.session.commit()
+    db.session.query(StockMovement).update({'created_at': datetime.utcnow() - timedelta(days=120)})
+    ledger.adjust(inv, 2, 'RECEIPT')
+    db.session.commit()
+
+    assert ledger.compact(datetime.utcnow() - timedelta(days=90)) == 2
+    db.session.commit()
+    checkpoint = db.session.get(StockCheckpoint, inv.id)
+    assert (checkpoint.quantity, checkpoint.folded_count) == (6, 2)
+    assert StockMovement.query.count() == 1
+    assert ledger.on_hand(inv.id) == 8 == db.session.get(Inventory, inv.id).quantity_on_hand
+    assert ledger.verify() == []
@@ -0,0 +1,68 @@
+import multiprocessing
+import metrics
+from database import db
+from models import Product, Inventory
+
+
+def _sample(text, line_prefix):
+    return next(float(line.rsplit(' ', 1)[1]) for line in text.splitlines() if line.startswith(line_prefix))
+
+
+def _write(directory, n):
+    store = metrics.MmapValues(directory)
+    for _ in range(n):
+        store.inc('["worker_test_total", []]', 1)
+        store.inc(f'["worker_key_{n}", []]', 0.5)
+
+
+def test_mmap_values_are_summed_across_processes(tmp_path):
+    workers = [multiprocessing.get_context('fork').Process(target=_write, args=(str(tmp_path), n)) for n in (300, 500)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    totals = metrics.MmapValues(str(tmp_path)).totals()
+    assert totals['["worker_test_total", []]'] == 800
+    assert totals['["worker_key_300", []]'] == 150 and totals['["worker_key_500", []]'] == 250
+
+
+def test_metrics_endpoint_reports_latency_and_counters(app, client):
+    product = Product(name='Coffee', sku='COFFEE', barcode='111', unit_price=5)
+    db.session.add(product)
+    db.session.flush()
+    db.session.add(Inventory(product_id=product.id, branch_id=1, quantity_on_hand=10))
+    db.session.commit()
+
+    before = metrics.render()
+    client.post('/sales', json={'items': [{'product_id': product.id, 'quantity': 1}]})
+    client.post('/search-product', json={'code': '111'})
+    client.post('/search-product', json={'code': 'nope'})
+    client.get('/api/search/products?q=cof')
+
+    body = client.get('/metrics')
+    assert body.mimetype == 'text/plain'
+    text = body.get_data(as_text=True)
+    assert '# TYPE http_request_duration_seconds histogram' in text
+    assert _sample(text, 'http_request_duration_seconds_count{endpoint="search_product",method="POST"}') >= 2
+    assert _sample(text, 'http_request_duration_seconds_bucket{endpoint="create_sale",method="POST",le="+Inf"}') >= 1
+    for prefix, added in [('beshgebeya_sales_total{channel="till"}', 1),
+                          ('beshgebeya_scanner_lookups_total{result="missing"}', 1),
+                          ('beshgebeya_searches_total{kind="products"}', 1)]:
+        previous = _sample(before, prefix) if prefix in before else 0
+        assert _sample(text, prefix) == previous + added
+
+    assert app.test_client().get('/metrics').status_code == 403
+
+
+def test_large_counters_keep_every_digit_and_scheduled_alert_runs_count(app):
+    import scheduler
+    metrics.IMPORT_ROWS.inc(1234567, result='digits')
+    metrics.REQUEST_LATENCY.observe(0.125, endpoint='digits', method='GET')
+    text = metrics.render()
+    assert 'beshgebeya_import_rows_total{result="digits"} 1234567\n' in text
+    assert 'http_request_duration_seconds_sum{endpoint="digits",method="GET"} 0.125\n' in text
+
+    prefix = 'beshgebeya_alert_runs_total{outcome="completed"}'
+    previous = _sample(text, prefix) if prefix in text else 0
+    assert scheduler.run_job('alerts').completed
+    assert _sample(metrics.render(), prefix) == previous + 1
@@ -0,0 +1,23 @@
+import profiler
+
+
+def test_server_timing_and_slowest_requests(app, client):
+    profiler.enable(app)
+    try:
+        r = client.get('/inventory')
+        timing = r.headers['Server-Timing']
+        assert timing.startswith('db;dur=') and 'render;dur=' in timing and 'total;dur=' in timing
+        slow = profiler.slowest()
+        assert slow[0]['endpoint'] == 'inventory' and slow[0]['sql_count'] > 0 and slow[0]['render_ms'] > 0
+
+        page = client.get('/admin/profiler')
+        assert page.status_code == 200 and b'/inventory' in page.data
+    finally:
+        profiler.disable(app)
+        profiler.clear()
+
+
+def test_disabled_profiler_adds_nothing(client):
+    assert not profiler.is_enabled()
+    assert 'Server-Timing' not in client.get('/inventory').headers
+    assert profiler.slowest() == []
@@ -0,0 +1,71 @@
+"""
+SQL statement budgets per route. Every route is requested once to warm the
+per-process caches, then again while counting statements; the count must
+stay within budget at both seeded sizes, so an N+1 or a per-row query
+fails here before it reaches production.
+"""
+import pytest
+from benchmarks.seed import seed, barcode
+from database import db
+from models import Inventory
+import reports
+import scheduler
+
+SIZES = [12, 120]
+
+# (method, url, json body, max statements)
+BUDGETS = [
+    ('GET', '/', None, 6),
+    ('GET', '/products', None, 3),
+    ('GET', '/inventory', None, 2),
+    ('GET', '/sales', None, 4),
+    ('GET', '/reports', None, 0),
+    ('GET', '/admin', None, 5),
+    ('GET', '/settings', None, 1),
+    ('GET', '/help', None, 0),
+    ('GET', '/import-products', None, 1),
+    ('GET', '/api/search/products?q=Product', None, 1),
+    ('GET', '/api/search/inventory?q=Product', None, 1),
+    ('POST', '/search-product', {'code': barcode(1)}, 2),
+    ('POST', '/sales', 'sellable', 14),
+    ('GET', '/api/sales/history', None, 2),
+    ('GET', '/api/analytics/revenue', None, 2),
+    ('GET', '/api/analytics/products', None, 1),
+    ('GET', '/api/analytics/valuation', None, 1),
+    ('GET', '/api/inventory/1', None, 1),
+    ('GET', '/api/inventory/1/movements', None, 3),
+    ('GET', '/api/products/1', None, 1),
+    ('GET', '/api/admin/job-runs', None, 2),
+    ('GET', '/admin/profiler', None, 1),
+    ('GET', '/admin/slow-queries', None, 1),
+    ('GET', '/metrics', None, 0),
+    ('GET', '/api/export/products.csv', None, 1),
+    ('GET', '/api/export/inventory.csv', None, 1),
+    ('GET', '/api/export/sales.csv', None, 1),
+] + [('GET', f'/api/reports/{name}', None, 1) for name in reports.REPORTS]
+
+
+@pytest.fixture(params=SIZES, ids=lambda rows: f'{rows}rows')
+def seeded(request, app):
+    seed(request.param)
+    scheduler.run_job('alerts')
+    return request.param
+
+
+def _sale_body():
+    inv = Inventory.query.filter(Inventory.branch_id == 1, Inventory.quantity_on_hand >= 2).first()
+    return {'items': [{'product_id': inv.product_id, 'quantity': 1}]}
+
+
+@pytest.mark.parametrize('method, url, body, budget', BUDGETS, ids=[f'{m} {u}' for m, u, _, _ in BUDGETS])
+def test_route_statement_budget(seeded, client, count_statements, method, url, body, budget):
+    if body == 'sellable':
+        body = _sale_body()
+    client.open(url, method=method, json=body).get_data()
+    db.session.remove()
+
+    with count_statements() as statements:
+        response = client.open(url, method=method, json=body)
+        response.get_data()
+    assert response.status_code < 400
+    assert len(statements) <= budget, '\n'.join(statements)
@@ -0,0 +1,60 @@
+from datetime import datetime
+from database import db
+from models import Product, Inventory
+
+
+def _seed():
+    rows = [
+        ('Tea', 'Drinks', 'Addis', 'Acme', [(5, 'B1', datetime(2026, 11, 3), 'AVAILABLE'),
+                                             (2, None, datetime(2026, 11, 20), 'LOW_STOCK')]),
+        ('Coffee', 'Drinks', None, 'Acme', [(9, 'B1', datetime(2027, 1, 1), 'AVAILABLE')]),
+        ('Soap', None, 'Clean', None, [(4, 'B2', None, 'EXPIRED')]),
+    ]
+    for name, category, brand, supplier, batches in rows:
+        product = Product(name=name, category=category, brand=brand, supplier=supplier,
+                          created_at=datetime(2026, 10, 1))
+        db.session.add(product)
+        db.session.flush()
+        for qty, batch, expiry, status in batches:
+            db.session.add(Inventory(product_id=product.id, quantity_on_hand=qty, batch_number=batch,
+                                     expiry_date=expiry, status=status))
+    db.session.commit()
+
+
+def test_report_series_are_aggregated_in_sql(client):
+    _seed()
+
+    def series(name):
+        body = client.get(f'/api/reports/{name}').get_json()
+        return dict(zip(body['labels'], body['data']))
+
+    assert series('categories') == {'Drinks': 2, 'Uncategorized': 1}
+    assert series('brands') == {'Addis': 1, 'Clean': 1, 'Generic': 1}
+    assert series('status') == {'AVAILABLE': 14, 'LOW_STOCK': 2, 'EXPIRED': 4, 'DISCONTINUED': 0}
+    assert series('expiry') == {'2026-11': 7, '2027-01': 9}
+    assert client.get('/api/reports/top-products').get_json()['labels'] == ['Coffee', 'Tea', 'Soap']
+    assert series('suppliers') == {'Acme': 2, 'Unknown': 1}
+    assert series('created') == {'2026-10-01': 3}
+    assert series('batches') == {'B1': 14, 'B2': 4, 'Default': 2}
+    assert client.get('/api/reports/nope').status_code == 404
+
+
+def test_blank_and_missing_labels_share_the_fallback(client):
+    _seed()
+    db.session.add(Product(name='Salt', category='', brand='', supplier='', created_at=datetime(2026, 10, 1)))
+    unset = Inventory(product_id=1, quantity_on_hand=3, batch_number='')
+    db.session.add_all([unset, Inventory(product_id=1, quantity_on_hand=1, batch_number='B1', status='')])
+    db.session.commit()
+    # The column default only fills in rows inserted without a status
+    unset.status = None
+    db.session.commit()
+
+    def series(name):
+        body = client.get(f'/api/reports/{name}').get_json()
+        return dict(zip(body['labels'], body['data']))
+
+    assert series('categories') == {'Drinks': 2, 'Uncategorized': 2}
+    assert series('brands') == {'Addis': 1, 'Clean': 1, 'Generic': 2}
+    assert series('suppliers') == {'Acme': 2, 'Unknown': 2}
+    assert series('batches') == {'B1': 15, 'B2': 4, 'Default': 5}
+    assert series('status') == {'AVAILABLE': 14, 'LOW_STOCK': 2, 'EXPIRED': 4, 'DISCONTINUED': 0, 'UNKNOWN': 4}
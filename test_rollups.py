@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+from database import db
+from models import Product, Inventory, SalesDailyProduct, SalesDailyPayment
+import rollups
+
+
+def _rollup_state():
+    products = sorted((r.day, r.branch_id, r.product_id, r.quantity, round(r.revenue, 2), r.line_count)
+                      for r in SalesDailyProduct.query.all())
+    payments = sorted((r.day, r.branch_id, r.payment_type, r.sale_count, round(r.revenue, 2))
+                      for r in SalesDailyPayment.query.all())
+    return products, payments
+
+
+def test_incremental_rollups_match_rebuild(client):
+    products = []
+    for name, price in [('Flour', 3.0), ('Lentils', 5.5)]:
+        product = Product(name=name, sku=name.upper(), unit_price=price)
+        db.session.add(product)
+        db.session.flush()
+        db.session.add(Inventory(product_id=product.id, branch_id=1, quantity_on_hand=100))
+        products.append(product)
+    db.session.commit()
+    flour, lentils = products
+
+    client.post('/sales', json={'items': [{'product_id': flour.id, 'quantity': 2}]})
+    client.post('/sales', json={'payment_type': 'MOBILE', 'items': [
+        {'product_id': flour.id, 'quantity': 1}, {'product_id': lentils.id, 'quantity': 4}]})
+    yesterday = (datetime.utcnow() - timedelta(days=1)).isoformat()
+    client.post('/api/sales/sync', json={'sales': [
+        {'client_ref': 'r1', 'sale_date': yesterday, 'items': [{'product_id': lentils.id, 'quantity': 1}]}]})
+
+    incremental = _rollup_state()
+    rollups.rebuild()
+    db.session.commit()
+    assert _rollup_state() == incremental
+
+    body = client.get('/api/analytics/revenue').get_json()
+    assert body['total_sales'] == 3
+    assert body['total_revenue'] == 2 * 3.0 + 3.0 + 4 * 5.5 + 5.5
+    assert {p['payment_type']: p['sales'] for p in body['by_payment_type']} == {'CASH': 2, 'MOBILE': 1}
+    assert len(body['days']) == 2
+
+    top = client.get('/api/analytics/products?sort=quantity').get_json()['products']
+    assert [(p['name'], p['quantity']) for p in top] == [('Lentils', 5), ('Flour', 3)]
+    assert rollups.total_revenue() == body['total_revenue']
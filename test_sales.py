@@ -0,0 +1,166 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.exc import OperationalError
+from database import db
+from models import Product, Inventory, Sale, SaleItem
+from sales import record_sale, SaleError, sales_history_page, decode_cursor
+
+
+def _product(name, qty, price=10.0):
+    product = Product(name=name, sku=name.upper(), unit_price=price)
+    db.session.add(product)
+    db.session.flush()
+    inv = Inventory(product_id=product.id, branch_id=1, quantity_on_hand=qty, status='AVAILABLE')
+    db.session.add(inv)
+    db.session.commit()
+    return product, inv
+
+
+def test_short_line_rolls_back_whole_basket(client):
+    sugar, sugar_inv = _product('Sugar', 10)
+    salt, salt_inv = _product('Salt', 1)
+
+    r = client.post('/sales', json={'items': [
+        {'product_id': sugar.id, 'quantity': 4},
+        {'product_id': salt.id, 'quantity': 2},
+    ]})
+    assert r.status_code == 400
+    assert 'Salt' in r.get_json()['error']
+
+    db.session.expire_all()
+    assert db.session.get(Inventory, sugar_inv.id).quantity_on_hand == 10
+    assert db.session.get(Inventory, salt_inv.id).quantity_on_hand == 1
+    assert Sale.query.count() == 0
+
+
+def test_duplicate_lines_are_checked_together(client):
+    oil, oil_inv = _product('Oil', 5)
+    r = client.post('/sales', json={'items': [
+        {'product_id': oil.id, 'quantity': 3},
+        {'product_id': oil.id, 'quantity': 3},
+    ]})
+    assert r.status_code == 400
+    r = client.post('/sales', json={'items': [
+        {'product_id': oil.id, 'quantity': 2},
+        {'product_id': oil.id, 'quantity': 3, 'price': 12},
+    ]})
+    assert r.get_json() == {'success': True, 'total': 56.0}
+    db.session.expire_all()
+    assert db.session.get(Inventory, oil_inv.id).quantity_on_hand == 0
+
+
+def test_concurrent_tills_never_oversell(app):
+    stock = 25
+    product, inv = _product('Milk', stock)
+    product_id, inv_id = product.id, inv.id
+    db.session.remove()
+
+    sold = []
+    rejected = []
+    barrier = threading.Barrier(8)
+
+    def till():
+        barrier.wait()
+        for _ in range(6):
+            while True:
+                with app.app_context():
+                    try:
+                        record_sale([{'product_id': product_id, 'quantity': 1}])
+                        db.session.commit()
+                        sold.append(1)
+                    except SaleError:
+                        db.session.rollback()
+                        rejected.append(1)
+                    except OperationalError:
+                        # SQLite writer contention ("database is locked"); retry the sale
+                        db.session.rollback()
+                        time.sleep(0.01)
+                        continue
+                    finally:
+                        db.session.remove()
+                break
+
+    threads = [threading.Thread(target=till) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(sold) == stock
+    assert len(rejected) == 8 * 6 - stock
+    assert db.session.get(Inventory, inv_id).quantity_on_hand == 0
+    assert db.session.query(db.func.sum(SaleItem.quantity)).scalar() == stock
+
+
+def test_offline_sync_dedupes_and_validates_batch(client):
+    tea, tea_inv = _product('Tea', 5, price=2.0)
+    batch = {'sales': [
+        {'client_ref': 'till-a-1', 'sale_date': '2026-10-18T08:30:00Z',
+         'items': [{'product_id': tea.id, 'quantity': 2}]},
+        {'client_ref': 'till-a-2', 'items': [{'product_id': tea.id, 'quantity': 2}]},
+        {'client_ref': 'till-a-1', 'items': [{'product_id': tea.id, 'quantity': 2}]},
+        {'client_ref': 'till-a-3', 'items': [{'product_id': tea.id, 'quantity': 2}]},
+        {'items': [{'product_id': tea.id, 'quantity': 1}]},
+    ]}
+    body = client.post('/api/sales/sync', json=batch).get_json()
+    assert [r['status'] for r in body['results']] == ['created', 'created', 'duplicate', 'rejected', 'rejected']
+    assert body['results'][2]['sale_id'] == body['results'][0]['sale_id']
+    assert (body['created'], body['duplicate'], body['rejected']) == (2, 1, 2)
+
+    first = db.session.get(Sale, body['results'][0]['sale_id'])
+    assert first.client_ref == 'till-a-1'
+    assert first.sale_date.isoformat() == '2026-10-18T08:30:00'
+    db.session.expire_all()
+    assert db.session.get(Inventory, tea_inv.id).quantity_on_hand == 1
+
+    # Re-uploading the same queue after a dropped response changes nothing
+    replay = client.post('/api/sales/sync', json={'sales': batch['sales'][:2]}).get_json()
+    assert [r['status'] for r in replay['results']] == ['duplicate', 'duplicate']
+    assert Sale.query.count() == 2
+
+
+def test_non_positive_quantities_and_bad_products_are_rejected(client):
+    tea, tea_inv = _product('Tea', 5)
+    r = client.post('/sales', json={'items': [{'product_id': tea.id, 'quantity': -3}]})
+    assert r.status_code == 400 and 'positive' in r.get_json()['error']
+
+    body = client.post('/api/sales/sync', json={'sales': [
+        {'client_ref': 'neg', 'items': [{'product_id': tea.id, 'quantity': -3}]},
+        {'client_ref': 'zero', 'items': [{'product_id': tea.id, 'quantity': 0}]},
+        {'client_ref': 'bad', 'items': [{'product_id': 'tea', 'quantity': 1}]},
+        {'client_ref': 'neg', 'items': [{'product_id': tea.id, 'quantity': -3}]},
+    ]}).get_json()
+    assert [r['status'] for r in body['results']] == ['rejected'] * 4
+    # The repeat carries its first copy's error rather than claiming it was stored
+    assert body['results'][3]['error'] == body['results'][0]['error'] and 'sale_id' not in body['results'][3]
+
+    db.session.expire_all()
+    assert db.session.get(Inventory, tea_inv.id).quantity_on_hand == 5
+    assert Sale.query.count() == 0
+
+
+def test_sales_history_pages_by_keyset(client):
+    base = datetime(2026, 10, 1, 9, 0)
+    for n in range(7):
+        # Two sales share each timestamp so the id tie-break is exercised
+        db.session.add(Sale(branch_id=1, total_amount=n, payment_type='CARD' if n % 3 == 0 else 'CASH',
+                            sale_date=base + timedelta(days=n // 2)))
+    db.session.commit()
+    expected = [s.id for s in Sale.query.order_by(Sale.sale_date.desc(), Sale.id.desc())]
+
+    seen, cursor = [], None
+    while True:
+        page, next_cursor = sales_history_page(before=decode_cursor(cursor) if cursor else None, page_size=3)
+        seen.extend(s.id for s in page)
+        if not next_cursor:
+            break
+        cursor = next_cursor
+    assert seen == expected
+
+    card, _ = sales_history_page(payment_type='CARD', start=base.date(), end=(base + timedelta(days=2)).date())
+    assert sorted(s.total_amount for s in card) == [0, 3]
+
+    r = client.get('/api/sales/history?before=' + cursor)
+    assert r.status_code == 200 and b'No sales recorded yet' not in r.data
+    assert client.get('/api/sales/history?before=garbage').status_code == 400
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+from database import db
+from models import Product, Inventory, Alert, JobLock, JobRun
+import scheduler
+
+
+def _seed_low_stock(count):
+    for i in range(count):
+        product = Product(name=f'Item {i}', sku=f'SKU-{i}')
+        db.session.add(product)
+        db.session.flush()
+        db.session.add(Inventory(product_id=product.id, branch_id=1, quantity_on_hand=1,
+                                 threshold_min=10, status='AVAILABLE'))
+    db.session.commit()
+
+
+def test_lock_is_exclusive_until_released(app):
+    assert scheduler.acquire_lock('alerts', 60) is True
+    # A second holder (another process) is refused while the lease is live
+    db.session.query(JobLock).filter_by(name='alerts').update({'owner': 'other-host:1'})
+    db.session.commit()
+    assert scheduler.acquire_lock('alerts', 60) is False
+    assert scheduler.run_job('alerts') is None
+
+    # An expired lease can be taken over
+    db.session.query(JobLock).filter_by(name='alerts').update(
+        {'expires_at': datetime.utcnow() - timedelta(seconds=1)})
+    db.session.commit()
+    assert scheduler.acquire_lock('alerts', 60) is True
+
+
+def test_budget_exhaustion_resumes_from_cursor(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'ALERT_HOOKS_ENABLED', False)
+    _seed_low_stock(5)
+    monkeypatch.setitem(app.config, 'ALERT_WORKER_CHUNK', 2)
+    monkeypatch.setitem(app.config, 'SCHEDULER_BUDGET', 0)
+
+    first = scheduler.run_job('alerts')
+    assert first.completed is False
+    assert first.chunks == 1 and first.created_count == 2
+    assert db.session.get(JobLock, 'alerts').cursor is not None
+
+    runs = [scheduler.run_job('alerts') for _ in range(2)]
+    assert runs[-1].completed is True
+    assert db.session.get(JobLock, 'alerts').cursor is None
+    assert Alert.query.filter_by(type='LOW_STOCK').count() == 5
+    assert JobRun.query.count() == 3
+
+    # Not due again until the interval has elapsed
+    assert scheduler.run_job('alerts', due_after=3600) is None
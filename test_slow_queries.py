@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+import slow_queries
+from models import User
+
+
+def test_slow_queries_are_logged_with_plan_and_redacted_params(app, client):
+    slow_queries.set_threshold(app, 1e-6)
+    try:
+        User.query.filter_by(email='owner@example.com', username='admin').first()
+        client.get('/api/search/products?q=tea')
+
+        by_email = next(q for q in slow_queries.recent() if 'users.email = ?' in q['statement'])
+        assert by_email['parameters'][0] == slow_queries.REDACTED and 'admin' in by_email['parameters']
+        assert by_email['plan'] and 'users' in by_email['plan']
+
+        search = next(q for q in slow_queries.recent() if 'FROM product' in q['statement'])
+        assert search['caller'] == 'GET /api/search/products (search_products_htmx)'
+        assert '%tea%' in search['parameters'] and 'SCAN' in search['plan']
+
+        page = client.get('/admin/slow-queries')
+        assert page.status_code == 200 and b'search_products_htmx' in page.data
+    finally:
+        slow_queries.set_threshold(app, app.config['SLOW_QUERY_MS'])
+        slow_queries.clear()
+
+
+def test_failed_explain_on_postgresql_is_rolled_back_to_a_savepoint():
+    executed = []
+
+    class Cursor:
+        def execute(self, sql, parameters=None):
+            executed.append(sql)
+            if sql.startswith('EXPLAIN'):
+                raise RuntimeError('syntax error at or near "%"')
+
+        def close(self):
+            pass
+
+    conn = SimpleNamespace(dialect=SimpleNamespace(name='postgresql'),
+                           connection=SimpleNamespace(cursor=Cursor))
+    plan = slow_queries._explain(conn, 'SELECT 1', {})
+    assert plan.startswith('(plan unavailable')
+    assert executed == ['SAVEPOINT slow_query_explain', 'EXPLAIN SELECT 1',
+                        'ROLLBACK TO SAVEPOINT slow_query_explain', 'RELEASE SAVEPOINT slow_query_explain']
@@ -0,0 +1,79 @@
+import os
+import runpy
+import shutil
+import subprocess
+import sys
+from types import SimpleNamespace
+import warmup
+from database import db
+from expiry_index import calendar
+from models import Branch, User
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+HEAVY = ('openpyxl', 'xlrd', 'numpy')
+
+
+def test_importing_the_app_touches_no_database_and_loads_no_heavy_modules(tmp_path):
+    db_file = tmp_path / 'untouched.db'
+    check = f"import sys, app; app.create_app(); print('loaded:', [m for m in {HEAVY!r} if m in sys.modules])"
+    env = {**os.environ, 'DATABASE_URL': f'sqlite:///{db_file}', 'SCHEDULER_ENABLED': '0'}
+    done = subprocess.run([sys.executable, '-c', check], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+    assert done.stdout.strip().splitlines()[-1] == 'loaded: []'
+    assert not db_file.exists()
+
+
+def test_seed_command_initializes_and_is_safe_to_rerun(app):
+    runner = app.test_cli_runner()
+    for _ in range(2):
+        result = runner.invoke(args=['seed'])
+        assert result.exit_code == 0 and 'Seed complete.' in result.output
+    assert Branch.query.count() == 2
+    assert User.query.filter_by(username='admin').count() == 1
+
+
+def test_create_app_builds_separate_apps_with_the_same_routes(app):
+    from app import create_app
+    other = create_app({'SLOW_QUERY_MS': 1})
+    assert other is not app and other.config['SLOW_QUERY_MS'] == 1
+    assert sorted(r.endpoint for r in other.url_map.iter_rules()) == sorted(r.endpoint for r in app.url_map.iter_rules())
+
+
+def test_warm_fills_the_read_mostly_caches_and_leaves_no_connection_open(app, tmp_path, monkeypatch):
+    import assets
+    static = tmp_path / 'static'
+    shutil.copytree(app.static_folder, static, ignore=shutil.ignore_patterns('dist', 'images*', 'vendor'))
+    monkeypatch.setattr(app, 'static_folder', str(static))
+    calendar.invalidate()
+    db.session.remove()
+    timings = warmup.warm(app)
+    assert list(timings) == [name for name, _ in warmup.STEPS]
+    assert calendar._loaded_at is not None
+    assert not assets.is_stale(app)
+    assert db.engine.pool.checkedout() == 0
+
+
+def test_gunicorn_config_reads_the_environment_and_clears_old_metrics(tmp_path, monkeypatch):
+    monkeypatch.setenv('WEB_CONCURRENCY', '3')
+    monkeypatch.setenv('METRICS_DIR', str(tmp_path))
+    (tmp_path / 'metrics-123.db').write_bytes(b'stale')
+    config = runpy.run_path(os.path.join(ROOT, 'gunicorn.conf.py'))
+    assert config['workers'] == 3 and config['preload_app'] and config['wsgi_app'] == 'app:create_app()'
+    config['on_starting'](SimpleNamespace(cfg=SimpleNamespace(preload_app=False)))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_gunicorn_master_seeds_before_warming(app, monkeypatch):
+    monkeypatch.delenv('METRICS_DIR', raising=False)
+    monkeypatch.setattr(warmup, 'warm', lambda app: {})
+    config = runpy.run_path(os.path.join(ROOT, 'gunicorn.conf.py'))
+    server = SimpleNamespace(cfg=SimpleNamespace(preload_app=True), app=SimpleNamespace(wsgi=lambda: app),
+                             log=SimpleNamespace(info=lambda *args: None))
+    # As on a fresh database: the fixture has seeded this one already
+    User.query.delete()
+    Branch.query.delete()
+    db.session.commit()
+    config['on_starting'](server)
+    assert Branch.query.count() == 2
+    assert User.query.filter_by(username='admin').count() == 1
@@ -0,0 +1,55 @@
+from datetime import date
+from database import db
+from models import Product, Inventory, InventoryValuation
+import valuation
+
+
+def _seed():
+    tea = Product(name='Tea', category='Drinks', unit_price=10)
+    soap = Product(name='Soap', unit_price=4)
+    db.session.add_all([tea, soap])
+    db.session.flush()
+    db.session.add_all([
+        Inventory(product_id=tea.id, branch_id=1, quantity_on_hand=5),
+        Inventory(product_id=tea.id, branch_id=2, quantity_on_hand=3),
+        Inventory(product_id=soap.id, branch_id=1, quantity_on_hand=10),
+    ])
+    db.session.commit()
+    return tea
+
+
+def test_snapshot_is_taken_once_per_day(app):
+    tea = _seed()
+    assert valuation.snapshot(date(2026, 10, 1)) == 3
+    db.session.commit()
+
+    Inventory.query.filter_by(product_id=tea.id, branch_id=1).one().quantity_on_hand = 0
+    db.session.commit()
+    assert valuation.snapshot(date(2026, 10, 1)) == 0
+    assert valuation.snapshot(date(2026, 10, 2)) == 3
+    db.session.commit()
+
+    rows = {(r.branch_id, r.category): (r.units, r.value) for r in InventoryValuation.query.filter_by(day=date(2026, 10, 1))}
+    assert rows == {(1, 'Drinks'): (5, 50), (2, 'Drinks'): (3, 30), (1, 'Uncategorized'): (10, 40)}
+
+
+def test_history_api_ranges_and_breakdowns(client):
+    _seed()
+    valuation.snapshot(date(2026, 10, 1))
+    valuation.snapshot(date(2026, 10, 5))
+    db.session.commit()
+
+    body = client.get('/api/analytics/valuation?start=2026-10-01&end=2026-10-03&group_by=category').get_json()
+    assert body['days'] == [{'date': '2026-10-01', 'value': 120.0, 'units': 18.0,
+                             'breakdown': {'Drinks': 80.0, 'Uncategorized': 40.0}}]
+    body = client.get('/api/analytics/valuation?start=2026-09-01&end=2026-10-31&branch_id=2').get_json()
+    assert [(d['date'], d['value']) for d in body['days']] == [('2026-10-01', 30.0), ('2026-10-05', 30.0)]
+    assert client.get('/api/reports/valuation').get_json()['labels'] == ['2026-10-01', '2026-10-05']
+
+
+def test_scheduled_job_snapshots_today(app):
+    import scheduler
+    _seed()
+    run = scheduler.run_job('valuation')
+    assert run.completed and run.created_count == 3
+    assert scheduler.run_job('valuation').created_count == 0
@@ -0,0 +1,122 @@
+import os
+import time
+from datetime import datetime
+import click
+from flask import current_app
+from sqlalchemy import select, delete, insert, func, literal, Date, DateTime
+from database import db
+from models import Product, Inventory, InventoryValuation, JobRun
+from rollups import NO_BRANCH
+from scheduler import register_job, worker_id
+
+UNCATEGORIZED = 'Uncategorized'
+
+
+# =====================
+# SNAPSHOTS
+# =====================
+def snapshot(day=None, replace=False):
+    """
+    Write the valuation rows for `day` (default: today, UTC) with one
+    INSERT ... SELECT ... GROUP BY branch, category over current stock.
+
+    A day is snapshotted once; pass replace=True to overwrite it. Returns
+    the number of rows written (0 when the day already existed). Caller commits.
+    """
+    day = day or datetime.utcnow().date()
+    existing = db.session.query(InventoryValuation.day).filter_by(day=day).first()
+    if existing and not replace:
+        return 0
+    db.session.execute(delete(InventoryValuation).where(InventoryValuation.day == day))
+
+    branch = func.coalesce(Inventory.branch_id, NO_BRANCH)
+    category = func.coalesce(Product.category, UNCATEGORIZED)
+    quantity = func.coalesce(Inventory.quantity_on_hand, 0)
+    rows = select(
+        literal(day, Date), branch, category,
+        func.sum(quantity), func.sum(quantity * func.coalesce(Product.unit_price, 0)), func.count(Inventory.id),
+        literal(datetime.utcnow(), DateTime)
+    ).join(Product, Product.id == Inventory.product_id).group_by(branch, category)
+    result = db.session.execute(insert(InventoryValuation.__table__).from_select(
+        ['day', 'branch_id', 'category', 'units', 'value', 'line_count', 'created_at'], rows
+    ))
+    return result.rowcount
+
+
+# =====================
+# QUERIES
+# =====================
+def history(start, end, branch_id=None, category=None, group_by=None):
+    """
+    Stock value and units per snapshot day in [start, end], read straight
+    off the (day, branch, category) primary key. With group_by='category'
+    or 'branch' each day also carries a breakdown of value.
+    """
+    filters = [InventoryValuation.day >= start, InventoryValuation.day <= end]
+    if branch_id is not None:
+        filters.append(InventoryValuation.branch_id == branch_id)
+    if category:
+        filters.append(InventoryValuation.category == category)
+
+    totals = db.session.query(
+        InventoryValuation.day, func.sum(InventoryValuation.value), func.sum(InventoryValuation.units)
+    ).filter(*filters).group_by(InventoryValuation.day).order_by(InventoryValuation.day).all()
+    days = {d: {'date': d.isoformat(), 'value': float(v or 0), 'units': float(u or 0)} for d, v, u in totals}
+
+    if group_by in ('category', 'branch'):
+        key = InventoryValuation.category if group_by == 'category' else InventoryValuation.branch_id
+        for d, k, v in db.session.query(
+            InventoryValuation.day, key, func.sum(InventoryValuation.value)
+        ).filter(*filters).group_by(InventoryValuation.day, key):
+            days[d].setdefault('breakdown', {})[str(k)] = float(v or 0)
+    return list(days.values())
+
+
+def value_trend(days=90):
+    """Total stock value per snapshot day, as a {labels, data} chart series."""
+    rows = db.session.query(
+        InventoryValuation.day, func.sum(InventoryValuation.value)
+    ).group_by(InventoryValuation.day).order_by(InventoryValuation.day.desc()).limit(days).all()
+    rows.reverse()
+    return {'labels': [d.isoformat() for d, _ in rows], 'data': [round(float(v or 0), 2) for _, v in rows]}
+
+
+# =====================
+# NIGHTLY JOB
+# =====================
+@register_job('valuation', 'VALUATION_INTERVAL')
+def valuation_job(lock):
+    """Snapshot today's stock value the first time the job runs after midnight (UTC)."""
+    started = time.monotonic()
+    run = JobRun(job='valuation', owner=worker_id(), started_at=datetime.utcnow(),
+                 chunks=1, rows_scanned=0, expired_count=0, created_count=0,
+                 updated_count=0, resolved_count=0, completed=False)
+    try:
+        run.created_count = snapshot()
+        db.session.commit()
+        run.completed = True
+    except Exception as e:
+        db.session.rollback()
+        run.error = str(e)
+        current_app.logger.exception("[Scheduler] valuation job failed")
+
+    run.duration_ms = int((time.monotonic() - started) * 1000)
+    db.session.add(run)
+    db.session.commit()
+    return run
+
+
+@click.command('snapshot-valuation')
+@click.option('--day', type=click.DateTime(formats=['%Y-%m-%d']), help='Day to record (default: today).')
+@click.option('--replace', is_flag=True, help='Overwrite an existing snapshot for that day.')
+def snapshot_valuation_command(day, replace):
+    """Record current stock value per branch and category."""
+    written = snapshot(day.date() if day else None, replace=replace)
+    db.session.commit()
+    click.echo(f"Valuation snapshot: {written} rows" if written else "Snapshot already exists (use --replace).")
+
+
+def init_app(app):
+    # Checked hourly; the snapshot itself is taken once per day
+    app.config.setdefault('VALUATION_INTERVAL', int(os.environ.get('VALUATION_INTERVAL', 3600)))
+    app.cli.add_command(snapshot_valuation_command)
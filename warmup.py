@@ -0,0 +1,102 @@
+import importlib
+import os
+import time
+from database import db
+
+# Imported lazily by the views (see app.py); loaded up front in a preloading
+# master so every worker shares one copy instead of paying on first use
+HEAVY_MODULES = ('numpy', 'openpyxl', 'xlrd', 'requests', 'xml.etree.ElementTree')
+
+
+# =====================
+# BEFORE FORK
+# =====================
+def _import_heavy_modules(app):
+    for name in HEAVY_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            app.logger.warning("warm-up: %s is not installed", name)
+
+
+def _configure_mappers(app):
+    from sqlalchemy.orm import configure_mappers
+    configure_mappers()
+
+
+def _compile_templates(app):
+    for name in app.jinja_env.list_templates(filter_func=lambda name: name.endswith('.html')):
+        app.jinja_env.get_template(name)
+
+
+def _build_assets(app):
+    import assets
+    if assets.ensure_built(app):
+        app.logger.info("warm-up: built the static bundle")
+
+
+def _fingerprint_static(app):
+    import assets
+    import cache_policy
+    assets.manifest(app)
+    for directory, _, files in os.walk(app.static_folder):
+        for name in files:
+            cache_policy.fingerprint(app, os.path.relpath(os.path.join(directory, name), app.static_folder))
+
+
+def _load_expiry_calendar(app):
+    from expiry_index import calendar
+    calendar.load()
+
+
+def _compute_report_metrics(app):
+    import analytics
+    analytics.metrics()
+
+
+STEPS = (
+    ('assets', _build_assets),
+    ('imports', _import_heavy_modules),
+    ('mappers', _configure_mappers),
+    ('templates', _compile_templates),
+    ('static', _fingerprint_static),
+    ('expiry_calendar', _load_expiry_calendar),
+    ('report_metrics', _compute_report_metrics),
+)
+
+
+def warm(app):
+    """
+    Build the app's read-mostly structures in this process: the static
+    bundle when missing or stale, compiled templates, static fingerprints,
+    the expiry calendar, the report columns. Run in the gunicorn master
+    before it forks, workers inherit them ready to use. Ends by closing
+    the pooled connections it opened, so none is shared with a child.
+    Returns seconds spent per step.
+    """
+    timings = {}
+    with app.app_context():
+        for name, step in STEPS:
+            started = time.perf_counter()
+            try:
+                step(app)
+            except Exception:
+                # A cold cache is slower, not broken: workers build it on first use
+                app.logger.exception("warm-up step %s failed", name)
+            timings[name] = round(time.perf_counter() - started, 4)
+        for engine in db.engines.values():
+            engine.dispose()
+    return timings
+
+
+# =====================
+# AFTER FORK
+# =====================
+def reset_after_fork(app):
+    """
+    Drop the connection pool a worker inherited from the master without
+    closing the master's sockets, so the worker opens its own connections.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)